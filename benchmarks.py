@@ -0,0 +1,651 @@
+import os
+import time
+import wave
+import struct
+import tempfile
+
+
+def write_test_wav(path, seconds, freq=44100, channels=2, tone=440):
+    """生成用于测试的正弦波WAV文件"""
+    import math
+    frames = int(seconds * freq)
+    period = [int(8000 * math.sin(2 * math.pi * tone * i / freq)) for i in range(freq // tone)]
+    samples = bytearray()
+    for i in range(frames):
+        value = struct.pack('<h', period[i % len(period)])
+        samples += value * channels
+    with wave.open(path, 'wb') as file:
+        file.setnchannels(channels)
+        file.setsampwidth(2)
+        file.setframerate(freq)
+        file.writeframes(bytes(samples))
+
+
+def _init_headless_mixer():
+    """在没有声卡的环境下使用SDL的虚拟音频驱动初始化混音器"""
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+    pygame.mixer.init(frequency=44100, size=-16, channels=2)
+    return pygame
+
+
+def bench_transition_gap(rounds=3, seconds=1.0, poll_interval=1.0):
+    """测量切歌间隙：对比旧的轮询后加载方式与 music.queue 无缝衔接"""
+    pygame = _init_headless_mixer()
+    from .transition import TransitionEngine
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(2):
+            path = os.path.join(tmp, f"track{i}.wav")
+            write_test_wav(path, seconds, tone=440 * (i + 1))
+            paths.append(path)
+
+        # 旧方式：按进度计时器的间隔轮询，检测到播放结束后再加载并播放下一首
+        engine = TransitionEngine()
+        for _ in range(rounds):
+            pygame.mixer.music.load(paths[0])
+            pygame.mixer.music.play()
+            time.sleep(0.2)
+            engine.track_started(pygame.mixer.music.get_pos() / 1000, seconds)
+            while pygame.mixer.music.get_busy():
+                time.sleep(poll_interval)
+            pygame.mixer.music.load(paths[1])
+            pygame.mixer.music.play()
+            # 两种方式都在下一首播放一段时间后按同样的方法推算其起始时刻
+            time.sleep(0.2)
+            engine.queued_track_started(pygame.mixer.music.get_pos() / 1000)
+        pygame.mixer.music.stop()
+        results['poll'] = engine.gap_report()
+
+        # 新方式：提前把下一首放入队列
+        engine = TransitionEngine()
+        for _ in range(rounds):
+            pygame.mixer.music.load(paths[0])
+            pygame.mixer.music.play()
+            time.sleep(0.2)
+            engine.track_started(pygame.mixer.music.get_pos() / 1000, seconds)
+            engine.prepare(paths[0], paths[1])
+            last_pos = 0
+            while True:
+                position = pygame.mixer.music.get_pos() / 1000
+                if position < last_pos:
+                    time.sleep(0.2)
+                    engine.queued_track_started(pygame.mixer.music.get_pos() / 1000)
+                    break
+                last_pos = position
+                time.sleep(0.001)
+        pygame.mixer.music.stop()
+        results['queue'] = engine.gap_report()
+    pygame.mixer.quit()
+    return results
+
+
+def _legacy_parse_lyrics(lrc_content):
+    """旧版逐行 re.match 的歌词解析，仅用于对比"""
+    import re
+    lyrics = []
+    for line in lrc_content.split('\n'):
+        match = re.match(r'\[(\d{2}:\d{2}\.\d{2})\](.*)', line)
+        if match:
+            time_str, text = match.groups()
+            minutes, seconds = map(float, time_str.split(':'))
+            lyrics.append((minutes * 60 + seconds, text))
+    lyrics.sort(key=lambda x: x[0])
+    return lyrics
+
+
+def make_lrc_corpus(files=500, lines=300, seed=1):
+    """生成混合多种时间标签格式的LRC语料"""
+    import random
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(files):
+        rows = ["[ti:测试歌曲]", "[ar:测试歌手]", "[offset:+120]"]
+        for i in range(lines):
+            seconds = i * 0.75
+            minutes, rest = divmod(seconds, 60)
+            style = rng.randrange(4)
+            if style == 0:
+                tag = f"[{int(minutes):02}:{rest:05.2f}]"
+            elif style == 1:
+                tag = f"[{int(minutes):02}:{rest:06.3f}]"
+            elif style == 2:
+                tag = f"[{int(minutes):02}:{int(rest):02}]"
+            else:
+                tag = f"[{int(minutes):02}:{rest:05.2f}][{int(minutes) + 3:02}:{rest:05.2f}]"
+            rows.append(f"{tag}第{i}行歌词 lyric line {i}")
+        corpus.append("\n".join(rows))
+    return corpus
+
+
+def bench_parse_lyrics(files=500, lines=300):
+    """对比新旧歌词解析器在大量合成LRC文件上的速度"""
+    from .utils import parse_lyrics
+
+    corpus = make_lrc_corpus(files, lines)
+    results = {'files': files, 'lines_per_file': lines}
+    for name, parser in (('legacy', _legacy_parse_lyrics), ('compiled', parse_lyrics)):
+        start = time.perf_counter()
+        parsed = 0
+        for content in corpus:
+            parsed += len(parser(content))
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'seconds': elapsed,
+            'lines_parsed': parsed,
+            'lines_per_second': parsed / elapsed if elapsed else 0,
+        }
+    return results
+
+
+def bench_visualizer_frame(width=1200, height=60, iterations=2000):
+    """对比Tk线程上每帧的开销：旧的正弦波与预先计算好的频谱帧"""
+    import math
+    import numpy as np
+    from .visualizer import compute_spectrum_frames, spectrum_points, SPECTRUM_FPS
+
+    # 后台线程中的计算：10秒的合成音频
+    freq = 44100
+    t = np.arange(freq * 10) / freq
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+    start = time.perf_counter()
+    frames = compute_spectrum_frames(samples, freq)
+    worker_seconds = time.perf_counter() - start
+    # 立体声混音器解码出的是二维数组，频谱强度应与单声道相同
+    stereo_frames = compute_spectrum_frames(np.column_stack([samples, samples]), freq)
+
+    def sine_frame(offset):
+        points = []
+        for x in range(0, width, 2):
+            y = height/2 + math.sin((x+offset)/10) * (height/4)
+            points.extend([x, y])
+        return points
+
+    def spectrum_frame(offset):
+        frame = frames[offset % len(frames)]
+        return spectrum_points(frame, width, height).tolist()
+
+    results = {'worker_seconds_per_track_second': worker_seconds / 10,
+               'spectrum_fps': SPECTRUM_FPS,
+               'mono_mean': float(frames.mean()),
+               'stereo_mean': float(stereo_frames.mean())}
+    for name, render in (('sine', sine_frame), ('spectrum', spectrum_frame)):
+        start = time.perf_counter()
+        coordinates = 0
+        for offset in range(iterations):
+            coordinates = len(render(offset))
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'us_per_frame': elapsed / iterations * 1e6,
+            'coordinates_per_frame': coordinates,
+        }
+    return results
+
+
+def make_track_paths(count, seed=2):
+    """生成模拟的曲库路径"""
+    import random
+    rng = random.Random(seed)
+    artists = [f"歌手{i:03}" for i in range(400)] + [f"Artist {i:03}" for i in range(400)]
+    words = ["夜曲", "晴天", "北方", "love", "night", "river", "summer", "雨", "city", "dream",
+             "光", "路", "blue", "fire", "home", "星空", "旅行", "moon", "sea", "wind"]
+    paths = []
+    for i in range(count):
+        artist = rng.choice(artists)
+        title = " ".join(rng.sample(words, 2))
+        paths.append(f"D:/Music/{artist}/Album {i % 97:02}/{i:06} {title}.mp3")
+    return paths
+
+
+def bench_search(tracks=100000, playlists=20, playlist_size=5000):
+    """在大曲库上测量搜索索引的建立时间和每次按键的查询延迟"""
+    import random
+    from .search import SearchIndex
+
+    paths = make_track_paths(tracks)
+    rng = random.Random(3)
+    lists = {f"电台{i}": rng.sample(paths, min(playlist_size, tracks)) for i in range(playlists)}
+    lists["全部"] = paths
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.build(lists)
+    build_seconds = time.perf_counter() - start
+
+    queries = []
+    for word in ("artist 123 night", "歌手042 夜曲", "summer", "000123", "星空"):
+        queries.extend(word[:i] for i in range(1, len(word) + 1))
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'tracks': tracks,
+        'build_seconds': build_seconds,
+        'queries': len(queries),
+        'median_ms': latencies[len(latencies) // 2],
+        'p95_ms': latencies[int(len(latencies) * 0.95)],
+        'max_ms': latencies[-1],
+    }
+
+
+def bench_rescan(artists=50, albums=10, tracks_per_album=100):
+    """测量监视文件夹在没有变化和只有一个文件夹变化时的增量扫描耗时"""
+    import shutil
+    from .library import LibraryIndex
+    from .rescan import LibraryScanner
+
+    root = tempfile.mkdtemp(prefix="rescan_bench_")
+    try:
+        for artist in range(artists):
+            for album in range(albums):
+                folder = os.path.join(root, f"Artist {artist:03}", f"Album {album:02}")
+                os.makedirs(folder)
+                for track in range(tracks_per_album):
+                    with open(os.path.join(folder, f"{track:03} song.mp3"), 'wb') as file:
+                        # 只有文件头，足够通过格式检查
+                        file.write(b'ID3')
+        library = LibraryIndex(os.path.join(root, "library.db"))
+        scanner = LibraryScanner(library)
+        library.watch_root(root, "bench")
+
+        start = time.perf_counter()
+        added, removed = scanner.rescan(root)
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        unchanged = scanner.rescan(root)
+        unchanged_seconds = time.perf_counter() - start
+
+        folder = os.path.join(root, "Artist 007", "Album 03")
+        os.remove(os.path.join(folder, "000 song.mp3"))
+        with open(os.path.join(folder, "new song.mp3"), 'wb') as file:
+            file.write(b'ID3')
+        start = time.perf_counter()
+        changed = scanner.rescan(root)
+        changed_seconds = time.perf_counter() - start
+        library.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        'files': len(added),
+        'full_scan_seconds': full_seconds,
+        'unchanged_rescan_seconds': unchanged_seconds,
+        'unchanged_diff': (len(unchanged[0]), len(unchanged[1])),
+        'one_dir_changed_seconds': changed_seconds,
+        'one_dir_changed_diff': (len(changed[0]), len(changed[1])),
+    }
+
+
+def bench_playlist_storage(sizes=(10000, 100000, 1000000), edits=20):
+    """比较整体重写 JSON 与追加日志两种保存方式下每次修改的写入耗时"""
+    import shutil
+    from .data import DataHandler
+
+    results = {}
+    for size in sizes:
+        paths = make_track_paths(size)
+        for mode in ('json', 'journal'):
+            folder = tempfile.mkdtemp(prefix="storage_bench_")
+            try:
+                data_file = os.path.join(folder, "playlists.json")
+                handler = DataHandler(data_file, journal=(mode == 'journal'))
+                handler.add_tracks("默认电台", paths)
+                handler.flush()
+                latencies = []
+                for i in range(edits):
+                    if i % 2:
+                        handler.remove_tracks("默认电台", [i])
+                    else:
+                        handler.add_tracks("默认电台", [f"D:/Music/new/{i}.mp3"])
+                    start = time.perf_counter()
+                    handler.flush()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                handler.close()
+
+                start = time.perf_counter()
+                reloaded = DataHandler(data_file, journal=(mode == 'journal'))
+                load_seconds = time.perf_counter() - start
+                assert reloaded.playlists == handler.playlists
+                reloaded.close()
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+            latencies.sort()
+            results[f"{mode}_{size}"] = {
+                'median_edit_ms': latencies[len(latencies) // 2],
+                'max_edit_ms': latencies[-1],
+                'load_seconds': load_seconds,
+            }
+    return results
+
+
+def bench_playlist_load(radios=(10, 50, 200), playlist_size=10000):
+    """比较单个 JSON 文件与分片快照在电台数量增加时的启动读取耗时和内存占用"""
+    import shutil
+    import tracemalloc
+    from .data import DataHandler
+
+    paths = make_track_paths(playlist_size)
+    results = {}
+    for count in radios:
+        folder = tempfile.mkdtemp(prefix="load_bench_")
+        try:
+            for mode in ('json', 'sharded'):
+                data_file = os.path.join(folder, f"{mode}.json")
+                handler = DataHandler(data_file, journal=(mode == 'sharded'))
+                handler.save_data({f"电台{i}": list(paths) for i in range(count)}, "电台0")
+                handler.close()
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                handler = DataHandler(data_file, journal=(mode == 'sharded'))
+                load_seconds = time.perf_counter() - start
+                memory = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                handler.close()
+                results[f"{mode}_{count}_radios"] = {
+                    'load_ms': load_seconds * 1000,
+                    'memory_mb': memory / 1024 / 1024,
+                }
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def bench_playlist_memory(radios=20, playlist_size=50000, library_size=100000, removals=1000):
+    """比较路径字符串列表与共享歌曲表 + 编号数组两种电台表示的内存和批量删除耗时"""
+    import json
+    import random
+    import tracemalloc
+    from .tracks import TrackTable, Playlist
+
+    rng = random.Random(4)
+    # 按专辑组织的曲库：每张专辑 12 首歌
+    words = ["夜曲", "晴天", "北方", "love", "night", "river", "summer", "雨", "city", "dream"]
+    paths = [f"D:/Music/歌手{i // 120:04}/专辑 {i // 12 % 10}/{i % 12 + 1:02} "
+             f"{' '.join(rng.sample(words, 2))}.mp3" for i in range(library_size)]
+    # 经过一次 JSON 序列化，与从文件读取时一样每个电台各有一份字符串
+    encoded = json.dumps({f"电台{i}": rng.sample(paths, playlist_size) for i in range(radios)})
+    del paths
+
+    tracemalloc.start()
+    lists = json.loads(encoded)
+    list_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    table = TrackTable()
+    playlists = {name: Playlist(table, items) for name, items in json.loads(encoded).items()}
+    # json.loads 产生的临时字符串此时已释放
+    interned_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    indices = sorted(rng.sample(range(playlist_size), removals))
+    target = list(lists["电台0"])
+    start = time.perf_counter()
+    for index in reversed(indices):
+        del target[index]
+    list_remove_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    playlists["电台0"].remove_indices(indices)
+    array_remove_ms = (time.perf_counter() - start) * 1000
+    assert list(playlists["电台0"]) == target
+    return {
+        'list_memory_mb': list_memory / 1024 / 1024,
+        'interned_memory_mb': interned_memory / 1024 / 1024,
+        'tracks_interned': len(table),
+        'list_remove_ms': list_remove_ms,
+        'array_remove_ms': array_remove_ms,
+    }
+
+
+def bench_shuffle(sizes=(1000, 100000, 1000000), steps=10000):
+    """随机播放：测量每次切歌的耗时、一轮内是否重复，以及中途增删歌曲的开销"""
+    import random
+    from .shuffle import ShuffleEngine
+    results = {}
+    for size in sizes:
+        rng = random.Random(5)
+        engine = ShuffleEngine(size, rng=rng)
+        current = None
+        played = []
+        start = time.perf_counter()
+        for _ in range(steps):
+            current = engine.peek(current)
+            engine.started(current)
+            played.append(current)
+        next_us = (time.perf_counter() - start) / steps * 1e6
+
+        start = time.perf_counter()
+        for _ in range(100):
+            engine.started(engine.previous())
+        previous_us = (time.perf_counter() - start) / 100 * 1e6
+
+        start = time.perf_counter()
+        engine.tracks_removed(rng.sample(range(size), 10))
+        engine.tracks_added(10)
+        mutate_ms = (time.perf_counter() - start) * 1000
+
+        # 旧实现：每次在整个列表中随机选择
+        legacy = [rng.randint(0, size - 1) for _ in range(min(steps, size))]
+
+        weighted = ShuffleEngine(size, rng=rng)
+        weighted.weighted = True
+        weighted.weight_func = lambda: [1 + i % 7 for i in range(size)]
+        start = time.perf_counter()
+        weighted.peek(None)
+        alias_build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for _ in range(steps):
+            weighted.started(weighted.peek())
+        weighted_us = (time.perf_counter() - start) / steps * 1e6
+
+        results[size] = {
+            'next_us': next_us,
+            'previous_us': previous_us,
+            'mutate_ms': mutate_ms,
+            'repeats_in_round': min(steps, size) - len(set(played[:size])),
+            'legacy_repeats': len(legacy) - len(set(legacy)),
+            'alias_build_ms': alias_build_ms,
+            'weighted_next_us': weighted_us,
+        }
+    return results
+
+
+def write_test_vbr_mp3(path, frames, seed=6):
+    """生成码率逐帧随机变化、没有 Xing 标签的静音MP3，返回每帧的 (字节偏移, 起始时间)"""
+    import random
+    from .probe import BITRATES
+    rng = random.Random(seed)
+    data = bytearray()
+    truth = []
+    for i in range(frames):
+        bitrate_index = rng.randint(1, 14)
+        padding = rng.randint(0, 1)
+        frame_length = 144 * BITRATES[(1, 3)][bitrate_index] * 1000 // 44100 + padding
+        truth.append((len(data), i * 1152 / 44100))
+        # MPEG1 第三层、44100Hz、单声道，全零的边信息解码为静音
+        data += bytes([0xFF, 0xFB, (bitrate_index << 4) | (padding << 1), 0xC0])
+        data += bytes(frame_length - 4)
+    with open(path, 'wb') as file:
+        file.write(data)
+    return truth
+
+
+def bench_seek(files=3, frames=9000, seeks=1000):
+    """在合成的VBR文件上对比按首帧码率估算与按帧偏移表跳转的位置误差"""
+    import bisect
+    import random
+    from .probe import build_seek_table, find_first_frame
+    rng = random.Random(7)
+    legacy_errors = []
+    table_errors = []
+    landing = []
+    build_ms = []
+    locate_us = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in range(files):
+            path = os.path.join(tmp, f"vbr{n}.mp3")
+            truth = write_test_vbr_mp3(path, frames, seed=n)
+            offsets = [offset for offset, _ in truth]
+            duration = frames * 1152 / 44100
+
+            def frame_time(offset):
+                return truth[bisect.bisect_right(offsets, offset) - 1][1]
+
+            start = time.perf_counter()
+            table = build_seek_table(path)
+            build_ms.append((time.perf_counter() - start) * 1000)
+            assert abs(table.duration - duration) < 1e-6
+            with open(path, 'rb') as file:
+                first, info, _ = find_first_frame(file)
+
+            targets = [rng.uniform(0, duration) for _ in range(seeks)]
+            start = time.perf_counter()
+            located = [table.locate(target) for target in targets]
+            locate_us.append((time.perf_counter() - start) / seeks * 1e6)
+            for target, (offset, position) in zip(targets, located):
+                # 旧方式：按首帧码率把时间换算为字节，认为播放位置就是目标时间
+                estimate = first + int(target * info['bitrate'] / 8)
+                legacy_errors.append(abs(frame_time(min(estimate, offsets[-1])) - target))
+                # 帧偏移表：时钟从实际解码的帧开始计时
+                table_errors.append(abs(frame_time(offset) - position))
+                landing.append(target - position)
+    return {
+        'legacy_avg_error_s': sum(legacy_errors) / len(legacy_errors),
+        'legacy_max_error_s': max(legacy_errors),
+        'table_max_error_s': max(table_errors),
+        'table_max_landing_s': max(landing),
+        'build_ms': sum(build_ms) / len(build_ms),
+        'locate_us': sum(locate_us) / len(locate_us),
+        'table_bytes': len(table.to_bytes()),
+    }
+
+
+def write_long_wav(path, seconds, freq=44100, tone=440, amplitude=8000):
+    """按整周期重复写入长时间的立体声正弦波WAV，不在内存中生成整个文件"""
+    import math
+    period = b''.join(struct.pack('<hh', value, value) for value in
+                      (int(amplitude * math.sin(2 * math.pi * tone * i / freq)) for i in range(freq // tone)))
+    block = period * (freq // (freq // tone))
+    with wave.open(path, 'wb') as file:
+        file.setnchannels(2)
+        file.setsampwidth(2)
+        file.setframerate(freq)
+        for _ in range(int(seconds)):
+            file.writeframes(block)
+
+
+def measure_playback_rss(path, mode, seconds):
+    """在当前进程中播放 seconds 秒，返回主进程和解码进程的峰值内存（MB）"""
+    import resource
+    pygame = _init_headless_mixer()
+    if mode == 'sound':
+        # 完整解码到内存中播放，频谱和淡入淡出目前也这样解码
+        pygame.mixer.Sound(path).play()
+        time.sleep(seconds)
+    else:
+        from .stream import StreamMusic
+        music = StreamMusic()
+        music.load(path)
+        music.play()
+        time.sleep(seconds)
+        assert music.get_pos() > 0
+        music.shutdown()
+    # Linux 上 ru_maxrss 的单位是KB
+    main = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {'main_mb': round(main, 1), 'worker_mb': round(worker, 1)}
+
+
+def bench_stream(lengths=(60, 600), seconds=2.0):
+    """对比完整解码与流式播放的峰值内存随歌曲长度的变化（每次在新进程中测量）"""
+    import sys
+    import json
+    import subprocess
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for length in lengths:
+            path = os.path.join(tmp, f"long{length}.wav")
+            write_long_wav(path, length)
+            for mode in ('sound', 'stream'):
+                code = (f"import json; from {__package__}.benchmarks import measure_playback_rss; "
+                        f"print(json.dumps(measure_playback_rss({path!r}, {mode!r}, {seconds})))")
+                output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                        text=True, check=True,
+                                        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+                results[f"{mode}_{length}s"] = json.loads(output.stdout.strip().splitlines()[-1])
+    return results
+
+
+def bench_loudness(tracks=8, seconds=60, workers=(1, None), volumes=(0.5, 1.0)):
+    """批量响度分析的吞吐量（每个进程每分钟分析的歌曲数），并检查播放器实际设置的音量是否抵消了响度差异"""
+    import math
+    from .library import LibraryIndex
+    from .loudness import LoudnessAnalyzer, reference_gain, playback_gain
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(tracks):
+            path = os.path.join(tmp, f"level{i}.wav")
+            write_long_wav(path, seconds, tone=220 * (i % 4 + 1), amplitude=1000 * (i + 1))
+            paths.append(path)
+        for max_workers in workers:
+            library = LibraryIndex(os.path.join(tmp, f"library{max_workers}.db"))
+            for path in paths:
+                library.get_track(path)
+            analyzer = LoudnessAnalyzer(library, max_workers=max_workers)
+            analyzer.start(library.unanalyzed_tracks())
+            analyzer.finished.wait()
+            report = analyzer.report()
+            tracks_info = list(library.cached_tracks(paths).values())
+            reference = reference_gain(library.max_gain())
+            library.close()
+            before = [track['loudness'] for track in tracks_info]
+            report['loudness_spread_db'] = max(before) - min(before)
+            report['reference_gain_db'] = reference
+            # 与 MusicPlayer.apply_volume 相同：滑块音量乘以播放增益后交给混音器
+            for volume in volumes:
+                after = [track['loudness'] + 20 * math.log10(
+                    min(1.0, volume * playback_gain(track['gain'], reference)))
+                    for track in tracks_info]
+                report[f'normalized_spread_db_at_{int(volume * 100)}'] = max(after) - min(after)
+            results[f"workers_{report['workers']}"] = report
+    return results
+
+
+BENCHMARKS = {
+    'transition_gap': bench_transition_gap,
+    'parse_lyrics': bench_parse_lyrics,
+    'visualizer_frame': bench_visualizer_frame,
+    'search': bench_search,
+    'rescan': bench_rescan,
+    'playlist_storage': bench_playlist_storage,
+    'playlist_load': bench_playlist_load,
+    'playlist_memory': bench_playlist_memory,
+    'shuffle': bench_shuffle,
+    'seek': bench_seek,
+    'stream': bench_stream,
+    'loudness': bench_loudness,
+}
+
+
+def run_benchmarks(names=None):
+    """运行指定的基准测试并打印结果"""
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        print(f"运行基准测试: {name}")
+        results[name] = bench()
+        print(results[name])
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmarks()
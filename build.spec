@@ -1,11 +1,17 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import shutil
+
 block_cipher = None
 
+# 流式播放（--stream）和响度分析需要 ffmpeg 解码 MP3；打包机器上有 ffmpeg 时一并打包，
+# 程序会先在自己的文件夹中查找它
+ffmpeg = shutil.which('ffmpeg')
+
 a = Analysis(
     ['main.py'],  # 主程序入口
     pathex=[],
-    binaries=[],
+    binaries=[(ffmpeg, '.')] if ffmpeg else [],
     datas=[
         ('playlists.json', '.'),  # 包含数据文件
         ('src', 'src'),          # 包含源代码目录
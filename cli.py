@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+# 无界面的命令行入口：python -m src.cli <命令>
+# 只使用数据、曲库和播放核心模块，不导入 tkinter，可以在没有显示器的服务器和 CI 容器中运行
+
+# 等待后台导入、分析结果的间隔（秒）
+POLL_INTERVAL = 0.1
+# 检查电台时最多列出的问题条数
+MAX_LISTED = 10
+
+
+def open_data(args):
+    from .data import DataHandler
+    from .library import LibraryIndex
+    return DataHandler(args.data, journal=True), LibraryIndex(args.library)
+
+
+def cmd_import(args, data_handler, library):
+    """递归导入文件夹到电台，并加入监视列表"""
+    from .importer import FolderImporter
+    from .rescan import LibraryScanner
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"文件夹不存在: {folder}")
+        return 1
+    name = args.playlist or data_handler.current_playlist_name
+    if name not in data_handler.playlists:
+        data_handler.create_playlist(name)
+    seen = set(data_handler.playlists[name])
+    count = 0
+    importer = FolderImporter(library)
+    importer.start(folder)
+    try:
+        while True:
+            files = [path for path in importer.drain() if path not in seen]
+            if files:
+                seen.update(files)
+                count += len(files)
+                data_handler.add_tracks(name, files)
+            if importer.done():
+                break
+            importer.finished.wait(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        importer.cancel()
+        print(f"导入已取消，已添加 {count} 首歌曲")
+        return 1
+    print(f"导入完成: 扫描 {importer.dirs_scanned} 个文件夹，"
+          f"{importer.files_found} 个文件，向电台 {name} 添加 {count} 首歌曲")
+    # 与界面导入相同：加入监视列表并建立第一次快照
+    library.watch_root(folder, name)
+    LibraryScanner(library).rescan(folder)
+    return 0
+
+
+def cmd_scan(args, data_handler, library):
+    """增量扫描所有监视的文件夹，把变化应用到电台"""
+    from .rescan import LibraryScanner
+    started = time.perf_counter()
+    results = LibraryScanner(library).rescan_all()
+    removed = set()
+    added_count = 0
+    for name, added, gone in results:
+        removed.update(gone)
+        if name not in data_handler.playlists:
+            continue
+        existing = set(data_handler.playlists[name])
+        added = [path for path in added if path not in existing]
+        if added:
+            added_count += len(added)
+            data_handler.add_tracks(name, added)
+    removed_count = 0
+    if removed:
+        for name in list(data_handler.playlists.keys()):
+            indices = data_handler.playlists[name].find_indices(removed)
+            if indices:
+                removed_count += len(indices)
+                data_handler.remove_tracks(name, indices)
+    print(f"扫描完成，用时 {time.perf_counter() - started:.2f} 秒: "
+          f"添加 {added_count} 首，删除 {removed_count} 首")
+    return 0
+
+
+def cmd_validate(args, data_handler, library):
+    """检查每个电台中的文件是否存在并且是 MP3/WAV，--fix 时删除无效的歌曲"""
+    from .importer import is_audio_file
+    problems = 0
+    for name in list(data_handler.playlists.keys()):
+        playlist = data_handler.playlists[name]
+        invalid = []
+        for index, path in enumerate(playlist):
+            if not os.path.isfile(path):
+                invalid.append((index, path, "文件不存在"))
+            elif not is_audio_file(path):
+                invalid.append((index, path, "不是MP3/WAV文件"))
+        print(f"{name}: {len(playlist)} 首，无效 {len(invalid)} 首")
+        for index, path, reason in invalid[:MAX_LISTED]:
+            print(f"  {index}: {path}（{reason}）")
+        if len(invalid) > MAX_LISTED:
+            print(f"  ……另有 {len(invalid) - MAX_LISTED} 首")
+        if not invalid:
+            continue
+        if args.fix:
+            data_handler.remove_tracks(name, [index for index, _, _ in invalid])
+            for _, path, _ in invalid:
+                library.mark_missing(path)
+            print(f"  已从电台 {name} 删除 {len(invalid)} 首")
+        else:
+            problems += len(invalid)
+    return 1 if problems else 0
+
+
+def cmd_warm(args, data_handler, library):
+    """预先探测所有电台歌曲的元数据、歌词编码和MP3帧偏移表，写入曲库索引"""
+    names = args.playlist or list(data_handler.playlists.keys())
+    paths = {}
+    for name in names:
+        if name not in data_handler.playlists:
+            print(f"电台不存在: {name}")
+            return 1
+        paths.update(dict.fromkeys(data_handler.playlists[name]))
+    started = time.perf_counter()
+    missing = 0
+    lyrics_count = 0
+    seek_tables = 0
+    for path in paths:
+        track = library.get_track(path)
+        if track is None:
+            missing += 1
+            continue
+        if args.lyrics and (track['lrc_path'] or os.path.exists(os.path.splitext(path)[0] + ".lrc")):
+            if library.load_lyrics(track):
+                lyrics_count += 1
+        if args.seek and library.seek_table(path) is not None:
+            seek_tables += 1
+    print(f"预处理完成，用时 {time.perf_counter() - started:.2f} 秒: {len(paths)} 首歌曲，"
+          f"{lyrics_count} 份歌词，{seek_tables} 个帧偏移表，{missing} 首文件不存在")
+    return 0
+
+
+def cmd_analyze(args, data_handler, library):
+    """在进程池中分析还没有响度数据的歌曲"""
+    from .loudness import LoudnessAnalyzer
+    if not LoudnessAnalyzer.enabled:
+        print("响度分析需要 numpy")
+        return 1
+    paths = library.unanalyzed_tracks()
+    if not paths:
+        print("没有需要分析的歌曲")
+        return 0
+    analyzer = LoudnessAnalyzer(library, args.workers)
+    analyzer.start(paths)
+    try:
+        while not analyzer.done():
+            analyzer.finished.wait(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        analyzer.cancel()
+        analyzer.finished.wait()
+    report = analyzer.report()
+    print(f"响度分析完成: {report['tracks']}/{len(paths)} 首（失败 {report['failed']} 首），"
+          f"用时 {report['seconds']:.1f} 秒，"
+          f"每个进程每分钟 {report['tracks_per_min_per_core']:.1f} 首")
+    return 0
+
+
+def cmd_bench(args):
+    """运行基准测试，可以把结果写入JSON文件供 CI 比较"""
+    from .benchmarks import BENCHMARKS, run_benchmarks
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        print(f"未知的基准测试: {', '.join(unknown)}，可用: {', '.join(BENCHMARKS)}")
+        return 1
+    results = run_benchmarks(args.names)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2, default=str)
+        print(f"基准测试结果已写入 {args.output}")
+    return 0
+
+
+# 需要打开播放列表数据和曲库索引的命令
+DATA_COMMANDS = {
+    'import': cmd_import,
+    'scan': cmd_scan,
+    'validate': cmd_validate,
+    'warm': cmd_warm,
+    'analyze': cmd_analyze,
+}
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog="python -m src.cli",
+                                     description="个人音乐电台的命令行工具（不需要图形界面）")
+    parser.add_argument('--data', default="playlists.json", help="播放列表数据文件")
+    parser.add_argument('--library', default="library.db", help="曲库索引文件")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='命令')
+
+    command = commands.add_parser('import', help="递归导入文件夹并加入监视列表")
+    command.add_argument('folder', help="音乐文件夹")
+    command.add_argument('--playlist', help="导入到的电台，不存在时新建（默认为当前电台）")
+
+    commands.add_parser('scan', help="增量扫描监视的文件夹，同步新增和删除的歌曲")
+
+    command = commands.add_parser('validate', help="检查电台中的文件是否存在且格式有效")
+    command.add_argument('--fix', action='store_true', help="从电台中删除无效的歌曲")
+
+    command = commands.add_parser('warm', help="预先缓存元数据、歌词编码和MP3帧偏移表")
+    command.add_argument('--playlist', action='append', help="只处理指定的电台（可重复）")
+    command.add_argument('--no-lyrics', dest='lyrics', action='store_false', help="不解析歌词")
+    command.add_argument('--no-seek', dest='seek', action='store_false', help="不建立帧偏移表")
+
+    command = commands.add_parser('analyze', help="分析歌曲响度，播放时按增益调整音量")
+    command.add_argument('--workers', type=int, help="进程数（默认为CPU核数）")
+
+    command = commands.add_parser('bench', help="运行基准测试")
+    command.add_argument('names', nargs='*', help="要运行的基准测试（默认全部）")
+    command.add_argument('--output', metavar='REPORT', help="把结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'bench':
+        return cmd_bench(args)
+    data_handler, library = open_data(args)
+    try:
+        return DATA_COMMANDS[args.command](args, data_handler, library)
+    finally:
+        data_handler.close()
+        library.close()
+
+
+if __name__ == "__main__":
+    # 响度分析和流式播放基准使用 spawn 进程
+    multiprocessing.freeze_support()
+    sys.exit(main())
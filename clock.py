@@ -0,0 +1,49 @@
+import time
+
+
+class PlaybackClock:
+    """用单调时钟计算播放位置，跳转、暂停和恢复后都能给出准确的位置"""
+
+    def __init__(self, time_func=time.monotonic):
+        self.time_func = time_func
+        self.base = 0.0         # 开始计时时的播放位置（秒）
+        self.started_at = None  # 开始计时的时刻，停止时为None
+        self.paused_at = None
+        self.waiting = False    # 已发出播放命令，等待声音真正开始
+
+    def start(self, position=0.0, at=None):
+        """从 position 开始计时（开始播放或跳转后调用）；at 为声音实际开始的时刻，默认为现在"""
+        self.base = position
+        self.started_at = self.time_func() if at is None else at
+        self.paused_at = None
+        self.waiting = False
+
+    def hold(self, position):
+        """停在 position 等待播放真正开始，之后再调用 start（流式播放要等第一块解码出来）"""
+        self.base = position
+        self.started_at = None
+        self.paused_at = None
+        self.waiting = True
+
+    def pause(self):
+        if self.started_at is not None and self.paused_at is None:
+            self.paused_at = self.time_func()
+
+    def resume(self):
+        if self.paused_at is not None:
+            # 暂停的时间不计入播放位置
+            self.started_at += self.time_func() - self.paused_at
+            self.paused_at = None
+
+    def stop(self):
+        self.base = 0.0
+        self.started_at = None
+        self.paused_at = None
+        self.waiting = False
+
+    def position(self):
+        """返回当前播放位置（秒）"""
+        if self.started_at is None:
+            return self.base
+        now = self.paused_at if self.paused_at is not None else self.time_func()
+        return self.base + now - self.started_at
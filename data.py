@@ -1,39 +1,505 @@
 import json
 import os
+import time
+import threading
+from array import array
+from collections.abc import MutableMapping
+from .tracks import TrackTable, Playlist
+
+# 最后一次修改后等待多久再保存，以及连续修改时最多推迟多久（秒）
+SAVE_DELAY = 0.5
+SAVE_MAX_DELAY = 2.0
+# 日志模式下，日志超过该大小时合并进分片快照（字节）
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+# 只修改单个电台歌曲的操作，电台尚未加载时可以推迟到加载时再应用
+TRACK_OPS = ('add', 'remove', 'replace')
+
+
+def atomic_write_json(path, data):
+    """先写临时文件再原子替换，写入中途崩溃不会损坏原文件"""
+    temp_file = path + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file, path)
+
+
+def apply_track_op(playlist, op):
+    """把一条歌曲修改应用到列表上"""
+    kind = op['op']
+    if kind == 'add':
+        playlist.extend(op['paths'])
+    elif kind == 'remove':
+        playlist.remove_indices(op['indices'])
+    elif kind == 'replace':
+        playlist[:] = op['paths']
+
+
+class LazyPlaylists(MutableMapping):
+    """电台名称 -> 歌曲列表；名称全部已知，列表在第一次访问时才从磁盘读取"""
+
+    def __init__(self, loader, names=(), lock=None):
+        self.loader = loader
+        self.lock = lock or threading.RLock()
+        self.names = dict.fromkeys(names)
+        self.loaded = {}
+
+    def __getitem__(self, name):
+        with self.lock:
+            playlist = self.loaded.get(name)
+            if playlist is None:
+                if name not in self.names:
+                    raise KeyError(name)
+                playlist = self.loaded[name] = self.loader(name)
+            return playlist
+
+    def __setitem__(self, name, playlist):
+        with self.lock:
+            self.names[name] = None
+            self.loaded[name] = playlist
+
+    def __delitem__(self, name):
+        with self.lock:
+            del self.names[name]
+            self.loaded.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_loaded(self, name):
+        return name in self.loaded
+
+    def loaded_items(self):
+        """已加载的电台，不会触发读取"""
+        with self.lock:
+            return list(self.loaded.items())
+
 
 class DataHandler:
-    def __init__(self, data_file):
+    """播放列表数据的唯一修改入口，负责在后台线程中保存
+
+    默认每次修改后（合并一段时间内的修改）重写整个 JSON 文件；journal=True 时
+    修改以一行 JSON 追加到 <data_file>.journal，日志变大后再合并进分片快照：
+    <data_file 去掉扩展名>.d/ 中的 index.json 保存电台名称和当前电台，
+    每个电台的歌曲单独存为一个文件，启动时只读取当前电台，其余在第一次访问时读取。
+    所有电台共用 tracks.json 中的歌曲表，分片中只保存歌曲编号。
+    """
+
+    def __init__(self, data_file, journal=False):
         self.data_file = data_file
-        self.playlists = {"默认电台": []}
+        self.journal = journal
+        self.journal_file = data_file + ".journal"
+        self.shard_dir = os.path.splitext(data_file)[0] + ".d"
+        self.index_file = os.path.join(self.shard_dir, "index.json")
+        self.tracks_file = os.path.join(self.shard_dir, "tracks.json")
+        # 修改数据和取出待写入内容都在 condition 的锁内进行，写入线程看到的状态总是一致的
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        # 所有电台共用的歌曲表，电台中只保存歌曲编号
+        self.tracks = TrackTable()
+        self.playlists = LazyPlaylists(self._load_shard, lock=self.condition)
+        self.playlists["默认电台"] = Playlist(self.tracks)
         self.current_playlist_name = "默认电台"
-        self.load_data()
+        self.dirty = False          # 需要写入完整快照
+        self.pending_ops = []       # 日志模式下尚未写入的修改
+        self.seq = 0                # 最后一条修改的序号
+        self.journal_size = 0
+        self.snapshot_size = 0
+        # 分片快照的状态
+        self.shards = {}            # 电台名称 -> 分片文件名
+        self.next_shard = 0
+        self.tracks_saved = 0       # 已写入 tracks.json 的歌曲数
+        self.deferred = {}          # 尚未加载的电台 -> 推迟应用的修改
+        self.dirty_playlists = set()
+        self.deleted_shards = []
+        self.first_change = None
+        self.last_change = None
+        self.closed = False
+        self.writer = None
+        with self.condition:
+            self.load_data()
 
     def load_data(self):
+        """读取数据：有分片快照时只读取索引和当前电台，否则读取 JSON 文件"""
+        if self.journal and os.path.exists(self.index_file):
+            self.load_index()
+        else:
+            self.load_json()
+            if self.journal:
+                # 从单个 JSON 文件迁移到分片快照
+                self.dirty_playlists.update(self.playlists)
+                self.dirty = True
+                self._schedule()
+
+        if self.current_playlist_name not in self.playlists:
+            self.current_playlist_name = "默认电台"
+            # 通过 create 操作重建，让它在下次合并时分配分片并写入
+            self._apply({'op': 'create', 'playlist': "默认电台"})
+        # 当前电台立即加载
+        self.playlists[self.current_playlist_name]
+
+    def load_json(self):
+        """读取单个 JSON 文件中的全部电台"""
+        snapshot_seq = 0
         if os.path.exists(self.data_file):
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as file:
                     data = json.load(file)
-                    self.playlists = data.get('playlists', {"默认电台": []})
+                    playlists = data.get('playlists', {"默认电台": []})
                     self.current_playlist_name = data.get('current_playlist_name', "默认电台")
-                    
-                    if self.current_playlist_name not in self.playlists:
-                        self.current_playlist_name = "默认电台"
-                        if "默认电台" not in self.playlists:
-                            self.playlists["默认电台"] = []
+                    snapshot_seq = data.get('journal_seq', 0)
+                self.playlists = LazyPlaylists(self._load_shard, lock=self.condition)
+                for name, paths in playlists.items():
+                    self.playlists[name] = Playlist(self.tracks, paths)
+                self.snapshot_size = os.path.getsize(self.data_file)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"加载播放列表数据时出错: {e}")
-                self.playlists = {"默认电台": []}
-                self.current_playlist_name = "默认电台"
-        else:
-            self.save_data(self.playlists, self.current_playlist_name)
+        elif not self.journal:
+            self.dirty = True
+            self._schedule()
+        self.seq = snapshot_seq
+        if self.journal:
+            self.replay_journal(snapshot_seq)
+
+    def load_index(self):
+        """读取分片快照的索引，电台内容按需加载"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"加载播放列表索引时出错: {e}")
+            return
+        if os.path.exists(self.tracks_file):
+            try:
+                with open(self.tracks_file, 'r', encoding='utf-8') as file:
+                    self.tracks = TrackTable.from_dict(json.load(file))
+                self.tracks_saved = len(self.tracks)
+            except (json.JSONDecodeError, IOError, KeyError) as e:
+                print(f"加载歌曲表时出错: {e}")
+        self.shards = index.get('shards', {})
+        self.next_shard = index.get('next_shard', len(self.shards))
+        self.current_playlist_name = index.get('current_playlist_name', "默认电台")
+        self.playlists = LazyPlaylists(self._load_shard, self.shards, lock=self.condition)
+        self.seq = index.get('journal_seq', 0)
+        self.replay_journal(self.seq)
+
+    def _load_shard(self, name):
+        """读取一个电台的分片并应用推迟的修改（在 LazyPlaylists 的锁内调用）"""
+        playlist = Playlist(self.tracks)
+        shard_seq = 0
+        shard = self.shards.get(name)
+        if shard:
+            try:
+                with open(os.path.join(self.shard_dir, shard), 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                if 'ids' in data:
+                    playlist = Playlist.from_ids(self.tracks, array('I', data['ids']))
+                else:
+                    # 旧格式的分片直接保存路径
+                    playlist.extend(data.get('paths', []))
+                shard_seq = data.get('seq', 0)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"加载电台 {name} 时出错: {e}")
+        for op in self.deferred.pop(name, []):
+            # 分片写入后、索引写入前崩溃时，日志中的旧修改已包含在分片里
+            if op['seq'] > shard_seq:
+                apply_track_op(playlist, op)
+        return playlist
+
+    def replay_journal(self, snapshot_seq):
+        """重放快照之后的修改；最后一行不完整（写入时崩溃）时忽略并截掉它"""
+        if not os.path.exists(self.journal_file):
+            return
+        valid_size = 0
+        last_seq = snapshot_seq
+        try:
+            with open(self.journal_file, 'rb') as file:
+                for line in file:
+                    try:
+                        op = json.loads(line.decode('utf-8'))
+                    except (UnicodeDecodeError, json.JSONDecodeError):
+                        print("播放列表日志末尾不完整，已忽略")
+                        break
+                    valid_size += len(line)
+                    # 合并快照后、清空日志前崩溃时，日志中的旧修改已包含在快照里；
+                    # 追加失败后重试时，已写入的行可能重复出现
+                    if op['seq'] <= last_seq:
+                        continue
+                    self._apply(op)
+                    last_seq = self.seq = op['seq']
+            if valid_size < os.path.getsize(self.journal_file):
+                # 截掉损坏的部分，后续追加的修改才能被正确读取
+                os.truncate(self.journal_file, valid_size)
+            self.journal_size = valid_size
+        except (IOError, OSError, KeyError) as e:
+            print(f"读取播放列表日志时出错: {e}")
+
+    def _apply(self, op):
+        """把一条修改应用到内存中的数据"""
+        kind = op['op']
+        name = op.get('playlist')
+        if kind in TRACK_OPS:
+            self.dirty_playlists.add(name)
+            if self.playlists.is_loaded(name):
+                apply_track_op(self.playlists[name], op)
+            else:
+                # 电台尚未加载，等读取分片时再应用
+                self.deferred.setdefault(name, []).append(op)
+        elif kind == 'create':
+            if name not in self.playlists:
+                self.playlists[name] = Playlist(self.tracks)
+                self.dirty_playlists.add(name)
+        elif kind == 'delete':
+            if name in self.playlists:
+                del self.playlists[name]
+            self.deferred.pop(name, None)
+            self.dirty_playlists.discard(name)
+            shard = self.shards.pop(name, None)
+            if shard:
+                self.deleted_shards.append(shard)
+        elif kind == 'current':
+            self.current_playlist_name = name
+
+    def _modify(self, op):
+        """应用并记录一次修改"""
+        with self.condition:
+            self._apply(op)
+            if self.journal:
+                self.seq += 1
+                op['seq'] = self.seq
+                self.pending_ops.append(op)
+            else:
+                self.dirty = True
+            self._schedule()
+
+    def add_tracks(self, playlist_name, paths):
+        """在电台末尾追加歌曲"""
+        self._modify({'op': 'add', 'playlist': playlist_name, 'paths': list(paths)})
+
+    def remove_tracks(self, playlist_name, indices):
+        """按删除前的位置从电台中删除歌曲"""
+        indices = sorted(set(indices))
+        if indices:
+            self._modify({'op': 'remove', 'playlist': playlist_name, 'indices': indices})
+
+    def replace_tracks(self, playlist_name, paths):
+        """整体替换电台内容（如重新排序）"""
+        self._modify({'op': 'replace', 'playlist': playlist_name, 'paths': list(paths)})
+
+    def create_playlist(self, playlist_name):
+        """新建电台，已存在时保持不变"""
+        self._modify({'op': 'create', 'playlist': playlist_name})
+
+    def delete_playlist(self, playlist_name):
+        """删除电台"""
+        self._modify({'op': 'delete', 'playlist': playlist_name})
+
+    def set_current(self, playlist_name):
+        """记录当前电台"""
+        if playlist_name != self.current_playlist_name:
+            self._modify({'op': 'current', 'playlist': playlist_name})
+
+    def loaded_playlists(self):
+        """已加载到内存中的 (电台名称, 歌曲列表)，不会触发读取"""
+        return self.playlists.loaded_items()
 
     def save_data(self, playlists, current_playlist_name):
-        data = {
-            'playlists': playlists,
-            'current_playlist_name': current_playlist_name
+        """请求保存完整数据；短时间内的多次修改会合并为一次写入，在后台线程中完成"""
+        with self.condition:
+            self.playlists = LazyPlaylists(self._load_shard, lock=self.condition)
+            for name, paths in playlists.items():
+                if not isinstance(paths, Playlist):
+                    paths = Playlist(self.tracks, paths)
+                self.playlists[name] = paths
+            for name in list(self.shards):
+                if name not in self.playlists:
+                    self.deleted_shards.append(self.shards.pop(name))
+            self.deferred.clear()
+            self.dirty_playlists.update(self.playlists)
+            self.current_playlist_name = current_playlist_name
+            self.dirty = True
+            self._schedule()
+
+    def _schedule(self):
+        """在锁内调用：记录修改时间并唤醒写入线程"""
+        if self.closed:
+            return
+        now = time.monotonic()
+        if self.first_change is None:
+            self.first_change = now
+        self.last_change = now
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._writer_loop,
+                                           name="playlist-writer", daemon=True)
+            self.writer.start()
+        self.condition.notify()
+
+    def _has_pending(self):
+        return self.dirty or bool(self.pending_ops)
+
+    def _writer_loop(self):
+        while True:
+            with self.condition:
+                while not self._has_pending() and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                # 等到修改停止 SAVE_DELAY 秒，但最多推迟 SAVE_MAX_DELAY 秒
+                while self._has_pending() and not self.closed:
+                    deadline = min(self.last_change + SAVE_DELAY,
+                                   self.first_change + SAVE_MAX_DELAY)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.closed:
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                # 一次保存失败不能让写入线程退出，否则之后的修改都不会再保存
+                print(f"保存播放列表数据时出错: {e}")
+                with self.condition:
+                    self._retry_later()
+
+    def _retry_later(self):
+        """在锁内调用：保存失败后等待 SAVE_DELAY 秒再重试，而不是立即重试"""
+        self.first_change = self.last_change = time.monotonic()
+
+    def flush(self):
+        """立即写入尚未保存的修改；写入成功后才移除它们，失败时留待下次重试"""
+        with self.write_lock:
+            with self.condition:
+                count = len(self.pending_ops)
+                compact = self.dirty or (
+                    count and self.journal_size > JOURNAL_COMPACT_BYTES)
+                if compact:
+                    # 快照已包含所有待写入的修改
+                    data = self._snapshot()
+                    dirty = self.dirty
+                    self.dirty = False
+                else:
+                    ops = self.pending_ops[:count]
+            try:
+                if compact:
+                    saved = self.write(data)
+                else:
+                    saved = not ops or self.append_journal(ops)
+            except Exception as e:
+                print(f"保存播放列表数据时出错: {e}")
+                saved = False
+            with self.condition:
+                if saved:
+                    # 写入期间的新修改仍在 pending_ops 中，只移除已写入的部分
+                    del self.pending_ops[:count]
+                    self.first_change = self.last_change if self._has_pending() else None
+                    return
+                if compact:
+                    self.dirty = self.dirty or dirty
+                    if self.journal:
+                        # 快照中的电台和待删除的分片在下次合并时重新写入
+                        index, _, shards, deleted = data
+                        self.dirty_playlists.update(
+                            name for name, shard in index['shards'].items() if shard in shards)
+                        self.deleted_shards.extend(deleted)
+                self._retry_later()
+
+    def _snapshot(self):
+        """在锁内复制需要写入的数据"""
+        if not self.journal:
+            return {
+                'playlists': {name: list(paths) for name, paths in self.playlists.items()},
+                'current_playlist_name': self.current_playlist_name,
+            }
+        # 分片快照只复制修改过的电台；还没有分片的电台也一并写入，索引才能引用它
+        shards = {}
+        dirty = self.dirty_playlists.union(
+            name for name in self.playlists if name not in self.shards)
+        for name in dirty:
+            if name not in self.playlists:
+                continue
+            if name not in self.shards:
+                self.shards[name] = f"{self.next_shard:06}.json"
+                self.next_shard += 1
+            shards[self.shards[name]] = {'seq': self.seq,
+                                         'ids': self.playlists[name].ids.tolist()}
+        index = {
+            'current_playlist_name': self.current_playlist_name,
+            'journal_seq': self.seq,
+            'next_shard': self.next_shard,
+            'shards': {name: self.shards[name] for name in self.playlists},
         }
+        # 歌曲表只追加，有新歌曲时才重写
+        tracks = None
+        if len(self.tracks) > self.tracks_saved:
+            tracks = self.tracks.to_dict()
+            self.tracks_saved = len(self.tracks)
+        deleted = self.deleted_shards
+        self.deleted_shards = []
+        self.dirty_playlists = set()
+        return index, tracks, shards, deleted
+
+    def write(self, data):
+        """写入快照，成功时返回True"""
+        try:
+            if not self.journal:
+                atomic_write_json(self.data_file, data)
+                self.snapshot_size = os.path.getsize(self.data_file)
+                return True
+            index, tracks, shards, deleted = data
+            os.makedirs(self.shard_dir, exist_ok=True)
+            # 依次写入歌曲表、分片和索引：分片引用的歌曲编号总已写入歌曲表，
+            # 索引写入前崩溃时仍引用旧的完整分片
+            if tracks is not None:
+                atomic_write_json(self.tracks_file, tracks)
+            for shard, content in shards.items():
+                atomic_write_json(os.path.join(self.shard_dir, shard), content)
+            atomic_write_json(self.index_file, index)
+            for shard in deleted:
+                try:
+                    os.remove(os.path.join(self.shard_dir, shard))
+                except OSError:
+                    pass
+            # 快照记录了序号，清空日志前崩溃也不会重复应用
+            open(self.journal_file, 'w').close()
+            self.journal_size = 0
+        except (IOError, OSError) as e:
+            print(f"保存播放列表数据时出错: {e}")
+            # 下次合并时重新写入完整的歌曲表
+            self.tracks_saved = 0
+            return False
+        return True
+
+    def append_journal(self, ops):
+        """把修改逐行追加到日志文件，成功时返回True"""
+        lines = ''.join(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + '\n'
+                        for op in ops)
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as file:
+                file.write(lines)
+                file.flush()
+                os.fsync(file.fileno())
+                self.journal_size = file.tell()
+        except (IOError, OSError) as e:
+            print(f"写入播放列表日志时出错: {e}")
+            return False
+        return True
+
+    def close(self):
+        """关闭程序前调用：写入未保存的修改并停止写入线程"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=4, ensure_ascii=False)
-        except IOError as e:
-            print(f"保存播放列表数据时出错: {e}") 
\ No newline at end of file
+            self.flush()
+        except Exception as e:
+            print(f"保存播放列表数据时出错: {e}")
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.writer is not None:
+            self.writer.join()
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 支持导入的音频扩展名
+AUDIO_EXTENSIONS = ('.mp3', '.wav')
+# 每个探测任务处理的文件数，保证同一文件夹内的顺序
+PROBE_CHUNK_SIZE = 64
+
+
+def is_audio_file(path):
+    """根据文件头确认是否为 MP3/WAV 文件"""
+    try:
+        with open(path, 'rb') as file:
+            header = file.read(12)
+    except OSError:
+        return False
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return True
+    if header[:3] == b'ID3':
+        return True
+    # 没有ID3标签时，MPEG帧以11位同步字开头
+    return len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0
+
+
+def scan_directory(folder):
+    """列出一个文件夹中的子文件夹和音频文件（不跟随符号链接，避免循环）"""
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(AUDIO_EXTENSIONS) and entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"无法读取文件夹 {folder}: {e}")
+    subdirs.sort()
+    files.sort()
+    return subdirs, files
+
+
+class FolderImporter:
+    """在线程池中递归扫描文件夹并并行探测元数据，结果分批交给界面线程"""
+
+    def __init__(self, library=None, max_workers=None):
+        self.library = library
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+        self.dirs_scanned = 0
+        self.files_found = 0
+        self.files_done = 0
+        self.thread = None
+
+    def start(self, folder):
+        """开始在后台导入"""
+        self.thread = threading.Thread(target=self._run, args=(folder,),
+                                       name="folder-import", daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """取消导入，已在处理的任务会尽快结束"""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _probe_files(self, paths):
+        """确认文件格式并把元数据写入曲库索引，返回有效的文件列表"""
+        valid = []
+        for path in paths:
+            if self.cancel_event.is_set():
+                break
+            if is_audio_file(path):
+                if self.library is not None:
+                    self.library.get_track(path)
+                valid.append(path)
+        return valid, len(paths)
+
+    def _run(self, folder):
+        executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                      thread_name_prefix="import")
+        try:
+            scans = {executor.submit(scan_directory, folder)}
+            probes = set()
+            while (scans or probes) and not self.cancel_event.is_set():
+                done, _ = wait(scans | probes, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in scans:
+                        scans.discard(future)
+                        subdirs, files = future.result()
+                        self.dirs_scanned += 1
+                        self.files_found += len(files)
+                        for subdir in subdirs:
+                            scans.add(executor.submit(scan_directory, subdir))
+                        for start in range(0, len(files), PROBE_CHUNK_SIZE):
+                            probes.add(executor.submit(
+                                self._probe_files, files[start:start + PROBE_CHUNK_SIZE]))
+                    else:
+                        probes.discard(future)
+                        valid, count = future.result()
+                        self.files_done += count
+                        if valid:
+                            self.results.put(valid)
+        except Exception as e:
+            print(f"导入文件夹时出错: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.finished.set()
+
+    def drain(self):
+        """取出目前已经探测完成的文件（在界面线程中调用，不会阻塞）"""
+        paths = []
+        while True:
+            try:
+                paths.extend(self.results.get_nowait())
+            except queue.Empty:
+                return paths
+
+    def done(self):
+        return self.finished.is_set() and self.results.empty()
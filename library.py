@@ -0,0 +1,328 @@
+import os
+import json
+import sqlite3
+import threading
+from .probe import probe_duration, build_seek_table, SeekTable
+from .utils import load_lyrics_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    duration REAL,
+    title TEXT,
+    lrc_path TEXT,
+    missing INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# 监视的文件夹及其每个子文件夹的快照（修改时间、子文件夹名、音频文件名）
+WATCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watched_roots (
+    path TEXT PRIMARY KEY,
+    playlist TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL,
+    files TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_root ON directories (root);
+"""
+
+# 播放次数单独保存，重新探测歌曲元数据时不会被清零
+PLAYS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plays (
+    path TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# 播放设置（如淡入淡出时长），值以 JSON 保存
+SETTINGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+# 旧版本数据库中缺少的列，打开时自动补上
+MIGRATIONS = {
+    'lrc_encoding': 'TEXT',
+    'seek_table': 'BLOB',
+    'loudness': 'REAL',
+    'peak': 'REAL',
+    'gain': 'REAL',
+}
+
+TRACK_COLUMNS = ('path', 'size', 'mtime', 'duration', 'title', 'lrc_path', 'missing',
+                 'lrc_encoding', 'loudness', 'peak', 'gain')
+
+# 重新探测已索引的歌曲时更新的列：只有修改时间变化（复制、同步）时保留响度分析结果
+# 和帧偏移表（以及按它算出的准确时长），文件大小变化说明内容变了，需要重新分析
+STORE_UPDATE = """
+    size = excluded.size,
+    mtime = excluded.mtime,
+    title = excluded.title,
+    lrc_path = excluded.lrc_path,
+    missing = 0,
+    duration = CASE WHEN tracks.size = excluded.size AND tracks.seek_table IS NOT NULL
+                    THEN tracks.duration ELSE excluded.duration END,
+    seek_table = CASE WHEN tracks.size = excluded.size THEN tracks.seek_table END,
+    loudness = CASE WHEN tracks.size = excluded.size THEN tracks.loudness END,
+    peak = CASE WHEN tracks.size = excluded.size THEN tracks.peak END,
+    gain = CASE WHEN tracks.size = excluded.size THEN tracks.gain END
+"""
+
+
+class LibraryIndex:
+    """本地曲库索引，按 (路径, 大小, 修改时间) 缓存每首歌曲的元数据"""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(SCHEMA)
+            self.conn.executescript(WATCH_SCHEMA)
+            self.conn.execute(PLAYS_SCHEMA)
+            self.conn.execute(SETTINGS_SCHEMA)
+            existing = {row[1] for row in self.conn.execute("PRAGMA table_info(tracks)")}
+            for column, column_type in MIGRATIONS.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE tracks ADD COLUMN {column} {column_type}")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
+
+    def _row_to_track(self, row):
+        return dict(zip(TRACK_COLUMNS, row)) if row else None
+
+    def _fetch(self, path):
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(TRACK_COLUMNS)} FROM tracks WHERE path = ?", (path,))
+        return self._row_to_track(cursor.fetchone())
+
+    def lookup(self, path):
+        """查询已缓存的元数据，文件被修改过时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.mark_missing(path)
+            return None
+        with self.lock:
+            track = self._fetch(path)
+        if track and track['size'] == stat.st_size and track['mtime'] == stat.st_mtime:
+            if track['missing']:
+                # 丢失的文件又恢复了
+                self.update(path, missing=0)
+                track['missing'] = 0
+            return track
+        return None
+
+    def get_track(self, path):
+        """获取歌曲元数据，缓存失效时重新探测并写入索引；文件不存在返回None"""
+        track = self.lookup(path)
+        if track is not None:
+            return track
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return self.store(path, stat, probe_track(path))
+
+    def store(self, path, stat, metadata):
+        """写入一首歌曲的元数据，返回完整记录"""
+        track = {
+            'path': path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'duration': metadata.get('duration'),
+            'title': metadata.get('title'),
+            'lrc_path': metadata.get('lrc_path'),
+            'missing': 0,
+            'lrc_encoding': metadata.get('lrc_encoding'),
+            # 响度在后台单独分析
+            'loudness': None,
+            'peak': None,
+            'gain': None,
+        }
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"INSERT INTO tracks ({', '.join(TRACK_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(TRACK_COLUMNS))}) "
+                f"ON CONFLICT(path) DO UPDATE SET {STORE_UPDATE}",
+                tuple(track[column] for column in TRACK_COLUMNS))
+            return self._fetch(path)
+
+    def update(self, path, **fields):
+        """更新已索引歌曲的部分字段"""
+        if not fields:
+            return
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE tracks SET {assignments} WHERE path = ?",
+                              (*fields.values(), path))
+
+    def seek_table(self, path):
+        """返回MP3的帧偏移表，没有缓存时扫描文件建立并写入索引；其他格式返回None
+
+        文件大小变化后重新探测时旧的偏移表随之失效。
+        """
+        if os.path.splitext(path)[1].lower() != '.mp3' or self.get_track(path) is None:
+            return None
+        table = self.cached_seek_table(path)
+        if table is not None:
+            return table
+        try:
+            table = build_seek_table(path)
+        except OSError as e:
+            print(f"建立帧偏移表出错: {e}")
+            return None
+        if table is not None:
+            # 逐帧累加的时长比按首帧码率估算的准确
+            self.update(path, seek_table=table.to_bytes(), duration=table.duration)
+        return table
+
+    def cached_seek_table(self, path):
+        """只读取已缓存的帧偏移表，不扫描文件；没有缓存时返回None"""
+        with self.lock:
+            row = self.conn.execute("SELECT seek_table FROM tracks WHERE path = ?",
+                                    (path,)).fetchone()
+        if row and row[0]:
+            return SeekTable.from_bytes(row[0])
+        return None
+
+    def load_lyrics(self, track):
+        """加载歌曲的歌词，UTF-8之后优先尝试索引中记录的编码，并记住新识别出的编码"""
+        path = track['path']
+        lrc_path = track['lrc_path'] or os.path.splitext(path)[0] + ".lrc"
+        lyrics = load_lyrics_file(lrc_path, track['lrc_encoding'])
+        if lyrics.encoding and lyrics.encoding != track['lrc_encoding']:
+            self.update(path, lrc_encoding=lyrics.encoding)
+            track['lrc_encoding'] = lyrics.encoding
+        return lyrics
+
+    def mark_missing(self, path):
+        """标记文件已丢失"""
+        self.update(path, missing=1)
+
+    def forget(self, paths):
+        """从索引中删除指定歌曲"""
+        with self.lock, self.conn:
+            paths = [(path,) for path in paths]
+            self.conn.executemany("DELETE FROM tracks WHERE path = ?", paths)
+            self.conn.executemany("DELETE FROM plays WHERE path = ?", paths)
+
+    def cached_tracks(self, paths):
+        """批量读取已缓存的记录（不访问文件系统），返回 {路径: 记录}"""
+        result = {}
+        paths = list(paths)
+        # SQLite 单条语句的参数个数有限，分批查询
+        batch_size = 500
+        with self.lock:
+            for i in range(0, len(paths), batch_size):
+                batch = paths[i:i + batch_size]
+                cursor = self.conn.execute(
+                    f"SELECT {', '.join(TRACK_COLUMNS)} FROM tracks "
+                    f"WHERE path IN ({', '.join('?' * len(batch))})", batch)
+                for row in cursor:
+                    track = self._row_to_track(row)
+                    result[track['path']] = track
+        return result
+
+    def unanalyzed_tracks(self):
+        """返回还没有分析响度的歌曲路径"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT path FROM tracks WHERE loudness IS NULL AND missing = 0")]
+
+    def max_gain(self):
+        """已分析歌曲中最大的响度增益（dB），没有分析过的歌曲时返回None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT MAX(gain) FROM tracks WHERE missing = 0").fetchone()[0]
+
+    def record_play(self, path):
+        """播放次数加一"""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT INTO plays (path, count) VALUES (?, 1) "
+                              "ON CONFLICT(path) DO UPDATE SET count = count + 1", (path,))
+
+    def play_counts(self, paths):
+        """批量读取播放次数，返回 {路径: 次数}，没有播放过的歌曲不在结果中"""
+        result = {}
+        paths = list(paths)
+        batch_size = 500
+        with self.lock:
+            for i in range(0, len(paths), batch_size):
+                batch = paths[i:i + batch_size]
+                result.update(self.conn.execute(
+                    f"SELECT path, count FROM plays WHERE path IN ({', '.join('?' * len(batch))})",
+                    batch))
+        return result
+
+    def get_setting(self, key, default=None):
+        """读取一项播放设置，没有保存过时返回 default"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_setting(self, key, value):
+        """保存一项播放设置"""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                              (key, json.dumps(value)))
+
+    def watched_roots(self):
+        """返回 {监视的文件夹: 对应电台}"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT path, playlist FROM watched_roots"))
+
+    def watch_root(self, path, playlist):
+        """把文件夹加入监视列表，新发现的歌曲会加入 playlist"""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO watched_roots (path, playlist) VALUES (?, ?)",
+                              (path, playlist))
+
+    def unwatch_root(self, path):
+        """取消监视文件夹并删除它的快照"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM watched_roots WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM directories WHERE root = ?", (path,))
+
+    def directory_snapshot(self, root):
+        """读取监视文件夹的快照，返回 {文件夹: (修改时间, 子文件夹名列表, 文件名列表)}"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT path, mtime_ns, subdirs, files FROM directories WHERE root = ?", (root,))
+            return {path: (mtime_ns, json.loads(subdirs), json.loads(files))
+                    for path, mtime_ns, subdirs, files in cursor}
+
+    def update_snapshot(self, root, changed, removed):
+        """写入有变化的文件夹快照并删除已不存在的文件夹"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO directories (path, root, mtime_ns, subdirs, files) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((path, root, mtime_ns, json.dumps(subdirs, ensure_ascii=False),
+                  json.dumps(files, ensure_ascii=False))
+                 for path, (mtime_ns, subdirs, files) in changed.items()))
+            self.conn.executemany("DELETE FROM directories WHERE path = ?",
+                                  ((path,) for path in removed))
+
+
+def probe_track(path):
+    """探测一首歌曲的元数据（时长、标题、歌词位置）"""
+    lrc_path = os.path.splitext(path)[0] + ".lrc"
+    return {
+        'duration': probe_duration(path),
+        'title': os.path.splitext(os.path.basename(path))[0],
+        'lrc_path': lrc_path if os.path.exists(lrc_path) else None,
+    }
@@ -0,0 +1,253 @@
+import os
+import time
+import wave
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from .stream import FFMPEG, iter_ffmpeg
+
+# 响度归一化的目标（LUFS，与 ReplayGain 2.0 的参考响度相同）
+TARGET_LOUDNESS = -18.0
+# 按 EBU R128：100 毫秒子块，4 个子块组成一个 400 毫秒的门限块（重叠 75%）
+SUBBLOCK_SECONDS = 0.1
+SUBBLOCKS_PER_BLOCK = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+# 混音器音量不能超过1，播放时所有增益都减去曲库中最大的增益（参考增益），
+# 较轻的歌曲才能真正被调响；参考增益有上限，个别极轻的歌曲不会让整个曲库变轻
+MAX_REFERENCE_GAIN = 15.0
+# 播放器后台分析时进程的 nice 值（Windows 上使用“低于正常”优先级）
+BACKGROUND_NICE = 10
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+# ffmpeg 解码时使用的格式，以及每次读取的时长（秒）
+DECODE_RATE = 48000
+DECODE_SECONDS = 10
+
+
+def k_weighting_response(freq, bins, block_size):
+    """返回 K 计权滤波器（高架 + 高通两个二阶节）在 rfft 各频点上的功率响应"""
+    # 系数公式与 libebur128 相同，可用于任意采样率
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / freq)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / freq)
+    a0 = 1 + k / q + k * k
+    pass_b = [1.0, -2.0, 1.0]
+    pass_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    z = np.exp(-2j * np.pi * np.arange(bins) / block_size)
+    response = np.ones(bins, dtype=np.complex128)
+    for b, a in ((shelf_b, shelf_a), (pass_b, pass_a)):
+        response *= (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return np.abs(response) ** 2
+
+
+class LoudnessMeter:
+    """逐块累计 K 计权后的子块能量和峰值，最后按双重门限计算整体响度"""
+
+    def __init__(self, freq):
+        self.freq = freq
+        self.block_size = int(freq * SUBBLOCK_SECONDS)
+        self.weights = k_weighting_response(freq, self.block_size // 2 + 1, self.block_size)
+        self.powers = []
+        self.peak = 0.0
+        self.remainder = None
+
+    def add(self, samples):
+        """加入形状为 (帧数, 声道数) 的 int16 数据"""
+        if self.remainder is not None:
+            samples = np.concatenate([self.remainder, samples])
+        count = len(samples) // self.block_size
+        self.remainder = samples[count * self.block_size:]
+        if len(samples):
+            self.peak = max(self.peak, float(np.abs(samples).max()) / 32768)
+        if not count:
+            return
+        blocks = samples[:count * self.block_size].astype(np.float32) / 32768
+        # (子块, 样本, 声道) -> 按频点加权后求每个子块的均方能量，各声道相加
+        blocks = blocks.reshape(count, self.block_size, -1)
+        spectrum = np.fft.rfft(blocks, axis=1)
+        energy = (np.abs(spectrum) ** 2) * self.weights[None, :, None]
+        # rfft 只有一半频点：除直流和奈奎斯特外的频点计两次（Parseval 定理）
+        energy[:, 1:(self.block_size + 1) // 2] *= 2
+        power = energy.sum(axis=1) / (self.block_size * self.block_size)
+        self.powers.append(power.sum(axis=1))
+
+    def integrated(self):
+        """返回整体响度（LUFS），没有超过绝对门限的内容时返回None"""
+        if not self.powers:
+            return None
+        powers = np.concatenate(self.powers)
+        if len(powers) < SUBBLOCKS_PER_BLOCK:
+            blocks = powers[None, :].mean(axis=1)
+        else:
+            # 每个门限块是连续 4 个子块的平均能量
+            window = np.ones(SUBBLOCKS_PER_BLOCK) / SUBBLOCKS_PER_BLOCK
+            blocks = np.convolve(powers, window, mode='valid')
+        loudness = -0.691 + 10 * np.log10(np.maximum(blocks, 1e-12))
+        gated = blocks[loudness > ABSOLUTE_GATE]
+        if not len(gated):
+            return None
+        relative = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+        gated = blocks[(loudness > ABSOLUTE_GATE) & (loudness > relative)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def iter_blocks(path):
+    """按块解码歌曲，产生 (采样率, (帧数, 声道数) 的 int16 数组)"""
+    if os.path.splitext(path)[1].lower() == '.wav':
+        try:
+            with wave.open(path, 'rb') as file:
+                if file.getsampwidth() == 2:
+                    freq = file.getframerate()
+                    channels = file.getnchannels()
+                    while True:
+                        data = file.readframes(freq * DECODE_SECONDS)
+                        if not data:
+                            return
+                        yield freq, np.frombuffer(data, dtype='<i2').reshape(-1, channels)
+        except (wave.Error, EOFError):
+            pass
+    if FFMPEG is not None:
+        for data in iter_ffmpeg(path, 0, DECODE_RATE * DECODE_SECONDS * 4, DECODE_RATE, 2):
+            yield DECODE_RATE, np.frombuffer(data, dtype='<i2').reshape(-1, 2)
+        return
+    # 没有 ffmpeg 时用 pygame 整首解码（需要先在进程中初始化混音器）
+    import pygame
+    if not pygame.mixer.get_init():
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(frequency=DECODE_RATE, size=-16, channels=2)
+    samples = pygame.sndarray.array(pygame.mixer.Sound(path))
+    yield pygame.mixer.get_init()[0], samples.reshape(len(samples), -1)
+
+
+def track_gain(loudness, peak):
+    """达到目标响度所需的增益（dB），不超过峰值允许的范围以免削波"""
+    gain = TARGET_LOUDNESS - loudness
+    if peak > 0:
+        gain = min(gain, -20 * np.log10(peak))
+    return float(gain)
+
+
+def reference_gain(max_gain):
+    """由曲库中最大的增益（dB）确定参考增益，所有增益都不大于0时为0"""
+    return min(max(max_gain or 0.0, 0.0), MAX_REFERENCE_GAIN)
+
+
+def playback_gain(gain, reference):
+    """播放时使用的线性音量倍数（不超过1）；未分析的歌曲按增益为0处理"""
+    return min(1.0, 10 ** (((gain or 0.0) - reference) / 20))
+
+
+def analyze_track(path):
+    """计算一首歌曲的整体响度、峰值和增益，在进程池中执行；无法解码时返回None"""
+    meter = None
+    try:
+        for freq, samples in iter_blocks(path):
+            if meter is None:
+                meter = LoudnessMeter(freq)
+            meter.add(samples)
+    except Exception as e:
+        print(f"分析响度出错 {path}: {e}")
+        return None
+    loudness = meter.integrated() if meter is not None else None
+    if loudness is None:
+        return None
+    return {'loudness': loudness, 'peak': meter.peak, 'gain': track_gain(loudness, meter.peak)}
+
+
+def background_workers():
+    """播放器后台分析使用的进程数：留出一个核给播放和界面"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def lower_priority():
+    """进程池的初始化函数：降低分析进程的优先级，不与播放和界面争抢CPU"""
+    try:
+        if hasattr(os, 'nice'):
+            os.nice(BACKGROUND_NICE)
+        elif os.name == 'nt':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+    except (OSError, AttributeError) as e:
+        print(f"无法降低响度分析进程的优先级: {e}")
+
+
+class LoudnessAnalyzer:
+    """在进程池中批量分析歌曲响度，结果写入曲库索引"""
+
+    # 没有 numpy 时不做响度分析
+    enabled = np is not None
+
+    def __init__(self, library, max_workers=None, low_priority=False):
+        self.library = library
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.low_priority = low_priority
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+        self.total = 0
+        self.done_count = 0
+        self.failed = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self.thread = None
+
+    def start(self, paths):
+        """开始在后台分析"""
+        self.total = len(paths)
+        self.thread = threading.Thread(target=self._run, args=(list(paths),),
+                                       name="loudness", daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def done(self):
+        return self.finished.is_set()
+
+    def _run(self, paths):
+        self.started_at = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                       mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=lower_priority if self.low_priority else None)
+        try:
+            futures = {executor.submit(analyze_track, path): path for path in paths}
+            for future in as_completed(futures):
+                if self.cancel_event.is_set():
+                    break
+                result = future.result()
+                self.done_count += 1
+                if result is None:
+                    self.failed += 1
+                else:
+                    self.library.update(futures[future], **result)
+                self.elapsed = time.perf_counter() - self.started_at
+        except Exception as e:
+            print(f"分析响度时出错: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.elapsed = time.perf_counter() - self.started_at
+            self.finished.set()
+
+    def report(self):
+        """返回分析吞吐量：每个进程每分钟分析的歌曲数"""
+        minutes = self.elapsed / 60
+        per_minute = self.done_count / minutes if minutes else 0.0
+        return {
+            'tracks': self.done_count,
+            'failed': self.failed,
+            'workers': self.max_workers,
+            'seconds': self.elapsed,
+            'tracks_per_min': per_minute,
+            'tracks_per_min_per_core': per_minute / self.max_workers,
+        }
@@ -1,10 +1,61 @@
-import tkinter as tk
-import pygame
-from src.player import MusicPlayer
-from src.ui import setup_ui, COLORS
 import time
+PROCESS_START = time.perf_counter()
+
 import os
 import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from src.profiling import StartupProfiler
+
+profiler = StartupProfiler(origin=PROCESS_START)
+
+# pygame、播放器模块和各种对话框都在需要时才导入，启动画面只依赖 Tk 和界面配色
+with profiler.measure_import('tkinter'):
+    import tkinter as tk
+with profiler.measure_import('src.ui'):
+    from src.ui import COLORS
+
+def init_audio():
+    """导入 pygame 和播放器模块，并初始化混音器"""
+    with profiler.measure_import('pygame'):
+        import pygame
+    with profiler.phase('mixer_init'):
+        pygame.mixer.init()
+    with profiler.measure_import('src.utils'):
+        import src.utils
+    with profiler.measure_import('src.probe'):
+        import src.probe
+    with profiler.measure_import('src.prefetch'):
+        import src.prefetch
+    with profiler.measure_import('src.transition'):
+        import src.transition
+    with profiler.measure_import('src.player'):
+        import src.player
+
+def load_playlists():
+    """加载播放列表数据"""
+    with profiler.measure_import('src.data'):
+        from src.data import DataHandler
+    return DataHandler("playlists.json", journal=True)
+
+def open_library():
+    """打开曲库索引"""
+    with profiler.measure_import('src.library'):
+        from src.library import LibraryIndex
+    return LibraryIndex("library.db")
+
+# 可以在后台线程中并行执行的启动步骤：(结果名称, 说明, 函数)
+STARTUP_STAGES = [
+    ('audio', "初始化音频", init_audio),
+    ('data_handler', "加载播放列表", load_playlists),
+    ('library', "打开曲库索引", open_library),
+]
+
+def run_stage(name, func):
+    """在后台线程中执行一个启动步骤并记录耗时"""
+    with profiler.phase(name):
+        return func()
 
 def resource_path(relative_path):
     """获取资源的绝对路径"""
@@ -17,8 +68,11 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class SplashScreen:
-    def __init__(self, parent):
+    def __init__(self, parent, exit_after_startup=False, streaming=False):
         self.parent = parent
+        self.exit_after_startup = exit_after_startup
+        self.streaming = streaming
+        self.app = None
         self.splash = tk.Toplevel(parent)
         self.splash.overrideredirect(True)
         
@@ -75,7 +129,18 @@ class SplashScreen:
                                                   font=('Helvetica', 12),
                                                   fill=COLORS['text'])
         
+        # 启动步骤与渐入动画同时进行
+        self.closing = False
+        self.results = {}
+        self.executor = ThreadPoolExecutor(max_workers=len(STARTUP_STAGES),
+                                           thread_name_prefix="startup")
+        self.futures = {name: (label, self.executor.submit(run_stage, name, func))
+                        for name, label, func in STARTUP_STAGES}
+        # 后台步骤加上主线程中的界面构建
+        self.total_steps = len(STARTUP_STAGES) + 1
+
         self.fade_in()
+        self.poll_loading()
 
     def create_gradient_background(self, width, height):
         """创建渐变背景"""
@@ -117,13 +182,13 @@ class SplashScreen:
 
     def fade_in(self):
         """实现渐入效果"""
+        if self.closing:
+            return  # 加载已完成，直接开始渐出
         alpha = self.splash.attributes('-alpha')
         if alpha < 1.0:
             alpha += 0.1
             self.splash.attributes('-alpha', alpha)
-            self.splash.after(50, self.fade_in)
-        else:
-            self.simulate_loading()
+            self.splash.after(30, self.fade_in)
 
     def update_progress(self, value):
         """更新进度条"""
@@ -134,11 +199,45 @@ class SplashScreen:
                          x, self.canvas.winfo_height()//2+10)
         self.canvas.update()
 
-    def simulate_loading(self):
-        """模拟加载过程"""
-        for i in range(11):
-            self.update_progress(i/10)
-            time.sleep(0.1)
+    def poll_loading(self):
+        """根据后台启动步骤的实际完成情况更新进度条"""
+        pending = []
+        for name, (label, future) in self.futures.items():
+            if future.done():
+                try:
+                    self.results[name] = future.result()
+                except Exception as e:
+                    self.fail(label, e)
+                    return
+            else:
+                pending.append(label)
+        self.update_progress(len(self.results) / self.total_steps)
+
+        if pending:
+            self.canvas.itemconfig(self.loading_text, text=f"正在{'、'.join(pending)}...")
+            self.splash.after(20, self.poll_loading)
+        else:
+            self.executor.shutdown(wait=False)
+            self.canvas.itemconfig(self.loading_text, text="正在构建界面...")
+            self.splash.after_idle(self.finish_loading)
+
+    def fail(self, label, error):
+        """启动步骤出错（如没有音频设备）时提示并退出，而不是停在启动画面"""
+        from tkinter import messagebox
+        self.executor.shutdown(wait=False)
+        self.splash.withdraw()
+        messagebox.showerror("错误", f"{label}失败: {error}")
+        data_handler = self.results.get('data_handler')
+        if data_handler is not None:
+            data_handler.close()
+        self.parent.destroy()
+        sys.exit(1)
+
+    def finish_loading(self):
+        """在主线程中构建界面，完成后立即关闭启动画面"""
+        self.closing = True
+        self.show_main_window()
+        self.update_progress(1.0)
         self.fade_out()
 
     def fade_out(self):
@@ -147,32 +246,59 @@ class SplashScreen:
         if alpha > 0.0:
             alpha -= 0.1
             self.splash.attributes('-alpha', alpha)
-            self.splash.after(50, self.fade_out)
+            self.splash.after(30, self.fade_out)
         else:
             self.splash.destroy()
-            self.show_main_window()
+            profiler.mark('startup_complete')
+            profiler.write_report()
+            if self.exit_after_startup:
+                self.app.on_closing()
 
     def show_main_window(self):
         """显示主窗口"""
         self.parent.deiconify()  # 显示主窗口
-        setup_main_window(self.parent)
+        with profiler.phase('build_ui'):
+            self.app = setup_main_window(self.parent, self.results['data_handler'],
+                                         self.results['library'], streaming=self.streaming)
+        profiler.mark('main_window_ready')
 
-def setup_main_window(root):
+def setup_main_window(root, data_handler=None, library=None, streaming=False):
     """设置主窗口"""
-    # 初始化 Pygame 混音器
-    pygame.mixer.init()
+    import pygame
+    from src.player import MusicPlayer
+    from src.ui import setup_ui
+
+    # 混音器通常已由启动画面在后台初始化
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
     
-    app = MusicPlayer(root)
+    app = MusicPlayer(root, data_handler=data_handler, library=library, streaming=streaming)
     setup_ui(app)
     
-    def on_closing():
-        pygame.mixer.quit()
-        root.destroy()
-    
-    root.protocol("WM_DELETE_WINDOW", on_closing)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    return app
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="个人音乐电台")
+    parser.add_argument('--profile-startup', nargs='?', const='startup_profile.json',
+                        metavar='REPORT', help="记录启动各阶段和模块导入耗时并写入JSON报告")
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help="启动完成后立即退出（配合 --profile-startup 做启动耗时回归测试）")
+    parser.add_argument('--stream', action='store_true',
+                        help="在独立进程中流式解码播放，内存占用与歌曲长度无关")
+    # PyInstaller 等启动器可能附加额外参数，忽略无法识别的参数
+    args, _ = parser.parse_known_args(argv)
+    return args
 
 def main():
-    root = tk.Tk()
+    args = parse_args()
+    if args.profile_startup:
+        profiler.enabled = True
+        profiler.report_path = args.profile_startup
+
+    with profiler.phase('create_root'):
+        root = tk.Tk()
     root.title("个人音乐电台")
     root.geometry("1200x900")
     
@@ -201,9 +327,13 @@ def main():
     root.withdraw()
     
     # 显示启动画面
-    splash = SplashScreen(root)
+    splash = SplashScreen(root, exit_after_startup=args.exit_after_startup,
+                          streaming=args.stream)
+    profiler.mark('splash_created')
     
     root.mainloop()
 
 if __name__ == "__main__":
+    # 打包后的程序启动解码子进程时需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
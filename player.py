@@ -1,27 +1,124 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog, simpledialog
+from tkinter import messagebox, filedialog
 import os
-import random
+import math
+import threading
+import bisect
+import queue
 import pygame
 from .data import DataHandler
-from .utils import parse_lyrics, format_time
+from .utils import Lyrics, format_time
+from .library import LibraryIndex
+from .prefetch import Prefetcher
+from .transition import TransitionEngine
+from .visualizer import SpectrumVisualizer
+from .search import SearchIndex
+from .rescan import LibraryScanner
+from .shuffle import ShuffleEngine
+from .clock import PlaybackClock
+from .probe import OffsetFile
+from .stream import FFMPEG, StreamMusic
+from .loudness import LoudnessAnalyzer, background_workers, reference_gain, playback_gain
 from .ui import COLORS
 
+# 歌曲播放结束（或队列中的下一首开始）时 pygame 发出的事件
+MUSIC_END_EVENT = pygame.USEREVENT + 1
+
+# 进度计时器两次唤醒之间的最短和最长间隔（秒）
+MIN_TICK_INTERVAL = 0.02
+MAX_TICK_INTERVAL = 1.0
+# 排队的下一首即将开始时检查切歌的间隔（秒）
+QUEUE_POLL_INTERVAL = 0.05
+# 导入文件夹时刷新进度的间隔（毫秒）
+IMPORT_POLL_INTERVAL = 100
+# 启动后首次扫描监视文件夹的延迟，以及之后定期扫描的间隔（毫秒）
+RESCAN_DELAY = 3000
+RESCAN_INTERVAL = 5 * 60 * 1000
+# 后台响度分析的进度检查间隔（毫秒）
+ANALYSIS_POLL_INTERVAL = 1000
+
 class MusicPlayer:
-    def __init__(self, root):
+    def __init__(self, root, data_handler=None, library=None, streaming=False):
         self.root = root
         self.is_dragging = False
         self.current_song_length = 0
-        self.position_flag = 0
+        self.clock = PlaybackClock()
+        self.seek_file = None
         self.current_playlist_name = None
         self.current_playlist = []
         self.current_song_index = 0
+        self.next_song_index = None
+        self.is_playing = False
+        self.is_paused = False
+        self.last_pos = 0
+        self.progress_job = None
         self.play_mode = "list_loop"
-        self.lyrics = []
+        self.volume = 1.0
+        self.track_gain = 1.0  # 当前歌曲的响度归一化增益（线性倍数）
+        self.queued_gain = None  # 无缝衔接排队的下一首的增益
+        self.lyrics = Lyrics()
+        self.current_lyric_index = None
         self.playlists = {}
 
-        self.data_handler = DataHandler("playlists.json")
+        self.data_handler = data_handler or DataHandler("playlists.json", journal=True)
+        self.library = library or LibraryIndex("library.db")
+        # 响度归一化的参考增益，分析完新歌曲后更新
+        self.reference_gain = reference_gain(self.library.max_gain())
+        self.prefetcher = Prefetcher(self.library)
+        self.music = pygame.mixer.music
+        self.streaming = streaming and self.setup_streaming()
+        # 淡入淡出时长保存在曲库索引中，下次启动时沿用
+        self.transition = TransitionEngine(self.library.get_setting('crossfade_ms', 0),
+                                           music=self.music)
+        self.visualizer = SpectrumVisualizer(self.library)
+        if self.streaming:
+            # 频谱直接从播放的PCM块计算，不再整首解码
+            self.visualizer.live = True
+            self.music.add_tap(self.visualizer.feed)
+        self.end_event_enabled = self.setup_end_event()
+        self.search_index = SearchIndex()
+        self.search_results = None
+        self.importer = None
+        self.scanner = LibraryScanner(self.library)
+        self.rescan_results = queue.Queue()
+        self.rescan_thread = None
+        self.rescan_job = None
+        self.search_index_thread = None
+        self.analyzer = None
+        self.analysis_failed = set()
+        self.shuffle = ShuffleEngine()
+        self.shuffle.weight_func = self.track_weights
         self.load_data()
+        # 启动后检查监视的文件夹中的变化
+        self.rescan_job = self.root.after(RESCAN_DELAY, self.rescan_library)
+
+    def setup_end_event(self):
+        """注册播放结束事件；pygame 只有在事件子系统初始化后才会发出该事件"""
+        try:
+            if not pygame.display.get_init():
+                # pygame 的事件队列属于 display 模块，只有初始化 display 才能收到音乐结束事件；
+                # 这里不创建任何窗口，界面仍然全部由 Tk 负责
+                pygame.display.init()
+            self.music.set_endevent(MUSIC_END_EVENT)
+            return True
+        except pygame.error as e:
+            print(f"无法注册播放结束事件，改用轮询检测: {e}")
+            return False
+
+    def setup_streaming(self):
+        """启用流式播放后端，失败时继续使用 pygame.mixer.music"""
+        try:
+            self.music = StreamMusic()
+        except (pygame.error, OSError) as e:
+            print(f"无法启用流式播放，改用默认播放方式: {e}")
+            return False
+        if FFMPEG is None:
+            # 只有与混音器格式相同的WAV能直接流式读取，其余文件仍整首加载
+            message = "未找到 ffmpeg，MP3 等文件将整首加载播放，内存占用会随歌曲长度增加。\n" \
+                      "请安装 ffmpeg 或把 ffmpeg 放在程序所在的文件夹中。"
+            print(message)
+            messagebox.showwarning("流式播放", message)
+        return True
 
     def load_data(self):
         """加载播放列表数据"""
@@ -29,10 +126,25 @@ class MusicPlayer:
         self.current_playlist_name = self.data_handler.current_playlist_name
         if self.current_playlist_name and self.current_playlist_name in self.playlists:
             self.current_playlist = self.playlists[self.current_playlist_name]
+        self.shuffle.reset(len(self.current_playlist))
 
-    def save_data(self):
-        """保存播放列表数据"""
-        self.data_handler.save_data(self.playlists, self.current_playlist_name)
+    def on_closing(self):
+        """释放资源、写入未保存的数据并关闭程序"""
+        self.cancel_import()
+        if self.analyzer is not None:
+            self.analyzer.cancel()
+        stats = self.prefetcher.stats()
+        if stats['hits'] or stats['misses']:
+            print(f"预加载命中 {stats['hits']} 次，未命中 {stats['misses']} 次")
+        self.prefetcher.shutdown()
+        self.transition.shutdown()
+        self.visualizer.shutdown()
+        if self.streaming:
+            self.music.shutdown()
+        self.data_handler.close()
+        pygame.mixer.quit()
+        self.close_seek_file()
+        self.root.destroy()
 
     def play_music(self):
         """播放音乐"""
@@ -90,105 +202,264 @@ class MusicPlayer:
         
         self._start_playing()
 
-    def _start_playing(self, start_pos=0):
+    def _start_playing(self, start_pos=0, fade_ms=0):
         """开始播放音乐"""
         if not self.current_playlist:
             return
         song_path = self.current_playlist[self.current_song_index]
-        lrc_path = os.path.splitext(song_path)[0] + ".lrc"
 
         try:
-            pygame.mixer.music.load(song_path)
-            sound = pygame.mixer.Sound(song_path)
-            self.current_song_length = sound.get_length()
+            self.music.load(song_path)
+            self.close_seek_file()
         except pygame.error as e:
             messagebox.showerror("错误", f"无法加载音乐文件: {e}")
             return
 
+        if not self._activate_track(song_path):
+            return
+
+        self.music.play(start=start_pos, fade_ms=fade_ms)
+        self.start_clock(start_pos)
+        self.is_playing = True
+        self.is_paused = False
+        self._on_track_started(start_pos)
+        if hasattr(self, 'wave_animation'):
+            self.wave_animation.start()
+        self.update_progress()
+
+    def _activate_track(self, song_path):
+        """准备当前歌曲的时长、歌词和界面显示"""
+        # 预加载命中时只需处理内存中的数据
+        prefetched = self.prefetcher.take(song_path)
+        if prefetched:
+            track, lyrics = prefetched
+        else:
+            # 先查询曲库索引，只有缓存失效时才重新探测文件
+            track = self.library.get_track(song_path)
+            lyrics = None
+            if track is not None and not self.streaming:
+                # 帧偏移表要扫描整个文件，在后台建立，拖动进度条时直接使用
+                self.prefetcher.index_seek_table(song_path)
+        if track is None:
+            messagebox.showerror("错误", f"音乐文件不存在: {song_path}")
+            return False
+
+        self.track_gain = playback_gain(track['gain'], self.reference_gain)
+
+        duration = track['duration']
+        if duration is None:
+            # 文件头无法解析时才完整解码，并把结果写回索引
+            try:
+                sound = pygame.mixer.Sound(song_path)
+            except pygame.error as e:
+                messagebox.showerror("错误", f"无法加载音乐文件: {e}")
+                return False
+            duration = sound.get_length()
+            self.library.update(song_path, duration=duration)
+        self.current_song_length = duration
+
         if hasattr(self, 'progress'):
             self.progress['maximum'] = self.current_song_length
+            self.progress['value'] = 0
 
         self.update_time_label(0, self.current_song_length)
 
-        # 加载歌词文件 - 尝试不同的编码方式
-        print(f"尝试加载歌词文件: {lrc_path}")
-        if os.path.exists(lrc_path):
-            encodings = ['utf-8', 'gbk', 'gb2312', 'ansi']
-            for encoding in encodings:
-                try:
-                    with open(lrc_path, 'r', encoding=encoding) as file:
-                        lrc_content = file.read()
-                        print(f"使用 {encoding} 编码成功读取歌词")
-                        self.lyrics = parse_lyrics(lrc_content)
-                        if self.lyrics:  # 如果成功解析到歌词
-                            break
-                except UnicodeDecodeError:
-                    continue
-                except Exception as e:
-                    print(f"使用 {encoding} 编码读取歌词出错: {e}")
-            
-            if not self.lyrics:
-                print("无法使用任何编码方式正确读取歌词")
+        if lyrics is None:
+            lyrics = self.library.load_lyrics(track)
+        self.set_lyrics(lyrics)
+        self.visualizer.load(song_path)
+
+        self.select_current_row()
+        self.shuffle.started(self.current_song_index)
+        self.library.record_play(song_path)
+        # 偏好随机的权重来自播放次数，下一首要按更新后的次数抽取
+        self.shuffle.played()
+        return True
+
+    def select_current_row(self):
+        """在列表中选中正在播放的歌曲；显示搜索结果时选中它对应的结果行，不在结果中时取消选中"""
+        if not hasattr(self, 'listbox'):
+            return
+        row = self.current_song_index
+        if self.search_results is not None:
+            current = (self.current_playlist_name, self.current_playlist[self.current_song_index])
+            row = next((index for index, result in enumerate(self.search_results)
+                        if result == current), None)
+            if row is None:
+                # 否则删除“选中”的行时会删掉另一首歌
+                self.listbox.selection_clear()
+                return
+        self.listbox.selection_set(row)
+        self.listbox.see(row)
+
+    def _on_track_started(self, start_pos):
+        """歌曲开始播放后，记录起始时刻并为下一首做准备"""
+        self.last_pos = 0
+        self.transition.track_started(start_pos, self.current_song_length)
+        self.prefetch_next()
+        next_path = self.prepare_transition()
+        self.visualizer.prefetch(next_path)
+
+    def prepare_transition(self):
+        """为切换到下一首做准备并返回它的路径；无缝衔接时记下下一首的增益"""
+        next_path = self.current_playlist[self.peek_next_index()]
+        self.transition.prepare(self.current_playlist[self.current_song_index], next_path)
+        self.queued_gain = None
+        if self.transition.queued_path is not None:
+            self.queued_gain = self.cached_gain(next_path)
+        self.apply_volume()
+        return next_path
+
+    def cached_gain(self, path):
+        """从曲库索引中读取歌曲的播放增益，不访问文件"""
+        track = self.library.cached_tracks([path]).get(path)
+        return playback_gain(track['gain'] if track else None, self.reference_gain)
+
+    def get_position(self):
+        """返回当前播放位置（秒）"""
+        if not self.is_playing:
+            return 0
+        self.sync_clock()
+        return max(0, min(self.clock.position(), self.current_song_length))
+
+    def start_clock(self, position):
+        """播放或跳转后开始计时；流式播放时先停在 position，等第一块实际开始播放"""
+        if self.streaming:
+            self.clock.hold(position)
+            self.sync_clock()
         else:
-            print(f"歌词文件不存在: {lrc_path}")
-            self.lyrics = []
+            self.clock.start(position)
 
-        if hasattr(self, 'lyrics_text'):
-            self.lyrics_text.delete(1.0, tk.END)
+    def sync_clock(self):
+        """流式播放的第一块开始播放后，从它开始的时刻起计时"""
+        if self.clock.waiting:
+            started_at = self.music.start_time()
+            if started_at is not None:
+                self.clock.start(self.clock.base, at=started_at)
 
-        pygame.mixer.music.play(start=start_pos)
+    def _on_queued_track_started(self):
+        """队列中的下一首已无缝开始播放，只需切换内存中的状态"""
+        position = self.music.get_pos() / 1000
+        self.transition.queued_track_started(position)
+        self.current_song_index = self.peek_next_index()
+        self.next_song_index = None
+        self.start_clock(0)
+        self.close_seek_file()
+        if self._activate_track(self.current_playlist[self.current_song_index]):
+            self._on_track_started(0)
         self.update_progress()
 
+    def peek_next_index(self):
+        """按播放模式确定下一首的索引（随机模式下提前选定并保留）"""
+        if self.next_song_index is None or self.next_song_index >= len(self.current_playlist):
+            if self.play_mode == "single_loop":
+                self.next_song_index = self.current_song_index
+            elif self.play_mode in ("random", "weighted_random"):
+                self.next_song_index = self.shuffle.peek(self.current_song_index)
+            else:
+                self.next_song_index = (self.current_song_index + 1) % len(self.current_playlist)
+        return self.next_song_index
+
+    def prefetch_next(self):
+        """在后台预加载下一首歌曲"""
+        if self.current_playlist:
+            self.prefetcher.prefetch(self.current_playlist[self.peek_next_index()])
+
+    def reset_next_song(self):
+        """播放列表或播放模式变化后重新确定下一首"""
+        self.next_song_index = None
+        if self.is_playing and self.current_playlist:
+            self.current_song_index = min(self.current_song_index, len(self.current_playlist) - 1)
+            self.prefetch_next()
+            self.prepare_transition()
+
     def pause_music(self):
         """暂停音乐"""
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.pause()
+        if self.music.get_busy():
+            self.music.pause()
+            self.clock.pause()
+            self.is_paused = True
 
     def resume_music(self):
         """恢复播放"""
-        pygame.mixer.music.unpause()
+        self.music.unpause()
+        self.clock.resume()
+        self.is_paused = False
+        self.update_progress()
+        if hasattr(self, 'wave_animation'):
+            self.wave_animation.start()
 
     def stop_music(self):
         """停止播放"""
-        pygame.mixer.music.stop()
+        self.music.stop()
+        self.clock.stop()
+        self.is_playing = False
+        self.is_paused = False
+        if self.end_event_enabled:
+            # 手动停止也会触发结束事件，丢弃它以免被当成自然结束
+            pygame.event.clear(MUSIC_END_EVENT)
         self.update_time_label(0, 0)
         if hasattr(self, 'progress'):
             self.progress['value'] = 0
         if hasattr(self, 'lyrics_text'):
             self.lyrics_text.delete(1.0, tk.END)
+        self.current_lyric_index = None
 
-    def next_song(self):
+    def next_song(self, fade_ms=0):
         """播放下一首"""
         if not self.current_playlist:
             return
 
-        if self.play_mode == "single_loop":
-            pass
-        elif self.play_mode == "list_loop":
-            self.current_song_index = (self.current_song_index + 1) % len(self.current_playlist)
-        elif self.play_mode == "random":
-            self.current_song_index = random.randint(0, len(self.current_playlist) - 1)
+        self.current_song_index = self.peek_next_index()
+        self.next_song_index = None
 
-        if hasattr(self, 'listbox'):
-            self.listbox.selection_clear(0, tk.END)
-            self.listbox.selection_set(self.current_song_index)
-
-        self.update_time_label(0, self.current_song_length)
-        if hasattr(self, 'progress'):
-            self.progress['value'] = 0
-        if hasattr(self, 'lyrics_text'):
-            self.lyrics_text.delete(1.0, tk.END)
+        self._start_playing(fade_ms=fade_ms)
 
+    def previous_song(self):
+        """回到上一首播放过的歌曲，没有播放记录时按列表顺序后退"""
+        if not self.current_playlist:
+            return
+        index = self.shuffle.previous()
+        if index is None:
+            index = (self.current_song_index - 1) % len(self.current_playlist)
+        self.current_song_index = index
+        self.next_song_index = None
         self._start_playing()
 
+    def track_weights(self):
+        """偏好随机模式下每首歌的权重：播放次数越多越容易被选中"""
+        counts = self.library.play_counts(set(self.current_playlist))
+        return [1 + counts.get(path, 0) for path in self.current_playlist]
+
+    def set_crossfade(self, crossfade_ms):
+        """设置切歌时的淡入淡出时长（毫秒），0 表示无缝衔接，并保存设置"""
+        if crossfade_ms == self.transition.crossfade_ms:
+            return
+        self.transition.set_crossfade(crossfade_ms)
+        self.library.set_setting('crossfade_ms', self.transition.crossfade_ms)
+        self.reset_next_song()
+
     def set_volume(self, value):
         """设置音量"""
-        volume = float(value) / 100
-        pygame.mixer.music.set_volume(volume)
+        self.volume = float(value) / 100
+        self.apply_volume()
+
+    def apply_volume(self):
+        """音量滑块乘以当前歌曲的响度增益（已减去参考增益，不超过1）
+
+        流式播放时排队的下一首的音量交给 StreamMusic，在它的第一块开始播放时切换；
+        pygame.mixer.music 只有一个音量，要等 pump_events 发现切歌后再设置。
+        """
+        self.music.set_volume(self.volume * self.track_gain)
+        if self.queued_gain is not None and hasattr(self.music, 'set_queued_volume'):
+            self.music.set_queued_volume(self.volume * self.queued_gain)
 
     def set_play_mode(self, mode):
         """设置播放模式"""
         self.play_mode = mode
+        self.shuffle.weighted = mode == "weighted_random"
+        self.shuffle.weights_changed()
+        self.reset_next_song()
         
         # 创建自定义样式的消息框
         msg_window = tk.Toplevel(self.root)
@@ -212,7 +483,8 @@ class MusicPlayer:
         mode_text = {
             "single_loop": "单曲循环",
             "list_loop": "列表循环",
-            "random": "随机播放"
+            "random": "随机播放",
+            "weighted_random": "偏好随机"
         }
         msg_label = tk.Label(msg_frame,
                             text=f"播放模式已设置为: {mode_text.get(mode, mode)}",
@@ -251,7 +523,11 @@ class MusicPlayer:
         if selected_radio in self.playlists:
             self.current_playlist_name = selected_radio
             self.current_playlist = self.playlists[selected_radio]
+            self.shuffle.reset(len(self.current_playlist))
+            self.data_handler.set_current(selected_radio)
+            self.clear_search()
             self.update_listbox()
+            self.reset_next_song()
 
     def toggle_playlist(self):
         """切换播放列表显示状态"""
@@ -265,19 +541,232 @@ class MusicPlayer:
         """添加音乐到播放列表"""
         files = filedialog.askopenfilenames(title="选择音乐文件", filetypes=[("音频文件", "*.mp3 *.wav")])
         if files and self.current_playlist_name:
-            self.current_playlist.extend(files)
-            self.playlists[self.current_playlist_name] = self.current_playlist
+            self.clear_search()
+            self.append_tracks(self.current_playlist_name, files)
+
+    def append_tracks(self, playlist_name, files):
+        """把歌曲追加到指定电台末尾"""
+        playlist = self.playlists.get(playlist_name)
+        if playlist is None:
+            return
+        start = len(playlist)
+        self.data_handler.add_tracks(playlist_name, files)
+        self.search_index.add_tracks(playlist_name, files)
+        if playlist is self.current_playlist:
+            self.shuffle.tracks_added(len(files))
+        if (playlist is self.current_playlist and self.search_results is None
+                and hasattr(self, 'listbox')):
+            # 只通知列表新增的行，不重建整个列表
+            self.listbox.rows_inserted(start, len(files))
+        self.reset_next_song()
+
+    def import_folder(self):
+        """递归导入文件夹中的音乐，后台扫描，结果分批加入当前电台"""
+        from .importer import FolderImporter
+        if not self.current_playlist_name:
+            return
+        if self.importer is not None:
+            return
+        folder = filedialog.askdirectory(title="选择音乐文件夹")
+        if not folder:
+            return
+        self.clear_search()
+        self.importer = FolderImporter(self.library)
+        self.import_target = self.current_playlist_name
+        # 跳过电台中已有的歌曲
+        self.import_seen = set(self.current_playlist)
+        self.import_count = 0
+        self.import_folder_path = folder
+        self.show_import_progress()
+        self.importer.start(folder)
+        self.root.after(IMPORT_POLL_INTERVAL, self.poll_import)
+
+    def show_import_progress(self):
+        """显示导入进度窗口"""
+        window = tk.Toplevel(self.root)
+        window.overrideredirect(True)  # 无边框
+        window.configure(bg=COLORS['bg_dark'])
+        window_width = 360
+        window_height = 100
+        x = (self.root.winfo_screenwidth() - window_width) // 2
+        y = (self.root.winfo_screenheight() - window_height) // 2
+        window.geometry(f'{window_width}x{window_height}+{x}+{y}')
+
+        frame = tk.Frame(window, bg=COLORS['bg_dark'], padx=20, pady=15)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.import_label = tk.Label(frame,
+                                     text="正在扫描文件夹...",
+                                     bg=COLORS['bg_dark'],
+                                     fg=COLORS['text'],
+                                     font=('Microsoft YaHei UI', 10))
+        self.import_label.pack(pady=(0, 10))
+        cancel_button = tk.Button(frame,
+                                  text="取消",
+                                  bg=COLORS['accent'],
+                                  fg=COLORS['text'],
+                                  activebackground=COLORS['accent_hover'],
+                                  activeforeground=COLORS['text'],
+                                  relief=tk.FLAT,
+                                  cursor='hand2',
+                                  command=self.cancel_import)
+        cancel_button.pack()
+        self.import_window = window
+
+    def cancel_import(self):
+        """取消正在进行的导入，已导入的歌曲保留"""
+        if self.importer is not None:
+            self.importer.cancel()
+
+    def poll_import(self):
+        """定时取回导入结果并更新进度，不阻塞界面线程"""
+        importer = self.importer
+        files = [path for path in importer.drain() if path not in self.import_seen]
+        if files and not importer.cancelled:
+            self.import_seen.update(files)
+            self.import_count += len(files)
+            self.append_tracks(self.import_target, files)
+        if importer.done() or importer.cancelled:
+            self.import_window.destroy()
+            self.importer = None
+            print(f"导入完成，共添加 {self.import_count} 首歌曲")
+            if not importer.cancelled:
+                # 完整导入的文件夹加入监视列表，并建立第一次快照
+                self.library.watch_root(self.import_folder_path, self.import_target)
+                self.rescan_library()
+            return
+        self.import_label.config(
+            text=f"已扫描 {importer.dirs_scanned} 个文件夹，"
+                 f"处理 {importer.files_done}/{importer.files_found} 个文件，"
+                 f"添加 {self.import_count} 首")
+        self.root.after(IMPORT_POLL_INTERVAL, self.poll_import)
+
+    def rescan_library(self):
+        """在后台增量扫描所有监视的文件夹"""
+        if self.rescan_thread is not None and self.rescan_thread.is_alive():
+            return
+        self.rescan_thread = threading.Thread(target=self._rescan_worker,
+                                              name="library-rescan", daemon=True)
+        self.rescan_thread.start()
+        self.root.after(IMPORT_POLL_INTERVAL, self.poll_rescan)
+
+    def _rescan_worker(self):
+        try:
+            self.rescan_results.put(self.scanner.rescan_all())
+        except Exception as e:
+            print(f"扫描监视的文件夹时出错: {e}")
+            self.rescan_results.put([])
+
+    def poll_rescan(self):
+        """取回扫描结果并应用到电台"""
+        try:
+            results = self.rescan_results.get_nowait()
+        except queue.Empty:
+            self.root.after(IMPORT_POLL_INTERVAL, self.poll_rescan)
+            return
+        removed = set()
+        for playlist_name, added, gone in results:
+            removed.update(gone)
+            playlist = self.playlists.get(playlist_name)
+            if playlist is not None:
+                existing = set(playlist)
+                added = [path for path in added if path not in existing]
+                if added:
+                    self.append_tracks(playlist_name, added)
+        if removed:
+            self.remove_paths(removed)
+        self.analyze_library()
+        if self.rescan_job is not None:
+            self.root.after_cancel(self.rescan_job)
+        self.rescan_job = self.root.after(RESCAN_INTERVAL, self.rescan_library)
+
+    def analyze_library(self):
+        """在后台进程池中分析还没有响度数据的歌曲"""
+        if self.analyzer is not None or not LoudnessAnalyzer.enabled:
+            return
+        paths = [path for path in self.library.unanalyzed_tracks()
+                 if path not in self.analysis_failed]
+        if not paths:
+            return
+        # 播放时在后台分析：少用一个核并降低优先级，命令行的 analyze 仍使用全部核
+        self.analyzer = LoudnessAnalyzer(self.library, background_workers(), low_priority=True)
+        self.analyzer.start(paths)
+        self.analysis_paths = paths
+        self.root.after(ANALYSIS_POLL_INTERVAL, self.poll_analysis)
+
+    def poll_analysis(self):
+        """等待响度分析完成，然后让正在播放的歌曲使用新的增益"""
+        analyzer = self.analyzer
+        if not analyzer.done():
+            self.root.after(ANALYSIS_POLL_INTERVAL, self.poll_analysis)
+            return
+        self.analyzer = None
+        report = analyzer.report()
+        print(f"响度分析完成: {report['tracks']} 首（失败 {report['failed']} 首），"
+              f"每个进程每分钟 {report['tracks_per_min_per_core']:.1f} 首")
+        tracks = self.library.cached_tracks(self.analysis_paths)
+        self.analysis_failed.update(path for path in self.analysis_paths
+                                    if path not in tracks or tracks[path]['loudness'] is None)
+        self.reference_gain = reference_gain(self.library.max_gain())
+        if self.is_playing and self.current_playlist:
+            self.track_gain = self.cached_gain(self.current_playlist[self.current_song_index])
+            if self.queued_gain is not None:
+                self.queued_gain = self.cached_gain(self.transition.queued_path)
+            self.apply_volume()
+
+    def remove_paths(self, removed):
+        """从所有电台中删除已不存在的文件"""
+        current_path = None
+        if self.current_playlist and self.current_song_index < len(self.current_playlist):
+            current_path = self.current_playlist[self.current_song_index]
+        changed = False
+        # 尚未加载的电台不读取，它们中的丢失文件在播放时会被标记
+        for playlist_name, playlist in self.data_handler.loaded_playlists():
+            indices = playlist.find_indices(removed)
+            if not indices:
+                continue
+            changed = True
+            self.search_index.remove_tracks(playlist_name, [playlist[index] for index in indices])
+            self.data_handler.remove_tracks(playlist_name, indices)
+            if playlist is self.current_playlist:
+                self.shuffle.tracks_removed(indices)
+        if not changed:
+            return
+        if current_path in self.current_playlist:
+            self.current_song_index = self.current_playlist.index(current_path)
+        if self.search_results is None:
             self.update_listbox()
-            self.save_data()
+        else:
+            self.search(self.search_var.get())
+        self.reset_next_song()
 
     def remove_music(self):
         """从播放列表中移除音乐"""
         selected_indices = self.listbox.curselection()
+        if selected_indices and self.search_results is not None:
+            # 搜索结果中删除时，从结果所属的电台中移除该歌曲
+            playlist_name, path = self.search_results[selected_indices[0]]
+            playlist = self.playlists.get(playlist_name)
+            if playlist is not None and path in playlist:
+                index = playlist.index(path)
+                self.data_handler.remove_tracks(playlist_name, [index])
+                self.search_index.remove_tracks(playlist_name, [path])
+                if playlist is self.current_playlist:
+                    self.shuffle.tracks_removed([index])
+                    if index < self.current_song_index:
+                        self.current_song_index -= 1
+                self.search(self.search_var.get())
+                self.reset_next_song()
+            return
         if selected_indices:
-            for index in reversed(selected_indices):
-                del self.current_playlist[index]
-                self.listbox.delete(index)
-            self.save_data()
+            removed = [self.current_playlist[index] for index in selected_indices]
+            self.data_handler.remove_tracks(self.current_playlist_name, selected_indices)
+            self.search_index.remove_tracks(self.current_playlist_name, removed)
+            self.listbox.rows_deleted(selected_indices)
+            self.shuffle.tracks_removed(selected_indices)
+            # 当前歌曲之前的行被删除时，当前索引随之前移
+            self.current_song_index -= sum(1 for index in selected_indices
+                                           if index < self.current_song_index)
+            self.reset_next_song()
 
     def add_radio(self):
         """添加新电台"""
@@ -324,9 +813,8 @@ class MusicPlayer:
         def ok_command():
             name = entry.get().strip()
             if name:
-                self.playlists[name] = []
+                self.data_handler.create_playlist(name)
                 self.radio_combobox['values'] = list(self.playlists.keys())
-                self.save_data()
             dialog.destroy()
         
         def cancel_command():
@@ -381,17 +869,90 @@ class MusicPlayer:
         """删除电台"""
         selected_radio = self.radio_combobox.get()
         if selected_radio in self.playlists:
-            del self.playlists[selected_radio]
+            self.search_index.remove_playlist(selected_radio, self.playlists[selected_radio])
+            for root, playlist in self.library.watched_roots().items():
+                if playlist == selected_radio:
+                    self.library.unwatch_root(root)
+            self.data_handler.delete_playlist(selected_radio)
             self.radio_combobox['values'] = list(self.playlists.keys())
-            self.save_data()
 
     def update_listbox(self):
         """更新播放列表显示"""
         if not hasattr(self, 'listbox'):
             return
-        self.listbox.delete(0, tk.END)
-        for file in self.current_playlist:
-            self.listbox.insert(tk.END, os.path.basename(file))
+        self.listbox.set_items(self.current_playlist, self.format_rows)
+
+    def format_rows(self, paths):
+        """返回可见行的显示名称，名称取自曲库索引，不逐个访问文件"""
+        tracks = self.library.cached_tracks(paths)
+        names = []
+        for file in paths:
+            track = tracks.get(file)
+            name = track['title'] if track and track['title'] else os.path.basename(file)
+            if track and track['missing']:
+                name = f"[文件丢失] {name}"
+            names.append(name)
+        return names
+
+    def search(self, query):
+        """在所有电台中搜索歌曲，查询为空时恢复显示当前电台"""
+        if not query.strip():
+            if self.search_results is not None:
+                self.search_results = None
+                self.update_listbox()
+            return
+        if self.search_index_thread is None:
+            # 第一次搜索时才在后台为所有电台建立索引（会加载所有电台）
+            self.search_index_thread = threading.Thread(
+                target=self.search_index.build, args=(self.playlists, self.library),
+                name="search-index", daemon=True)
+            self.search_index_thread.start()
+            self.root.after(IMPORT_POLL_INTERVAL, self.poll_search_index)
+        self.search_results = self.search_index.search(query)
+        if hasattr(self, 'listbox'):
+            self.listbox.set_items(self.search_results, self.format_search_rows)
+
+    def poll_search_index(self):
+        """索引建立完成后用当前的查询重新搜索一次"""
+        if self.search_index_thread.is_alive():
+            self.root.after(IMPORT_POLL_INTERVAL, self.poll_search_index)
+        elif self.search_results is not None:
+            self.search(self.search_var.get())
+
+    def clear_search(self):
+        """清空搜索框并退出搜索结果显示"""
+        if hasattr(self, 'search_var'):
+            self.search_var.set("")
+        self.search("")
+
+    def format_search_rows(self, rows):
+        """搜索结果的显示名称，附带所属电台"""
+        names = self.format_rows([path for playlist_name, path in rows])
+        return [f"{name}  ·  {playlist_name}" for (playlist_name, path), name in zip(rows, names)]
+
+    def play_selected(self, event=None):
+        """播放列表中双击的歌曲；双击搜索结果时切换到对应电台"""
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        if self.search_results is not None:
+            playlist_name, path = self.search_results[selection[0]]
+            playlist = self.playlists.get(playlist_name)
+            if playlist is None or path not in playlist:
+                return
+            self.current_playlist_name = playlist_name
+            if playlist is not self.current_playlist:
+                self.shuffle.reset(len(playlist))
+            self.current_playlist = playlist
+            self.data_handler.set_current(playlist_name)
+            if hasattr(self, 'radio_combobox'):
+                self.radio_combobox.set(playlist_name)
+            self.current_song_index = playlist.index(path)
+            self.clear_search()
+        else:
+            self.current_song_index = selection[0]
+        self.next_song_index = None
+        self._start_playing()
 
     def on_progress_click(self, event):
         """进度条点击事件"""
@@ -414,40 +975,134 @@ class MusicPlayer:
             self.update_lyrics(value)
 
             try:
-                if pygame.mixer.music.get_busy():
-                    pygame.mixer.music.play(start=value)  # 从新位置开始播放
+                if self.music.get_busy():
+                    self.seek(value)
                 else:
                     self._start_playing(start_pos=value)
+            except (pygame.error, OSError):
+                self._start_playing(start_pos=value)
 
-                # 计算位置偏移
-                current_time = pygame.mixer.music.get_pos() / 1000
-                self.position_flag = value - current_time
+            self.is_dragging = False
+            self.update_progress()
 
+    def seek(self, position):
+        """从 position 秒处继续播放；MP3 按帧偏移表直接从对应的帧开始解码
+
+        只使用已缓存的帧偏移表，不在界面线程中扫描文件；表还没有建好时由 pygame 自己跳转。
+        """
+        song_path = self.current_playlist[self.current_song_index]
+        # 流式播放时由解码进程从指定位置开始解码
+        seek_table = None if self.streaming else self.library.cached_seek_table(song_path)
+        if seek_table is None:
+            self.music.play(start=position)
+        else:
+            # 帧偏移表逐帧累加的时长比按文件头估算的准确
+            self.current_song_length = seek_table.duration
+            if hasattr(self, 'progress'):
+                self.progress['maximum'] = self.current_song_length
+            offset, position = seek_table.locate(position)
+            seek_file = OffsetFile(song_path, offset)
+            try:
+                self.music.load(seek_file, 'mp3')
             except pygame.error:
-                self._start_playing(start_pos=value)
+                seek_file.close()
+                raise
+            self.close_seek_file()
+            self.seek_file = seek_file
+            self.music.play()
+        # 播放位置以实际开始解码的帧为准
+        self.start_clock(position)
+        self.last_pos = 0
+        self.transition.track_started(position, self.current_song_length)
+        # 重新加载会清空播放队列，需要重新准备下一首
+        self.prepare_transition()
 
-            self.is_dragging = False
+    def close_seek_file(self):
+        """关闭跳转时打开的文件视图（已加载其他歌曲后调用）"""
+        if self.seek_file is not None:
+            self.seek_file.close()
+            self.seek_file = None
+
+    def pump_events(self):
+        """处理 pygame 的播放结束事件，返回是否发生了切歌"""
+        if self.streaming:
+            # 流式解码出错的歌曲会像播放完一样切到下一首，在这里提示错误
+            error = self.music.get_error()
+            if error:
+                messagebox.showerror("错误", f"无法播放音乐文件: {error}")
+        if self.end_event_enabled:
+            # 只取出音乐结束事件，不丢弃队列中的其他事件
+            ended = bool(pygame.event.get(MUSIC_END_EVENT))
+        else:
+            # 没有事件支持时，根据播放位置回退判断队列中的下一首是否已开始
+            ended = self.music.get_pos() / 1000 < self.last_pos
+        busy = self.music.get_busy()
+        if self.transition.queued_path and busy and ended:
+            # 队列中的下一首已经开始
+            self._on_queued_track_started()
+            return True
+        if not busy and (ended or not self.end_event_enabled):
+            # 没有排队的下一首（或排队失败）时，播放结束后再切歌
+            self.next_song()
+            return True
+        return False
+
+    def next_wakeup(self, position):
+        """计算下一个需要刷新界面的时刻：秒数变化、下一句歌词、淡入淡出起点或歌曲结束"""
+        candidates = [math.floor(position) + 1 - position,
+                      self.current_song_length - position]
+        next_index = bisect.bisect_right(self.lyrics.times, position)
+        if next_index < len(self.lyrics.times):
+            candidates.append(self.lyrics.times[next_index] - position)
+        crossfade_point = self.transition.crossfade_point()
+        if crossfade_point is not None and crossfade_point > position:
+            candidates.append(crossfade_point - position)
+        if self.clock.waiting:
+            # 流式播放还没有开始出声，尽快开始计时
+            candidates.append(MIN_TICK_INTERVAL)
+        if self.transition.queued_path is not None and position >= self.current_song_length - 1:
+            # 无缝衔接时在结尾附近频繁检查切歌，下一首的歌词和增益才能及时生效
+            candidates.append(QUEUE_POLL_INTERVAL)
+        delay = min([candidate for candidate in candidates if candidate > 0],
+                    default=MAX_TICK_INTERVAL)
+        return max(MIN_TICK_INTERVAL, min(delay, MAX_TICK_INTERVAL))
 
     def update_progress(self):
-        """更新进度条和歌词显示"""
-        if not self.is_dragging and pygame.mixer.music.get_busy():
-            current_time = pygame.mixer.music.get_pos() / 1000
-            adjusted_time = current_time + self.position_flag  # 应用位置偏移
+        """更新进度条和歌词显示，并只在下一个有意义的时刻再次唤醒"""
+        if self.progress_job is not None:
+            self.root.after_cancel(self.progress_job)
+            self.progress_job = None
 
-            # 确保调整后的时间在有效范围内
-            adjusted_time = max(0, min(adjusted_time, self.current_song_length))
+        # 停止、暂停或拖动进度条时不再定时唤醒
+        if self.is_dragging or not self.is_playing or self.is_paused:
+            return
 
-            if hasattr(self, 'progress'):
-                self.progress['value'] = adjusted_time
-            if hasattr(self, 'time_label'):
-                self.update_time_label(adjusted_time, self.current_song_length)
-            if hasattr(self, 'lyrics_text'):
-                self.update_lyrics(adjusted_time)
+        if self.pump_events():
+            return  # 切歌时已重新安排计时器
 
-            # 检查是否需要播放下一首歌
-            if adjusted_time >= self.current_song_length - 1:
-                self.next_song()
-        self.root.after(1000, self.update_progress)
+        self.last_pos = self.music.get_pos() / 1000
+        self.sync_clock()
+        adjusted_time = self.clock.position()
+
+        # 确保调整后的时间在有效范围内
+        adjusted_time = max(0, min(adjusted_time, self.current_song_length))
+
+        if hasattr(self, 'progress'):
+            self.progress['value'] = adjusted_time
+        if hasattr(self, 'time_label'):
+            self.update_time_label(adjusted_time, self.current_song_length)
+        if hasattr(self, 'lyrics_text'):
+            self.update_lyrics(adjusted_time)
+
+        # 淡入淡出模式下在结尾前精确地开始切歌
+        crossfade_point = self.transition.crossfade_point()
+        if crossfade_point is not None and crossfade_point <= adjusted_time < self.current_song_length:
+            fade_ms = self.transition.start_crossfade(adjusted_time)
+            self.next_song(fade_ms=fade_ms)
+            return
+
+        delay = self.next_wakeup(adjusted_time)
+        self.progress_job = self.root.after(int(delay * 1000), self.update_progress)
 
     def update_time_label(self, current_time, total_time):
         """更新时间标签"""
@@ -457,32 +1112,39 @@ class MusicPlayer:
         total_time_str = format_time(total_time)
         self.time_label.config(text=f"{current_time_str} / {total_time_str}")
 
-    def update_lyrics(self, current_time):
-        """更新歌词显示"""
-        if self.lyrics and hasattr(self, 'lyrics_text'):
-            # 找到当前应该显示的歌词
-            current_index = 0
-            for i, (time, text) in enumerate(self.lyrics):
-                if time > current_time:
-                    current_index = i - 1
-                    break
-            else:
-                current_index = len(self.lyrics) - 1
+    def set_lyrics(self, lyrics):
+        """设置当前歌曲的歌词"""
+        self.lyrics = lyrics
+        self.current_lyric_index = None
+        self.render_lyrics()
 
-            # 确保索引有效
-            current_index = max(0, current_index)
+    def render_lyrics(self):
+        """每首歌只插入一次完整歌词，之后只移动高亮标签"""
+        if not hasattr(self, 'lyrics_text'):
+            return
+        self.lyrics_text.delete(1.0, tk.END)
+        if self.lyrics:
+            self.lyrics_text.insert(tk.END, "\n".join(self.lyrics.texts), "center")
+        self.current_lyric_index = None
 
-            # 清空当前显示的歌词
-            self.lyrics_text.delete(1.0, tk.END)
+    def update_lyrics(self, current_time):
+        """更新歌词显示"""
+        if not self.lyrics or not hasattr(self, 'lyrics_text'):
+            return
+        # 二分查找当前应该显示的歌词
+        current_index = max(0, bisect.bisect_right(self.lyrics.times, current_time) - 1)
+        if current_index == self.current_lyric_index:
+            return
 
-            # 显示当前歌词及其前后文
-            start_index = max(0, current_index - 1)
-            end_index = min(len(self.lyrics), current_index + 2)
+        # 当前播放的歌词使用高亮样式，只改动前后两行的标签
+        if self.current_lyric_index is not None:
+            line = self.current_lyric_index + 1
+            self.lyrics_text.tag_remove("highlight", f"{line}.0", f"{line}.end")
+        line = current_index + 1
+        self.lyrics_text.tag_add("highlight", f"{line}.0", f"{line}.end")
+        self.current_lyric_index = current_index
 
-            for i in range(start_index, end_index):
-                time, text = self.lyrics[i]
-                # 当前播放的歌词使用高亮样式
-                if i == current_index:
-                    self.lyrics_text.insert(tk.END, f"{text}\n", "highlight")
-                else:
-                    self.lyrics_text.insert(tk.END, f"{text}\n", "center")
\ No newline at end of file
+        # 让当前歌词保持在显示区域中间
+        visible_lines = int(self.lyrics_text.cget('height'))
+        top = max(0, current_index - visible_lines // 2)
+        self.lyrics_text.yview_moveto(top / len(self.lyrics))
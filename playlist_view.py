@@ -0,0 +1,181 @@
+import math
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+class VirtualListbox(tk.Canvas):
+    """虚拟化的播放列表：只为可见的行创建文本，滚动和选中的开销与列表长度无关"""
+
+    def __init__(self, parent, items=None, formatter=None, bg='white', fg='black',
+                 selectbackground='blue', selectforeground='white', font=None,
+                 height=15, yscrollcommand=None, padding=4):
+        self.font = tkfont.Font(font=font) if font else tkfont.nametofont('TkDefaultFont')
+        self.row_height = self.font.metrics('linespace') + padding
+        super().__init__(parent, bg=bg, bd=0, highlightthickness=0,
+                         height=height * self.row_height)
+        self.items = items if items is not None else []
+        # formatter 接收可见行的条目列表，返回对应的显示文本
+        self.formatter = formatter or (lambda rows: [str(row) for row in rows])
+        self.fg = fg
+        self.selectforeground = selectforeground
+        self.yscrollcommand = yscrollcommand
+        self.top = 0
+        self.selected = None
+        self.text_items = []
+        self.select_rect = self.create_rectangle(0, 0, 0, 0, fill=selectbackground,
+                                                 width=0, state='hidden')
+
+        self.bind('<Configure>', lambda e: self.redraw())
+        self.bind('<Button-1>', self.on_click)
+        self.bind('<Double-Button-1>', self.on_double_click)
+        self.bind('<MouseWheel>', self.on_mousewheel)
+        self.bind('<Button-4>', lambda e: self.yview('scroll', -3, 'units'))
+        self.bind('<Button-5>', lambda e: self.yview('scroll', 3, 'units'))
+
+    def visible_rows(self):
+        """当前高度下可以显示的行数"""
+        return max(1, math.ceil(max(self.winfo_height(), 1) / self.row_height))
+
+    def max_top(self):
+        return max(0, len(self.items) - self.visible_rows() + 1)
+
+    def redraw(self):
+        """只重绘可见的行"""
+        self.top = max(0, min(self.top, self.max_top()))
+        count = min(self.visible_rows(), len(self.items) - self.top)
+        # 文本项对象池，按需增加，多余的隐藏
+        while len(self.text_items) < count:
+            self.text_items.append(self.create_text(6, 0, anchor='nw', font=self.font,
+                                                    fill=self.fg))
+        labels = self.formatter(self.items[self.top:self.top + count]) if count > 0 else []
+        for row, item in enumerate(self.text_items):
+            if row < count:
+                index = self.top + row
+                fill = self.selectforeground if index == self.selected else self.fg
+                self.itemconfigure(item, text=labels[row], fill=fill, state='normal')
+                self.coords(item, 6, row * self.row_height + 2)
+            else:
+                self.itemconfigure(item, state='hidden')
+        self.draw_selection()
+        self.update_scrollbar()
+
+    def draw_selection(self):
+        if self.selected is None or not self.top <= self.selected < self.top + self.visible_rows():
+            self.itemconfigure(self.select_rect, state='hidden')
+            return
+        y = (self.selected - self.top) * self.row_height
+        self.coords(self.select_rect, 0, y, self.winfo_width(), y + self.row_height)
+        self.itemconfigure(self.select_rect, state='normal')
+        self.tag_lower(self.select_rect)
+
+    def update_scrollbar(self):
+        if self.yscrollcommand is None:
+            return
+        total = len(self.items)
+        if total == 0:
+            self.yscrollcommand(0.0, 1.0)
+            return
+        first = self.top / total
+        last = min(1.0, (self.top + self.visible_rows()) / total)
+        self.yscrollcommand(first, last)
+
+    def yview(self, *args):
+        """兼容 Scrollbar 的 command 回调"""
+        if not args:
+            total = max(1, len(self.items))
+            return self.top / total, min(1.0, (self.top + self.visible_rows()) / total)
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.items))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= max(1, self.visible_rows() - 1)
+            self.top += amount
+        self.redraw()
+
+    def on_mousewheel(self, event):
+        self.yview('scroll', -3 if event.delta > 0 else 3, 'units')
+
+    def on_click(self, event):
+        index = self.top + int(event.y // self.row_height)
+        if 0 <= index < len(self.items):
+            self.selection_set(index)
+            self.event_generate('<<ListboxSelect>>')
+
+    def on_double_click(self, event):
+        if self.selected is not None:
+            self.event_generate('<<ListboxActivate>>')
+
+    def set_items(self, items, formatter=None):
+        """切换显示的数据源（直接引用播放列表，不复制）"""
+        self.items = items
+        if formatter is not None:
+            self.formatter = formatter
+        self.top = 0
+        self.selected = None
+        self.redraw()
+
+    def rows_inserted(self, index, count):
+        """数据源在 index 处插入了 count 行"""
+        if self.selected is not None and self.selected >= index:
+            self.selected += count
+        if index < self.top + self.visible_rows():
+            self.redraw()
+        else:
+            self.update_scrollbar()
+
+    def rows_deleted(self, indices):
+        """数据源中删除了若干行（索引为删除前的位置）"""
+        indices = sorted(indices)
+        if not indices:
+            return
+        if self.selected is not None:
+            if self.selected in indices:
+                self.selected = None
+            else:
+                self.selected -= sum(1 for index in indices if index < self.selected)
+        removed_above = sum(1 for index in indices if index < self.top)
+        self.top -= removed_above
+        if removed_above or indices[-1] >= self.top:
+            self.redraw()
+
+    def refresh(self):
+        """数据源内容变化但行数不变时重绘可见行"""
+        self.redraw()
+
+    # 以下方法与 tk.Listbox 保持一致
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def selection_clear(self, first=0, last=None):
+        previous = self.selected
+        self.selected = None
+        if previous is not None:
+            self._redraw_row(previous)
+
+    def selection_set(self, index):
+        previous = self.selected
+        self.selected = index if 0 <= index < len(self.items) else None
+        if previous is not None and previous != self.selected:
+            self._redraw_row(previous)
+        if self.selected is not None:
+            self._redraw_row(self.selected)
+
+    def see(self, index):
+        """滚动使指定行可见"""
+        rows = self.visible_rows()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + rows - 1:
+            self.top = index - rows + 2
+        else:
+            return
+        self.redraw()
+
+    def _redraw_row(self, index):
+        """只更新一行的选中状态"""
+        row = index - self.top
+        if 0 <= row < len(self.text_items):
+            fill = self.selectforeground if index == self.selected else self.fg
+            self.itemconfigure(self.text_items[row], fill=fill)
+        self.draw_selection()
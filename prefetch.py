@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 预热页缓存时每次读取的块大小及最多读取的字节数
+WARM_CHUNK_SIZE = 1024 * 1024
+WARM_MAX_BYTES = 64 * 1024 * 1024
+
+
+def warm_page_cache(path):
+    """提前把音频文件读入操作系统页缓存"""
+    try:
+        with open(path, 'rb') as file:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                return
+            remaining = WARM_MAX_BYTES
+            while remaining > 0 and file.read(min(WARM_CHUNK_SIZE, remaining)):
+                remaining -= WARM_CHUNK_SIZE
+    except OSError as e:
+        print(f"预读音频文件出错: {e}")
+
+
+class Prefetcher:
+    """在后台线程中预加载下一首歌曲的元数据、歌词和文件内容"""
+
+    def __init__(self, library):
+        self.library = library
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.lock = threading.Lock()
+        self.pending_path = None
+        self.pending_future = None
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, path):
+        """提交下一首歌曲的预加载任务"""
+        with self.lock:
+            if path == self.pending_path:
+                return
+            if self.pending_future is not None:
+                self.pending_future.cancel()
+            self.pending_path = path
+            self.pending_future = self.executor.submit(self._load, path)
+
+    def _load(self, path):
+        track = self.library.get_track(path)
+        if track is None:
+            return None
+        lyrics = self.library.load_lyrics(track)
+        # MP3 的帧偏移表也提前建好，拖动进度条时不必再扫描文件
+        seek_table = self.library.seek_table(path)
+        if seek_table is not None:
+            track['duration'] = seek_table.duration
+        warm_page_cache(path)
+        return track, lyrics
+
+    def index_seek_table(self, path):
+        """在后台线程中为没有预加载的歌曲（如第一首）建立帧偏移表"""
+        self.executor.submit(self.library.seek_table, path)
+
+    def take(self, path):
+        """取出已完成的预加载结果 (元数据, 歌词)，未命中时返回None"""
+        with self.lock:
+            future = self.pending_future
+            matched = path == self.pending_path and future is not None and future.done()
+            if path == self.pending_path:
+                self.pending_path = None
+                self.pending_future = None
+        result = None
+        if matched and not future.cancelled() and future.exception() is None:
+            result = future.result()
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def stats(self):
+        """返回预加载命中统计"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def shutdown(self):
+        """停止后台线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
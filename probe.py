@@ -0,0 +1,409 @@
+import io
+import os
+import struct
+import bisect
+from array import array
+
+# MPEG 音频帧头查找表
+# 比特率表 (kbps)，按 (版本类别, 层) 索引；版本类别 1 表示 MPEG1，2 表示 MPEG2/2.5
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# 采样率表 (Hz)，按版本位索引：0 为 MPEG2.5，2 为 MPEG2，3 为 MPEG1
+SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+# 查找首个音频帧时最多扫描的字节数
+MAX_SYNC_SCAN = 64 * 1024
+# 没有VBR标签时检查开头多少帧的码率，判断是否为固定码率
+CBR_CHECK_FRAMES = 32
+# 帧偏移表中每隔多少帧记录一项（MPEG1 第三层约每 0.1 秒一项）
+SEEK_TABLE_STEP = 4
+# 建立帧偏移表时每次读取的字节数
+SEEK_READ_SIZE = 256 * 1024
+
+
+def parse_frame_header(header):
+    """解析4字节的MPEG帧头，无效时返回None"""
+    if len(header) < 4:
+        return None
+    b1, b2, b3 = header[1], header[2], header[3]
+    if header[0] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version = 1 if version_bits == 3 else 2
+    layer = 4 - layer_bits
+    bitrate = BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channel_mode = (b3 >> 6) & 0x03
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'channels': 1 if channel_mode == 3 else 2,
+        'samples_per_frame': samples_per_frame,
+        'frame_length': frame_length,
+    }
+
+
+def _skip_id3v2(file):
+    """跳过文件开头的ID3v2标签，返回音频数据的起始偏移"""
+    head = file.read(10)
+    if len(head) == 10 and head[:3] == b'ID3':
+        size = ((head[6] & 0x7F) << 21) | ((head[7] & 0x7F) << 14) | \
+               ((head[8] & 0x7F) << 7) | (head[9] & 0x7F)
+        footer = 10 if head[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def find_first_frame(file):
+    """定位第一个有效的MPEG帧，返回 (偏移, 帧头信息, 帧起始数据)"""
+    start = _skip_id3v2(file)
+    file.seek(start)
+    data = file.read(MAX_SYNC_SCAN)
+    pos = data.find(b'\xff')
+    while 0 <= pos < len(data) - 4:
+        info = parse_frame_header(data[pos:pos + 4])
+        if info and info['frame_length'] > 0:
+            # 校验下一帧帧头，避免把数据中的偶然同步字当作帧头
+            next_pos = pos + info['frame_length']
+            if next_pos + 4 > len(data) or parse_frame_header(data[next_pos:next_pos + 4]):
+                return start + pos, info, data[pos:]
+        pos = data.find(b'\xff', pos + 1)
+    return None, None, b''
+
+
+def _xing_offset(info):
+    """Xing/Info 标签位于帧头和边信息之后"""
+    if info['version'] == 1:
+        side_info = 17 if info['channels'] == 1 else 32
+    else:
+        side_info = 9 if info['channels'] == 1 else 17
+    return 4 + side_info
+
+
+def _has_vbr_tag(info, frame):
+    """第一帧是否是不含音频的 Xing/Info/VBRI 标签帧"""
+    offset = _xing_offset(info)
+    return frame[offset:offset + 4] in (b'Xing', b'Info') or frame[36:40] == b'VBRI'
+
+
+def _vbr_frame_count(info, frame):
+    """读取 Xing/Info 或 VBRI 标签中的总帧数，没有标签时返回None"""
+    offset = _xing_offset(info)
+    tag = frame[offset:offset + 4]
+    if tag in (b'Xing', b'Info') and len(frame) >= offset + 12:
+        flags = struct.unpack('>I', frame[offset + 4:offset + 8])[0]
+        if flags & 0x01:
+            return struct.unpack('>I', frame[offset + 8:offset + 12])[0]
+
+    # VBRI 标签固定位于帧头之后32字节处
+    if frame[36:40] == b'VBRI' and len(frame) >= 36 + 18:
+        return struct.unpack('>I', frame[36 + 14:36 + 18])[0]
+    return None
+
+
+def _constant_bitrate(info, data):
+    """检查从第一帧开始的连续帧是否都使用第一帧的码率"""
+    pos = 0
+    for _ in range(CBR_CHECK_FRAMES):
+        header = parse_frame_header(data[pos:pos + 4])
+        if header is None:
+            break
+        if header['bitrate'] != info['bitrate']:
+            return False
+        pos += header['frame_length']
+    return True
+
+
+def probe_mp3_duration(path):
+    """仅通过帧头和 Xing/VBRI/Info 标签计算MP3时长"""
+    with open(path, 'rb') as file:
+        offset, info, frame = find_first_frame(file)
+        if info is None:
+            return None
+
+        frames = _vbr_frame_count(info, frame)
+        if frames:
+            return frames * info['samples_per_frame'] / info['sample_rate']
+
+        if not _constant_bitrate(info, frame):
+            # 没有VBR标签的VBR文件按首帧码率估算误差很大，逐帧累加帧头得到准确时长
+            table = build_seek_table(path)
+            return table.duration if table is not None else None
+
+        # 固定码率的文件按文件大小估算
+        file_size = os.fstat(file.fileno()).st_size
+        end = file_size
+        if file_size >= 128:
+            file.seek(file_size - 128)
+            if file.read(3) == b'TAG':
+                end -= 128
+        if info['bitrate'] <= 0:
+            return None
+        return (end - offset) * 8 / info['bitrate']
+
+
+class SeekTable:
+    """MP3 帧偏移表：每隔 SEEK_TABLE_STEP 帧记录该帧之前的采样数和它在文件中的偏移
+
+    VBR 文件中时间与字节偏移不成比例，按表二分查找才能把时间准确地换算为帧的位置。
+    """
+
+    def __init__(self, sample_rate, total_samples, samples, offsets):
+        self.sample_rate = sample_rate
+        self.total_samples = total_samples
+        self.samples = samples
+        self.offsets = offsets
+
+    @property
+    def duration(self):
+        return self.total_samples / self.sample_rate
+
+    def locate(self, seconds):
+        """返回不晚于 seconds 的记录帧的 (字节偏移, 该帧的起始时间)"""
+        i = max(0, bisect.bisect_right(self.samples, seconds * self.sample_rate) - 1)
+        return self.offsets[i], self.samples[i] / self.sample_rate
+
+    def to_bytes(self):
+        """导出为可以存入数据库的字节串"""
+        header = array('I', [self.sample_rate, self.total_samples, len(self.samples)])
+        return header.tobytes() + self.samples.tobytes() + self.offsets.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = array('I')
+        values.frombytes(data)
+        sample_rate, total_samples, count = values[:3]
+        return cls(sample_rate, total_samples, values[3:3 + count], values[3 + count:])
+
+
+class OffsetFile:
+    """从某一帧开始的只读文件视图，交给 pygame 解码时就像从文件开头播放；指定 size 时只包含这么多字节"""
+
+    def __init__(self, path, offset, size=None):
+        self.file = open(path, 'rb')
+        self.offset = offset
+        self.end = None if size is None else offset + size
+        self.file.seek(offset)
+
+    def read(self, size=-1):
+        if self.end is not None:
+            remaining = max(0, self.end - self.file.tell())
+            size = remaining if size is None or size < 0 else min(size, remaining)
+        return self.file.read(size)
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position += self.offset
+        elif whence == os.SEEK_END and self.end is not None:
+            position += self.end
+            whence = os.SEEK_SET
+        return self.file.seek(position, whence) - self.offset
+
+    def tell(self):
+        return self.file.tell() - self.offset
+
+    def close(self):
+        self.file.close()
+
+
+def _same_stream(first, header):
+    """帧头是否与第一帧属于同一音频流（版本、层和采样率相同）"""
+    return (header is not None and header['frame_length'] > 0
+            and header['version'] == first['version'] and header['layer'] == first['layer']
+            and header['sample_rate'] == first['sample_rate'])
+
+
+def build_seek_table(path):
+    """按块读取帧头建立帧偏移表，不解码音频数据，也不把整个文件读入内存；无法识别时返回None"""
+    with open(path, 'rb') as file:
+        start, info, frame = find_first_frame(file)
+        if info is None:
+            return None
+        file.seek(start)
+        samples = array('I')
+        offsets = array('I')
+        total = 0
+        count = 0
+        data = b''
+        base = start            # data 开头在文件中的偏移
+        want = 4                # 从 pos 开始需要的字节数
+        eof = False
+        synced = True           # 上一个位置是否是有效的帧
+        # Xing/Info 标签帧本身不含音频，从下一帧开始计时
+        pos = info['frame_length'] if _has_vbr_tag(info, frame) else 0
+        while True:
+            if pos + want > len(data) and not eof:
+                # 丢弃已处理的部分，读入下一块
+                if pos < len(data):
+                    data = data[pos:]
+                else:
+                    file.seek(base + pos)
+                    data = b''
+                base += pos
+                pos = 0
+                chunk = file.read(SEEK_READ_SIZE)
+                eof = not chunk
+                data += chunk
+                continue
+            if pos + 4 > len(data):
+                break
+            want = 4
+            header = parse_frame_header(data[pos:pos + 4])
+            if header is not None and not synced:
+                # 重新同步时，结尾的标签和内嵌的封面中也可能出现像帧头的字节；
+                # 只有下一帧也能解析、并且与第一帧属于同一音频流时才接受
+                next_pos = pos + header['frame_length']
+                if next_pos + 4 > len(data) and not eof:
+                    want = header['frame_length'] + 4
+                    continue
+                if not (_same_stream(info, header)
+                        and _same_stream(info, parse_frame_header(data[next_pos:next_pos + 4]))):
+                    header = None
+            if header is None or header['frame_length'] <= 0:
+                # 跳过损坏的数据和结尾的标签，重新同步到下一个帧头
+                synced = False
+                pos = data.find(b'\xff', pos + 1)
+                if pos < 0:
+                    pos = len(data)
+                continue
+            synced = True
+            if count % SEEK_TABLE_STEP == 0:
+                samples.append(total)
+                offsets.append(base + pos)
+            total += header['samples_per_frame']
+            count += 1
+            pos += header['frame_length']
+    if not count:
+        return None
+    return SeekTable(info['sample_rate'], total, samples, offsets)
+
+
+def read_wav_layout(file):
+    """解析RIFF块头，返回 (fmt 块内容, data 块偏移, data 块大小)，不是WAV文件时返回None"""
+    riff = file.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        return None
+    file_size = os.fstat(file.fileno()).st_size
+    fmt = None
+    while True:
+        chunk = file.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = file.read(chunk_size)
+            if len(fmt) < 16:
+                return None
+            if chunk_size % 2:
+                file.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            # 流式写入的文件可能没有正确回填 data 块大小
+            remaining = file_size - file.tell()
+            data_size = min(chunk_size, remaining) if chunk_size else remaining
+            return fmt, file.tell(), data_size
+        else:
+            file.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def wav_file(fmt, data):
+    """用原来的 fmt 块和一段采样数据拼成内存中的WAV文件，采样格式的转换仍交给 SDL"""
+    header = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    if len(fmt) % 2:
+        header += b'\0'
+    header += b'data' + struct.pack('<I', len(data))
+    return io.BytesIO(b'RIFF' + struct.pack('<I', len(header) + len(data)) + header + data)
+
+
+def probe_wav_duration(path):
+    """通过RIFF块头计算WAV时长"""
+    with open(path, 'rb') as file:
+        layout = read_wav_layout(file)
+    if layout is None:
+        return None
+    fmt, _, data_size = layout
+    byte_rate = struct.unpack('<I', fmt[8:12])[0]
+    if not byte_rate:
+        return None
+    return data_size / byte_rate
+
+
+def mp3_tail_offset(path, seconds):
+    """返回结尾前至少 seconds 秒处的一个帧的偏移，只读取文件头和结尾附近的数据
+
+    按该层的最高码率估算字节数，VBR 文件中取到的部分也不会短于 seconds 秒。
+    """
+    with open(path, 'rb') as file:
+        start, info, _ = find_first_frame(file)
+        if info is None:
+            return None
+        max_bitrate = max(BITRATES[(info['version'], info['layer'])]) * 1000
+        offset = os.fstat(file.fileno()).st_size - int(seconds * max_bitrate / 8)
+        if offset <= start:
+            return start
+        file.seek(offset)
+        data = file.read(MAX_SYNC_SCAN)
+    pos = data.find(b'\xff')
+    while 0 <= pos < len(data) - 4:
+        header = parse_frame_header(data[pos:pos + 4])
+        if _same_stream(info, header):
+            # 与建立帧偏移表时一样，下一帧也能解析才认为找到了帧头
+            next_pos = pos + header['frame_length']
+            if next_pos + 4 > len(data) or _same_stream(
+                    info, parse_frame_header(data[next_pos:next_pos + 4])):
+                return offset + pos
+        pos = data.find(b'\xff', pos + 1)
+    return start
+
+
+def probe_duration(path):
+    """只读取文件头部信息获取音频时长（秒），无法识别时返回None"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.wav':
+        probes = [probe_wav_duration]
+    elif ext == '.mp3':
+        probes = [probe_mp3_duration]
+    else:
+        probes = [probe_wav_duration, probe_mp3_duration]
+    for probe in probes:
+        try:
+            duration = probe(path)
+        except (OSError, struct.error) as e:
+            print(f"读取音频文件头出错: {e}")
+            return None
+        if duration:
+            return duration
+    return None
@@ -0,0 +1,83 @@
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """记录启动过程中各阶段和模块导入的耗时，并可导出为JSON报告"""
+
+    def __init__(self, origin=None, enabled=False, report_path=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.enabled = enabled
+        self.report_path = report_path
+        self.lock = threading.Lock()
+        self.phases = []
+        self.imports = []
+        self.marks = {}
+
+    def _ms(self, timestamp):
+        return round((timestamp - self.origin) * 1000, 3)
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个启动阶段的起止时间"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.phases.append({
+                    'name': name,
+                    'thread': threading.current_thread().name,
+                    'start_ms': self._ms(start),
+                    'duration_ms': round((end - start) * 1000, 3),
+                })
+
+    @contextmanager
+    def measure_import(self, name):
+        """记录一次模块导入的耗时；模块已导入时不记录"""
+        if name in sys.modules:
+            yield
+            return
+        start = time.perf_counter()
+        before = set(sys.modules)
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.imports.append({
+                    'module': name,
+                    'thread': threading.current_thread().name,
+                    'start_ms': self._ms(start),
+                    'duration_ms': round((end - start) * 1000, 3),
+                    'modules_loaded': len(set(sys.modules) - before),
+                })
+
+    def mark(self, name):
+        """记录一个时间点"""
+        with self.lock:
+            self.marks[name] = self._ms(time.perf_counter())
+
+    def report(self):
+        """生成报告数据"""
+        with self.lock:
+            return {
+                'marks_ms': dict(self.marks),
+                'phases': sorted(self.phases, key=lambda phase: phase['start_ms']),
+                'imports': sorted(self.imports, key=lambda entry: entry['start_ms']),
+            }
+
+    def write_report(self):
+        """启用分析时把报告写入文件"""
+        if not self.enabled or not self.report_path:
+            return
+        try:
+            with open(self.report_path, 'w', encoding='utf-8') as file:
+                json.dump(self.report(), file, indent=4, ensure_ascii=False)
+            print(f"启动分析报告已写入: {self.report_path}")
+        except IOError as e:
+            print(f"写入启动分析报告时出错: {e}")
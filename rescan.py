@@ -0,0 +1,72 @@
+import os
+from .importer import scan_directory, is_audio_file
+
+
+class LibraryScanner:
+    """增量扫描监视的文件夹：只重新列出修改时间变化的文件夹"""
+
+    def __init__(self, library):
+        self.library = library
+
+    def rescan(self, root):
+        """扫描一个监视的文件夹，返回 (新增的文件, 消失的文件)
+
+        文件夹中增删或重命名条目时其修改时间会改变；修改时间与快照一致的
+        文件夹直接沿用快照中的子文件夹列表继续向下检查，不再列出其内容。
+        """
+        snapshot = self.library.directory_snapshot(root)
+        changed = {}
+        visited = set()
+        added = []
+        removed = []
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            visited.add(folder)
+            entry = snapshot.get(folder)
+            if entry is not None and entry[0] == mtime_ns:
+                stack.extend(os.path.join(folder, name) for name in entry[1])
+                continue
+
+            subdirs, files = scan_directory(folder)
+            subdir_names = [os.path.basename(path) for path in subdirs]
+            file_names = [os.path.basename(path) for path in files]
+            old_names = entry[2] if entry is not None else []
+            old_set = set(old_names)
+            new_set = set(file_names)
+            added.extend(os.path.join(folder, name) for name in file_names
+                         if name not in old_set)
+            removed.extend(os.path.join(folder, name) for name in old_names
+                           if name not in new_set)
+            changed[folder] = (mtime_ns, subdir_names, file_names)
+            stack.extend(subdirs)
+
+        # 快照中有但这次没有访问到的文件夹已被删除或移走
+        gone = [folder for folder in snapshot if folder not in visited]
+        for folder in gone:
+            removed.extend(os.path.join(folder, name) for name in snapshot[folder][2])
+        self.library.update_snapshot(root, changed, gone)
+
+        added = [path for path in added if is_audio_file(path)]
+        for path in added:
+            self.library.get_track(path)
+        if removed:
+            self.library.forget(removed)
+        return added, removed
+
+    def rescan_all(self):
+        """扫描所有监视的文件夹，返回 [(电台名称, 新增的文件, 消失的文件)]"""
+        results = []
+        for root, playlist in self.library.watched_roots().items():
+            if not os.path.isdir(root):
+                # 文件夹所在的磁盘可能暂时不可用，保留快照等下次再扫描
+                print(f"监视的文件夹不可用: {root}")
+                continue
+            added, removed = self.rescan(root)
+            if added or removed:
+                results.append((playlist, added, removed))
+        return results
@@ -0,0 +1,144 @@
+import os
+import bisect
+import threading
+from array import array
+
+# 每次查询最多返回的结果数
+MAX_RESULTS = 200
+# 后台建立索引时每批加入的歌曲数
+BUILD_BATCH_SIZE = 2000
+
+
+def search_text(path, title=None):
+    """生成用于搜索的文本：文件名、标题和上两级文件夹名（通常是专辑和歌手）"""
+    folder, filename = os.path.split(path)
+    parent, album = os.path.split(folder)
+    parts = [os.path.splitext(filename)[0], album, os.path.basename(parent)]
+    if title and title not in parts:
+        parts.append(title)
+    return ' '.join(parts).lower()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """跨所有电台的增量搜索索引（三元组倒排索引），添加歌曲时即时更新"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = {}           # 路径 -> 编号
+        self.paths = []         # 编号 -> 路径
+        self.texts = []         # 编号 -> 搜索文本
+        self.memberships = []   # 编号 -> 包含该歌曲的电台名称列表
+        self.postings = {}      # 三元组 -> 编号数组（按编号递增）
+        # 所有搜索文本拼接成的长字符串，用于不足三个字符的查询，按需重建
+        self.blob = ''
+        self.blob_offsets = array('I')
+
+    def _track_id(self, path, title=None):
+        track_id = self.ids.get(path)
+        if track_id is not None:
+            return track_id
+        track_id = len(self.paths)
+        text = search_text(path, title)
+        self.ids[path] = track_id
+        self.paths.append(path)
+        self.texts.append(text)
+        self.memberships.append([])
+        for gram in trigrams(text):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('I')
+            posting.append(track_id)
+        return track_id
+
+    def add_tracks(self, playlist_name, paths, titles=None):
+        """把歌曲加入索引并记录所属电台"""
+        titles = titles or {}
+        with self.lock:
+            for path in paths:
+                track_id = self._track_id(path, titles.get(path))
+                # 后台建立索引与界面线程的增量更新可能重复加入同一首歌
+                if playlist_name not in self.memberships[track_id]:
+                    self.memberships[track_id].append(playlist_name)
+
+    def remove_tracks(self, playlist_name, paths):
+        """记录歌曲已从电台中移除；不再属于任何电台的歌曲不会出现在结果中"""
+        with self.lock:
+            for path in paths:
+                track_id = self.ids.get(path)
+                if track_id is not None and playlist_name in self.memberships[track_id]:
+                    self.memberships[track_id].remove(playlist_name)
+
+    def remove_playlist(self, playlist_name, paths):
+        """删除整个电台"""
+        self.remove_tracks(playlist_name, set(paths))
+
+    def build(self, playlists, library=None):
+        """为所有电台建立索引，可在后台线程中调用"""
+        # 逐个读取电台，延迟加载的电台在这里才会被加载
+        for name in list(playlists):
+            paths = playlists.get(name)
+            if paths is None:
+                continue
+            paths = list(paths)
+            titles = {}
+            if library is not None:
+                titles = {path: track['title']
+                          for path, track in library.cached_tracks(paths).items()}
+            # 分批加入，避免长时间占用锁而卡住界面线程的查询
+            for start in range(0, len(paths), BUILD_BATCH_SIZE):
+                self.add_tracks(name, paths[start:start + BUILD_BATCH_SIZE], titles)
+
+    def _candidates(self, words):
+        """用查询中最少见的三元组缩小候选范围"""
+        smallest = None
+        for word in words:
+            for gram in trigrams(word):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return ()
+                if smallest is None or len(posting) < len(smallest):
+                    smallest = posting
+        if smallest is None:
+            # 查询词都短于三个字符时，在拼接后的长字符串中查找
+            return self._scan_blob(max(words, key=len))
+        return smallest
+
+    def _scan_blob(self, word):
+        """用 str.find 在拼接字符串中依次找出包含 word 的歌曲编号"""
+        if len(self.blob_offsets) != len(self.texts):
+            self.blob = '\n'.join(self.texts)
+            self.blob_offsets = array('I')
+            offset = 0
+            for text in self.texts:
+                self.blob_offsets.append(offset)
+                offset += len(text) + 1
+        blob, offsets = self.blob, self.blob_offsets
+        pos = blob.find(word)
+        while pos != -1:
+            track_id = bisect.bisect_right(offsets, pos) - 1
+            yield track_id
+            # 跳到下一首歌曲的文本继续查找
+            next_start = offsets[track_id + 1] if track_id + 1 < len(offsets) else len(blob)
+            pos = blob.find(word, next_start)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """返回匹配的 (电台名称, 路径) 列表，多个查询词之间为“与”的关系"""
+        words = query.lower().split()
+        if not words:
+            return []
+        results = []
+        with self.lock:
+            texts = self.texts
+            for track_id in self._candidates(words):
+                text = texts[track_id]
+                if all(word in text for word in words):
+                    path = self.paths[track_id]
+                    for playlist_name in dict.fromkeys(self.memberships[track_id]):
+                        results.append((playlist_name, path))
+                    if len(results) >= limit:
+                        break
+        return results[:limit]
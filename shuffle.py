@@ -0,0 +1,228 @@
+import random
+import bisect
+from array import array
+
+# “上一首”最多能回退的歌曲数
+HISTORY_SIZE = 200
+# 加权随机时为避开刚播放的歌曲最多重抽的次数
+WEIGHTED_RETRIES = 8
+# 播放次数变化后重建偏好随机的别名表：每次播放分摊的重建工作量不超过这么多首歌，
+# 小电台每播放一首就重建，大电台隔几首重建一次
+WEIGHT_REFRESH_TRACKS = 2000
+
+
+class AliasTable:
+    """Vose 别名表：按权重抽样，建表 O(n)，每次抽样 O(1)"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        self.prob = array('d', [1.0]) * n
+        self.alias = array('I', range(n))
+        if total <= 0:
+            return
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(large.pop())
+        # 剩下的都是浮点误差范围内等于1的项，prob 保持为1
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, rng):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class ShuffleEngine:
+    """随机播放顺序：一轮内不重复，可以回到之前播放的歌曲
+
+    本轮的播放顺序是按需进行的 Fisher–Yates 洗牌：排列只记录与原位置不同的项，
+    每抽一首只交换一次，不需要先生成整个排列。下标均为电台中的位置，
+    电台在播放过程中增删歌曲时需要调用 tracks_added/tracks_removed。
+    """
+
+    def __init__(self, size=0, history_size=HISTORY_SIZE, rng=None):
+        self.history_size = history_size
+        self.rng = rng or random.Random()
+        self.weighted = False
+        self.weight_func = None     # 返回每个位置权重的函数，加权随机时使用
+        self.reset(size)
+
+    def reset(self, size):
+        """换成有 size 首歌的新电台，开始新的一轮"""
+        self.size = size
+        self.drawn = 0              # 本轮已抽出的歌曲数，排列的前 drawn 项
+        self.perm = {}              # 排列中的位置 -> 歌曲下标（只记录被交换过的项）
+        self.pos = {}               # 歌曲下标 -> 排列中的位置
+        self.history = []
+        self.cursor = -1            # 当前歌曲在 history 中的位置
+        self.peeked = None
+        self.peeked_drawn = False   # 预选的下一首是否是从本轮中新抽出的
+        self.alias = None
+        self.plays_since_build = 0  # 别名表建立后播放过的歌曲数
+
+    def _get(self, i):
+        return self.perm.get(i, i)
+
+    def _set(self, i, value):
+        if i == value:
+            self.perm.pop(i, None)
+            self.pos.pop(value, None)
+        else:
+            self.perm[i] = value
+            self.pos[value] = i
+
+    def _swap(self, i, j):
+        a = self._get(i)
+        b = self._get(j)
+        self._set(i, b)
+        self._set(j, a)
+
+    def _draw(self, avoid):
+        """从本轮尚未抽到的歌曲中随机抽出一首"""
+        if self.drawn >= self.size:
+            # 一轮结束，所有歌曲重新参与洗牌
+            self.drawn = 0
+            self.perm.clear()
+            self.pos.clear()
+        p = self.pos.get(avoid, avoid) if avoid is not None else -1
+        if self.drawn <= p < self.size and self.size - self.drawn > 1:
+            # 刚播放的歌曲还在未抽部分（新一轮的开头）时跳过它，其余位置等概率
+            j = self.rng.randrange(self.drawn, self.size - 1)
+            if j == p:
+                j = self.size - 1
+        else:
+            j = self.rng.randrange(self.drawn, self.size)
+        value = self._get(j)
+        self._swap(self.drawn, j)
+        self.drawn += 1
+        return value
+
+    def _draw_weighted(self, avoid):
+        if self.alias is None or len(self.alias) != self.size:
+            self.alias = AliasTable(self.weight_func())
+            self.plays_since_build = 0
+        for _ in range(WEIGHTED_RETRIES):
+            value = self.alias.sample(self.rng)
+            if value != avoid:
+                break
+        return value
+
+    def _unpeek(self):
+        """放弃预选的下一首；它若是刚抽出的，放回本轮未抽的部分"""
+        if self.peeked is not None and self.peeked_drawn:
+            self.drawn -= 1
+        self.peeked = None
+        self.peeked_drawn = False
+
+    def _push(self, index):
+        del self.history[self.cursor + 1:]
+        self.history.append(index)
+        if len(self.history) > self.history_size:
+            del self.history[0]
+        self.cursor = len(self.history) - 1
+
+    def peek(self, current=None):
+        """返回下一首的下标，重复调用结果不变，直到 advance 或电台变化"""
+        if self.size == 0:
+            return None
+        if self.peeked is None:
+            if self.cursor < len(self.history) - 1:
+                # 回退过之后先按原来的顺序往前走
+                self.peeked = self.history[self.cursor + 1]
+            elif self.weighted and self.weight_func is not None:
+                self.peeked = self._draw_weighted(current)
+            else:
+                self.peeked = self._draw(current)
+                self.peeked_drawn = True
+        return self.peeked
+
+    def advance(self):
+        """切换到预选的下一首并返回它的下标"""
+        index = self.peek()
+        self.peeked = None
+        self.peeked_drawn = False
+        if self.cursor < len(self.history) - 1:
+            self.cursor += 1
+        else:
+            self._push(index)
+        return index
+
+    def previous(self):
+        """回到上一首并返回它的下标，没有更早的歌曲时返回None"""
+        if self.cursor <= 0:
+            return None
+        self._unpeek()
+        self.cursor -= 1
+        return self.history[self.cursor]
+
+    def started(self, index):
+        """记录开始播放的歌曲（自动切歌、回退或手动选择）"""
+        if index == self.peeked:
+            self.advance()
+        elif not (0 <= self.cursor < len(self.history) and self.history[self.cursor] == index):
+            self._unpeek()
+            # 手动选择的歌曲本轮不再抽到
+            p = self.pos.get(index, index)
+            if p >= self.drawn:
+                self._swap(self.drawn, p)
+                self.drawn += 1
+            self._push(index)
+
+    def tracks_added(self, count):
+        """电台末尾新增了 count 首歌，它们加入本轮尚未抽到的部分"""
+        self.size += count
+        self.alias = None
+
+    def tracks_removed(self, indices):
+        """电台删除了这些位置（删除前的下标），其余歌曲的下标随之前移"""
+        removed = sorted(set(indices))
+        if not removed:
+            return
+        removed_set = set(removed)
+        self._unpeek()
+
+        def shift(index):
+            return index - bisect.bisect_left(removed, index)
+
+        played = [shift(value) for value in map(self._get, range(self.drawn))
+                  if value not in removed_set]
+        history = []
+        cursor = -1
+        for i, index in enumerate(self.history):
+            if index in removed_set:
+                continue
+            history.append(shift(index))
+            if i <= self.cursor:
+                cursor = len(history) - 1
+
+        self.size -= len(removed)
+        self.perm = {}
+        self.pos = {}
+        self.drawn = 0
+        # 本轮已播放的歌曲重新放到排列前部，只需处理已抽出的项
+        for index in played:
+            self._swap(self.drawn, self.pos.get(index, index))
+            self.drawn += 1
+        self.history = history
+        self.cursor = cursor
+        self.alias = None
+
+    def played(self):
+        """一首歌的播放次数增加后调用，按 WEIGHT_REFRESH_TRACKS 决定是否重建别名表"""
+        self.plays_since_build += 1
+        if self.alias is not None and self.plays_since_build * WEIGHT_REFRESH_TRACKS >= len(self.alias):
+            self.alias = None
+
+    def weights_changed(self):
+        """权重变化后，下次加权抽样前重建别名表"""
+        self.alias = None
@@ -0,0 +1,541 @@
+import os
+import sys
+import time
+import wave
+import shutil
+import threading
+import subprocess
+import multiprocessing
+from array import array
+from collections import deque
+from multiprocessing import shared_memory
+
+# 每个PCM块的时长（秒）和环形缓冲区中的块数：缓冲区大小固定，与歌曲长度无关
+CHUNK_SECONDS = 0.1
+RING_SLOTS = 16
+# 送块线程检查声道队列的间隔（秒）
+FEED_INTERVAL = 0.02
+# 解码进程等待空闲块时检查新命令的间隔（秒）
+WRITE_WAIT = 0.05
+
+
+def find_ffmpeg():
+    """查找 ffmpeg：先找程序所在的文件夹（打包时放在可执行文件旁边），再找 PATH"""
+    name = 'ffmpeg.exe' if os.name == 'nt' else 'ffmpeg'
+    folders = [getattr(sys, '_MEIPASS', None), os.path.dirname(os.path.abspath(sys.argv[0] or '.'))]
+    for folder in folders:
+        if folder and os.path.isfile(os.path.join(folder, name)):
+            return os.path.join(folder, name)
+    return shutil.which('ffmpeg')
+
+
+# MP3 的流式解码和响度分析需要 ffmpeg，没有时 MP3 仍由 pygame.mixer.music 整首加载
+FFMPEG = find_ffmpeg()
+
+
+def wav_streamable(path, freq, channels):
+    """WAV 能否不经 ffmpeg 直接流式读取：16位、采样率与混音器相同，单声道可复制成立体声"""
+    try:
+        with wave.open(path, 'rb') as file:
+            return (file.getsampwidth() == 2 and file.getframerate() == freq
+                    and file.getnchannels() in (channels, 1))
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def can_stream(path, freq, channels):
+    """文件能否由解码进程流式解码；MP3 等格式需要 ffmpeg"""
+    if os.path.splitext(path)[1].lower() == '.wav' and wav_streamable(path, freq, channels):
+        return True
+    return FFMPEG is not None
+
+
+def iter_wav(path, start, chunk_frames, channels):
+    with wave.open(path, 'rb') as file:
+        file.setpos(min(file.getnframes(), int(start * file.getframerate())))
+        mono = file.getnchannels() == 1 and channels == 2
+        while True:
+            data = file.readframes(chunk_frames)
+            if not data:
+                return
+            if mono:
+                samples = array('h', data)
+                stereo = array('h', bytes(len(data) * 2))
+                stereo[0::2] = samples
+                stereo[1::2] = samples
+                data = stereo.tobytes()
+            yield data
+
+
+def iter_ffmpeg(path, start, chunk_bytes, freq, channels):
+    command = [FFMPEG, '-nostdin', '-v', 'error', '-ss', str(start), '-i', path,
+               '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', str(channels), '-ar', str(freq), '-']
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            yield data
+        # 无法识别的文件不会输出任何数据，只能从退出码判断
+        if process.wait() != 0:
+            raise OSError(f"ffmpeg 无法解码 {path}（退出码 {process.returncode}）")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def iter_pcm(path, start, chunk_frames, freq, channels):
+    """按块产生与混音器格式相同的16位PCM数据"""
+    if os.path.splitext(path)[1].lower() == '.wav' and wav_streamable(path, freq, channels):
+        return iter_wav(path, start, chunk_frames, channels)
+    return iter_ffmpeg(path, start, chunk_frames * 2 * channels, freq, channels)
+
+
+class DecodeWorker:
+    """解码进程中运行：按命令解码歌曲，把PCM块写入共享内存环形缓冲区
+
+    每个块在 meta 中记录 (字节数, 代号)；字节数为0表示这一代的歌曲结束，-1 表示解码出错。
+    代号在每次播放、跳转或排队时递增，读取方据此丢弃过期的块。
+    """
+
+    def __init__(self, conn, shm_name, slots, chunk_bytes, meta, free, filled, freq, channels):
+        self.conn = conn
+        self.shm = shared_memory.SharedMemory(name=shm_name)
+        self.slots = slots
+        self.chunk_bytes = chunk_bytes
+        self.meta = meta
+        self.free = free
+        self.filled = filled
+        self.freq = freq
+        self.channels = channels
+        self.write_index = 0
+        self.pending = None     # 下一首要解码的 (路径, 起始位置, 代号)
+        self.queued = None      # 当前歌曲解码完后接着解码的歌曲
+        self.interrupted = False
+        self.quit = False
+
+    def handle(self, command):
+        kind = command[0]
+        if kind == 'play':
+            self.pending = command[1:]
+            self.queued = None
+            self.interrupted = True
+        elif kind == 'queue':
+            self.queued = (command[1], 0, command[2])
+        elif kind == 'stop':
+            self.pending = None
+            self.queued = None
+            self.interrupted = True
+        elif kind == 'quit':
+            self.quit = True
+            self.interrupted = True
+
+    def poll(self):
+        while self.conn.poll():
+            self.handle(self.conn.recv())
+
+    def write(self, generation, data, marker=0):
+        """写入一块数据（数据为空时写入结束标记），缓冲区满时等待；收到新命令时放弃并返回False"""
+        while not self.free.acquire(timeout=WRITE_WAIT):
+            self.poll()
+            if self.interrupted:
+                return False
+        slot = self.write_index
+        self.write_index = (slot + 1) % self.slots
+        offset = slot * self.chunk_bytes
+        self.shm.buf[offset:offset + len(data)] = data
+        self.meta[slot * 2] = len(data) or marker
+        self.meta[slot * 2 + 1] = generation
+        self.filled.release()
+        return True
+
+    def decode(self, path, start, generation):
+        self.interrupted = False
+        chunk_frames = self.chunk_bytes // (2 * self.channels)
+        marker = 0
+        try:
+            for data in iter_pcm(path, start, chunk_frames, self.freq, self.channels):
+                self.poll()
+                if self.interrupted or not self.write(generation, data):
+                    return
+        except Exception as e:
+            # 一首歌解码出错不能让解码进程退出，用结束标记 -1 通知主进程
+            print(f"流式解码出错: {e}")
+            marker = -1
+        self.write(generation, b'', marker)
+
+    def run(self):
+        try:
+            while not self.quit:
+                if self.pending is None and self.queued is not None:
+                    self.pending, self.queued = self.queued, None
+                if self.pending is None:
+                    self.handle(self.conn.recv())
+                    continue
+                path, start, generation = self.pending
+                self.pending = None
+                self.decode(path, start, generation)
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.shm.close()
+
+
+def run_decoder(*args):
+    """解码进程的入口"""
+    DecodeWorker(*args).run()
+
+
+class StreamMusic:
+    """与 pygame.mixer.music 用法相同的播放后端：解码在独立进程中进行，
+    主进程把环形缓冲区中的小块PCM依次交给保留声道的 Channel.queue 播放
+
+    内存占用只与缓冲区大小有关，与歌曲长度无关。无法流式解码的文件交给
+    pygame.mixer.music 播放。add_tap 注册的函数会收到每一块PCM，供频谱等分析共用。
+    """
+
+    def __init__(self, chunk_seconds=CHUNK_SECONDS, slots=RING_SLOTS):
+        import pygame
+        self.pygame = pygame
+        self.fallback = pygame.mixer.music
+        self.freq, size, self.channels = pygame.mixer.get_init()
+        if size != -16:
+            raise pygame.error("流式播放只支持16位混音器")
+        self.frame_bytes = 2 * self.channels
+        self.chunk_bytes = int(self.freq * chunk_seconds) * self.frame_bytes
+        self.slots = slots
+
+        # 保留0号声道，Sound.play() 不会占用它
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+        context = multiprocessing.get_context('spawn')
+        self.shm = shared_memory.SharedMemory(create=True, size=self.chunk_bytes * slots)
+        self.meta = context.Array('q', slots * 2, lock=False)
+        self.free = context.Semaphore(slots)
+        self.filled = context.Semaphore(0)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=run_decoder, name="stream-decoder", daemon=True,
+            args=(child_conn, self.shm.name, slots, self.chunk_bytes, self.meta,
+                  self.free, self.filled, self.freq, self.channels))
+        self.process.start()
+        child_conn.close()
+
+        self.lock = threading.Lock()
+        self.read_index = 0
+        self.mode = None            # 'stream' 或 'fallback'
+        self.path = None
+        self.generation = 0         # 最近一次发出的代号
+        self.track_gen = 0          # 正在播放的歌曲的代号
+        self.queued_gen = None
+        self.queued_path = None
+        self.playing = False
+        self.paused_at = None
+        self.fade_ms = 0
+        self.fade_started_at = None
+        self.volume = 1.0
+        self.queued_volume = None   # 排队的歌曲开始播放时改用的音量
+        self.endevent = None
+        self.done_gens = set()      # 已全部解码的代号
+        self.inflight = deque()     # 已交给声道的块 (代号, 帧数)，最多两块
+        self.track_frames = 0       # 当前歌曲已播放完的帧数
+        self.chunk_started_at = None
+        self.started_at = None      # 当前歌曲的第一块实际开始播放的时刻
+        self.error = None           # 解码进程报告的错误，由 get_error 取出
+        self.fed_positions = {}     # 代号 -> 下一块在歌曲中的位置（秒）
+        self.taps = []
+        self.closed = False
+        self.thread = threading.Thread(target=self._feed, name="stream-feed", daemon=True)
+        self.thread.start()
+
+    def add_tap(self, callback):
+        """注册PCM分流：callback(路径, 块在歌曲中的位置, PCM字节) 在送块线程中调用"""
+        self.taps.append(callback)
+
+    def _can_stream(self, path):
+        return isinstance(path, str) and can_stream(path, self.freq, self.channels)
+
+    def _next_generation(self):
+        self.generation += 1
+        return self.generation
+
+    def load(self, path, namehint=""):
+        self.stop()
+        if self._can_stream(path):
+            if not (isinstance(path, str) and path.lower().endswith('.wav')
+                    and wav_streamable(path, self.freq, self.channels)):
+                # 与 pygame.mixer.music.load 一样，无法识别的文件在这里抛出 pygame.error
+                # （只解析文件头，不解码）；否则交给 ffmpeg 后只会悄悄地结束
+                self.fallback.load(path, namehint)
+                self.fallback.unload()
+            self.mode = 'stream'
+            self.path = path
+        else:
+            self.fallback.load(path, namehint)
+            self.mode = 'fallback'
+
+    def play(self, loops=0, start=0.0, fade_ms=0):
+        if self.mode == 'fallback':
+            self.fallback.play(loops, start, fade_ms)
+            return
+        if self.mode is None:
+            raise self.pygame.error("music not loaded")
+        with self.lock:
+            self.channel.stop()
+            generation = self._next_generation()
+            self.conn.send(('play', self.path, start, generation))
+            self.track_gen = generation
+            self.queued_gen = None
+            self.queued_path = None
+            self.fed_positions = {generation: start}
+            self.inflight.clear()
+            self.track_frames = 0
+            self.done_gens.clear()
+            self.fade_ms = fade_ms
+            self.fade_started_at = None
+            self.paused_at = None
+            self.queued_volume = None
+            self.started_at = None
+            self.playing = True
+
+    def queue(self, path, namehint="", loops=0):
+        if self.mode == 'fallback' and not self._can_stream(path):
+            self.fallback.queue(path, namehint, loops)
+            return
+        if self.mode != 'stream' or not self._can_stream(path):
+            raise self.pygame.error("无法在两种播放方式之间排队")
+        with self.lock:
+            generation = self._next_generation()
+            self.conn.send(('queue', path, generation))
+            self.queued_gen = generation
+            self.queued_path = path
+            self.queued_volume = None
+            self.fed_positions[generation] = 0.0
+
+    def pause(self):
+        if self.mode == 'fallback':
+            self.fallback.pause()
+            return
+        with self.lock:
+            if self.playing and self.paused_at is None:
+                self.channel.pause()
+                self.paused_at = time.monotonic()
+
+    def unpause(self):
+        if self.mode == 'fallback':
+            self.fallback.unpause()
+            return
+        with self.lock:
+            if self.paused_at is not None:
+                self.channel.unpause()
+                paused = time.monotonic() - self.paused_at
+                if self.chunk_started_at is not None:
+                    self.chunk_started_at += paused
+                if self.started_at is not None:
+                    self.started_at += paused
+                self.paused_at = None
+
+    def stop(self):
+        if self.mode == 'fallback':
+            self.fallback.stop()
+            return
+        with self.lock:
+            self.channel.stop()
+            if self.playing:
+                self.conn.send(('stop',))
+            # 之后读到的旧块都已过期
+            self.track_gen = self._next_generation()
+            self.queued_gen = None
+            self.queued_path = None
+            self.queued_volume = None
+            self.inflight.clear()
+            self.playing = False
+            self.paused_at = None
+
+    def get_busy(self):
+        if self.mode == 'fallback':
+            return self.fallback.get_busy()
+        return self.playing and self.paused_at is None
+
+    def get_pos(self):
+        """返回从 play() 开始（或排队的歌曲开始）播放的毫秒数"""
+        if self.mode == 'fallback':
+            return self.fallback.get_pos()
+        with self.lock:
+            if not self.playing:
+                return -1
+            position = self.track_frames / self.freq
+            if self.inflight and self.inflight[0][0] == self.track_gen:
+                now = self.paused_at or time.monotonic()
+                played = now - self.chunk_started_at
+                position += max(0.0, min(played, self.inflight[0][1] / self.freq))
+            return int(position * 1000)
+
+    def start_time(self):
+        """返回当前歌曲实际开始播放的时刻（time.monotonic），解码出第一块之前返回None
+
+        play() 或跳转后解码进程（MP3 还要启动 ffmpeg）需要一段时间才能送出第一块，
+        播放位置的计时应从这一刻开始；暂停的时间已从中扣除。交给 pygame.mixer.music
+        播放的文件没有这段延迟，返回现在。
+        """
+        if self.mode == 'fallback':
+            return time.monotonic()
+        with self.lock:
+            return self.started_at
+
+    def get_error(self):
+        """取出解码过程中出现的错误信息，没有时返回None；出错的歌曲与播放完一样发出结束事件"""
+        with self.lock:
+            error, self.error = self.error, None
+            return error
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self.channel.set_volume(volume)
+        self.fallback.set_volume(volume)
+
+    def get_volume(self):
+        return self.volume
+
+    def set_queued_volume(self, volume):
+        """设置排队的歌曲使用的音量，在它的第一块开始播放时生效（各歌曲的响度增益不同）"""
+        with self.lock:
+            self.queued_volume = volume
+
+    def set_endevent(self, event_type=0):
+        self.endevent = event_type
+        self.fallback.set_endevent(event_type)
+
+    def _post_end(self):
+        if self.endevent:
+            self.pygame.event.post(self.pygame.event.Event(self.endevent))
+
+    def _read_chunk(self):
+        """从环形缓冲区取出一块 (代号, 数据, 是否出错)，没有数据时返回None；结束标记的数据为None"""
+        if not self.filled.acquire(False):
+            return None
+        slot = self.read_index
+        self.read_index = (slot + 1) % self.slots
+        length = self.meta[slot * 2]
+        generation = self.meta[slot * 2 + 1]
+        data = None
+        if length > 0:
+            offset = slot * self.chunk_bytes
+            data = bytes(self.shm.buf[offset:offset + length])
+        self.free.release()
+        return generation, data, length < 0
+
+    def _update_inflight(self, now):
+        """根据声道状态移除已播放完的块，下一首的第一块开始播放时切换歌曲"""
+        in_channel = int(self.channel.get_busy()) + int(self.channel.get_queue() is not None)
+        while len(self.inflight) > in_channel:
+            generation, frames = self.inflight.popleft()
+            if generation == self.track_gen:
+                self.track_frames += frames
+            self.chunk_started_at = now
+        if self.inflight and self.inflight[0][0] == self.queued_gen:
+            # 排队的歌曲已经开始，与 pygame.mixer.music 一样发出结束事件
+            self.track_gen = self.queued_gen
+            self.path = self.queued_path
+            self.queued_gen = None
+            self.queued_path = None
+            self.track_frames = 0
+            self.started_at = self.chunk_started_at
+            if self.queued_volume is not None:
+                self.volume = self.queued_volume
+                self.queued_volume = None
+                self.channel.set_volume(self.volume)
+            self._post_end()
+
+    def _service(self):
+        """送块并更新状态（在锁内调用），返回要在锁外交给分流函数的 (路径, 位置, PCM)"""
+        now = time.monotonic()
+        tapped = []
+        self._update_inflight(now)
+        while len(self.inflight) < 2:
+            chunk = self._read_chunk()
+            if chunk is None:
+                break
+            generation, data, failed = chunk
+            if generation != self.track_gen and generation != self.queued_gen:
+                continue
+            if data is None:
+                if failed:
+                    path = self.path if generation == self.track_gen else self.queued_path
+                    self.error = f"无法解码 {path}"
+                self.done_gens.add(generation)
+                if generation == self.queued_gen and not self.fed_positions.get(generation):
+                    # 排队的歌曲一块也没有解码出来，放弃排队
+                    self.queued_gen = None
+                    self.queued_path = None
+                    self.queued_volume = None
+                continue
+            sound = self.pygame.mixer.Sound(buffer=data)
+            if not self.inflight:
+                self.channel.play(sound)
+                if self.fade_ms and self.fade_started_at is None:
+                    self.fade_started_at = now
+                self.chunk_started_at = now
+                if self.started_at is None and generation == self.track_gen:
+                    self.started_at = now
+            else:
+                self.channel.queue(sound)
+            frames = len(data) // self.frame_bytes
+            self.inflight.append((generation, frames))
+            position = self.fed_positions.get(generation, 0.0)
+            self.fed_positions[generation] = position + frames / self.freq
+            if self.taps:
+                path = self.path if generation == self.track_gen else self.queued_path
+                tapped.append((path, position, data))
+            self._update_inflight(now)
+        self._update_fade(now)
+        if self.track_gen in self.done_gens and not self.inflight and self.queued_gen is None:
+            # 歌曲已全部播放完，没有排队的下一首
+            self.playing = False
+            self._post_end()
+        return tapped
+
+    def _update_fade(self, now):
+        """淡入时逐步提高声道音量（每块都会重新开始播放，不能使用 Channel.play 的 fade_ms）"""
+        if not self.fade_ms or self.fade_started_at is None:
+            self.channel.set_volume(self.volume)
+            return
+        ratio = (now - self.fade_started_at) * 1000 / self.fade_ms
+        if ratio >= 1:
+            self.fade_ms = 0
+            self.fade_started_at = None
+            ratio = 1
+        self.channel.set_volume(self.volume * ratio)
+
+    def _feed(self):
+        while not self.closed:
+            tapped = []
+            with self.lock:
+                if self.mode == 'stream' and self.playing and self.paused_at is None:
+                    try:
+                        tapped = self._service()
+                    except self.pygame.error as e:
+                        self.error = f"流式播放出错: {e}"
+                        self.playing = False
+                        self._post_end()
+            # 分流函数（如频谱的FFT）在锁外执行，不阻塞界面线程查询播放状态
+            for path, position, data in tapped:
+                for tap in self.taps:
+                    tap(path, position, data)
+            time.sleep(FEED_INTERVAL)
+
+    def shutdown(self):
+        """停止送块线程和解码进程，释放共享内存"""
+        self.closed = True
+        try:
+            self.conn.send(('quit',))
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.thread.join(timeout=1)
+        self.shm.close()
+        self.shm.unlink()
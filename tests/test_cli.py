@@ -0,0 +1,91 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from src import cli
+from src.benchmarks import write_test_wav
+from src.data import DataHandler
+from src.library import LibraryIndex
+
+
+class CliTest(unittest.TestCase):
+    """命令行工具：导入、检查、扫描和预处理都作用于同一份数据文件"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.music = os.path.join(self.folder, "music")
+        os.makedirs(os.path.join(self.music, "专辑"))
+        self.songs = [os.path.join(self.music, "a.wav"),
+                      os.path.join(self.music, "专辑", "b.wav")]
+        for path in self.songs:
+            write_test_wav(path, 0.2)
+        with open(os.path.join(self.music, "说明.txt"), 'w') as file:
+            file.write("不是歌曲")
+        self.data_file = os.path.join(self.folder, "playlists.json")
+        self.library_file = os.path.join(self.folder, "library.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def run_cli(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = cli.main(['--data', self.data_file, '--library', self.library_file] + list(argv))
+        return code, output.getvalue()
+
+    def playlist(self, name):
+        handler = DataHandler(self.data_file, journal=True)
+        try:
+            return sorted(handler.playlists[name])
+        finally:
+            handler.close()
+
+    def test_import_adds_audio_files_once(self):
+        self.assertEqual(self.run_cli('import', self.music, '--playlist', "导入")[0], 0)
+        self.assertEqual(self.playlist("导入"), sorted(self.songs))
+        # 再次导入同一文件夹不会重复添加
+        self.assertEqual(self.run_cli('import', self.music, '--playlist', "导入")[0], 0)
+        self.assertEqual(self.playlist("导入"), sorted(self.songs))
+
+    def test_import_missing_folder_fails(self):
+        code, output = self.run_cli('import', os.path.join(self.folder, "none"))
+        self.assertEqual(code, 1)
+        self.assertIn("文件夹不存在", output)
+
+    def test_validate_and_fix(self):
+        self.run_cli('import', self.music)
+        self.assertEqual(self.run_cli('validate')[0], 0)
+        os.remove(self.songs[0])
+        code, output = self.run_cli('validate')
+        self.assertEqual(code, 1)
+        self.assertIn("文件不存在", output)
+        self.assertEqual(self.run_cli('validate', '--fix')[0], 0)
+        self.assertEqual(self.playlist("默认电台"), [self.songs[1]])
+        self.assertEqual(self.run_cli('validate')[0], 0)
+
+    def test_scan_syncs_watched_folder(self):
+        self.run_cli('import', self.music)
+        added = os.path.join(self.music, "c.wav")
+        write_test_wav(added, 0.2)
+        os.remove(self.songs[1])
+        self.assertEqual(self.run_cli('scan')[0], 0)
+        self.assertEqual(self.playlist("默认电台"), sorted([self.songs[0], added]))
+
+    def test_warm_fills_the_library(self):
+        self.run_cli('import', self.music)
+        code, output = self.run_cli('warm', '--no-seek')
+        self.assertEqual(code, 0)
+        self.assertIn("2 首歌曲", output)
+        library = LibraryIndex(self.library_file)
+        try:
+            self.assertEqual(len(library.cached_tracks(self.songs)), 2)
+        finally:
+            library.close()
+        self.assertEqual(self.run_cli('warm', '--playlist', "不存在")[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
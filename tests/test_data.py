@@ -0,0 +1,199 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src import data
+from src.data import DataHandler
+
+
+class JournalTest(unittest.TestCase):
+    """日志模式：每次修改追加一行，重新打开时重放，写入中途崩溃的最后一行被忽略"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "playlists.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_edits_are_replayed(self):
+        # 第一次打开时写入快照，之后的修改只追加到日志
+        DataHandler(self.data_file, journal=True).close()
+        handler = DataHandler(self.data_file, journal=True)
+        handler.create_playlist("电台A")
+        handler.add_tracks("电台A", ["/music/a.mp3", "/music/b.mp3", "/music/c.mp3"])
+        handler.remove_tracks("电台A", [1])
+        handler.set_current("电台A")
+        handler.close()
+        self.assertGreater(os.path.getsize(handler.journal_file), 0)
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(handler.current_playlist_name, "电台A")
+        self.assertEqual(list(handler.playlists["电台A"]), ["/music/a.mp3", "/music/c.mp3"])
+        handler.close()
+
+    def test_torn_last_line_is_dropped(self):
+        DataHandler(self.data_file, journal=True).close()
+        handler = DataHandler(self.data_file, journal=True)
+        handler.add_tracks("默认电台", ["/music/a.mp3"])
+        handler.close()
+        with open(handler.journal_file, 'ab') as file:
+            file.write(b'{"op":"add","playlist":"\xe9')
+        size = os.path.getsize(handler.journal_file)
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(list(handler.playlists["默认电台"]), ["/music/a.mp3"])
+        self.assertLess(os.path.getsize(handler.journal_file), size)
+        # 截掉损坏的部分后，新追加的修改能被正确读取
+        handler.add_tracks("默认电台", ["/music/b.mp3"])
+        handler.close()
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(list(handler.playlists["默认电台"]), ["/music/a.mp3", "/music/b.mp3"])
+        handler.close()
+
+
+class ShardedSnapshotTest(unittest.TestCase):
+    """分片快照：从单个 JSON 文件迁移，启动时只读取当前电台"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "playlists.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_legacy_file(self):
+        with open(self.data_file, 'w', encoding='utf-8') as file:
+            json.dump({'playlists': {"默认电台": ["/music/a.mp3"],
+                                     "电台B": ["/music/b.mp3", "/music/a.mp3"]},
+                       'current_playlist_name': "默认电台"}, file, ensure_ascii=False)
+
+    def test_migrates_from_single_json_file(self):
+        self.write_legacy_file()
+        handler = DataHandler(self.data_file, journal=True)
+        handler.close()
+        self.assertTrue(os.path.exists(handler.index_file))
+        self.assertCountEqual(handler.shards, ["默认电台", "电台B"])
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(list(handler.playlists["电台B"]), ["/music/b.mp3", "/music/a.mp3"])
+        # 两个电台共用歌曲表中的同一首歌
+        self.assertEqual(len(handler.tracks), 2)
+        handler.close()
+
+    def test_other_playlists_load_on_first_access(self):
+        self.write_legacy_file()
+        DataHandler(self.data_file, journal=True).close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        handler.add_tracks("电台B", ["/music/c.mp3"])
+        handler.close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertTrue(handler.playlists.is_loaded("默认电台"))
+        self.assertFalse(handler.playlists.is_loaded("电台B"))
+        self.assertIn("电台B", handler.playlists)
+        # 尚未加载的电台的修改推迟到读取分片时应用
+        self.assertEqual(list(handler.playlists["电台B"]),
+                         ["/music/b.mp3", "/music/a.mp3", "/music/c.mp3"])
+        self.assertEqual([name for name, _ in handler.loaded_playlists()], ["默认电台", "电台B"])
+        handler.close()
+
+    def test_deleted_playlist_shard_is_removed(self):
+        self.write_legacy_file()
+        DataHandler(self.data_file, journal=True).close()
+        handler = DataHandler(self.data_file, journal=True)
+        shard = os.path.join(handler.shard_dir, handler.shards["电台B"])
+        handler.delete_playlist("电台B")
+        with mock.patch.object(data, 'JOURNAL_COMPACT_BYTES', -1):
+            handler.flush()
+        self.assertFalse(os.path.exists(shard))
+        handler.close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(list(handler.playlists), ["默认电台"])
+        handler.close()
+
+
+class ReopenCompactionTest(unittest.TestCase):
+    """当前电台和默认电台都被删除后重新打开，再合并日志"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "playlists.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_recreated_default_playlist_survives_compaction(self):
+        handler = DataHandler(self.data_file, journal=True)
+        handler.create_playlist("电台A")
+        handler.set_current("电台A")
+        handler.add_tracks("电台A", ["/music/a.mp3"])
+        handler.close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        handler.delete_playlist("默认电台")
+        handler.delete_playlist("电台A")
+        handler.close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(handler.current_playlist_name, "默认电台")
+        handler.create_playlist("电台B")
+        handler.add_tracks("电台B", ["/music/b.mp3"])
+        # 日志超过合并阈值，下一次写入会合并进分片快照
+        with mock.patch.object(data, 'JOURNAL_COMPACT_BYTES', 0):
+            handler.flush()
+        self.assertIn("默认电台", handler.shards)
+        handler.close()
+        self.assertEqual(os.path.getsize(handler.journal_file), 0)
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertCountEqual(handler.playlists, ["默认电台", "电台B"])
+        self.assertEqual(list(handler.playlists["默认电台"]), [])
+        self.assertEqual(list(handler.playlists["电台B"]), ["/music/b.mp3"])
+        handler.close()
+
+
+class FailedSaveTest(unittest.TestCase):
+    """保存失败后修改保留在内存中，之后的写入仍会保存它们"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "playlists.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_failed_journal_append_is_retried(self):
+        handler = DataHandler(self.data_file, journal=True)
+        handler.flush()
+        handler.add_tracks("默认电台", ["/music/a.mp3"])
+        with mock.patch.object(handler, 'append_journal', return_value=False):
+            handler.flush()
+        self.assertEqual(len(handler.pending_ops), 1)
+        self.assertIsNotNone(handler.first_change)
+        handler.close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(list(handler.playlists["默认电台"]), ["/music/a.mp3"])
+        handler.close()
+
+    def test_writer_survives_snapshot_error(self):
+        handler = DataHandler(self.data_file, journal=True)
+        with mock.patch.object(handler, '_snapshot', side_effect=RuntimeError("boom")):
+            handler.add_tracks("默认电台", ["/music/a.mp3"])
+            handler.writer.join(data.SAVE_MAX_DELAY + 1)
+        self.assertTrue(handler.writer.is_alive())
+        handler.close()
+
+        handler = DataHandler(self.data_file, journal=True)
+        self.assertEqual(list(handler.playlists["默认电台"]), ["/music/a.mp3"])
+        handler.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
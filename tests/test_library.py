@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.benchmarks import write_test_wav
+from src.library import LibraryIndex
+
+
+class StoreTest(unittest.TestCase):
+    """重新探测歌曲时，只有文件大小不变才保留响度分析结果"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.library = LibraryIndex(os.path.join(self.folder, "library.db"))
+        self.path = os.path.join(self.folder, "tone.wav")
+        write_test_wav(self.path, 0.5)
+        self.library.get_track(self.path)
+        self.library.update(self.path, loudness=-20.0, peak=0.5, gain=2.0)
+
+    def tearDown(self):
+        self.library.close()
+        shutil.rmtree(self.folder)
+
+    def test_touched_file_keeps_analysis(self):
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        track = self.library.get_track(self.path)
+        self.assertEqual(track['mtime'], stat.st_mtime + 10)
+        self.assertEqual((track['loudness'], track['peak'], track['gain']), (-20.0, 0.5, 2.0))
+
+    def test_changed_file_is_analyzed_again(self):
+        write_test_wav(self.path, 1.0)
+        track = self.library.get_track(self.path)
+        self.assertAlmostEqual(track['duration'], 1.0)
+        self.assertIsNone(track['loudness'])
+        self.assertIn(self.path, self.library.unanalyzed_tracks())
+
+
+class SettingsTest(unittest.TestCase):
+    """播放设置保存在曲库索引中，重新打开后仍然有效"""
+
+    def test_setting_survives_reopen(self):
+        folder = tempfile.mkdtemp()
+        try:
+            db_file = os.path.join(folder, "library.db")
+            library = LibraryIndex(db_file)
+            self.assertEqual(library.get_setting('crossfade_ms', 0), 0)
+            library.set_setting('crossfade_ms', 3000)
+            library.close()
+            library = LibraryIndex(db_file)
+            self.assertEqual(library.get_setting('crossfade_ms', 0), 3000)
+            library.close()
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import codecs
+import os
+import shutil
+import tempfile
+import unittest
+
+from src import utils
+from src.utils import decode_lyrics, load_lyrics_file, parse_lyrics
+
+
+class ParseLyricsTest(unittest.TestCase):
+    """LRC歌词解析：多个时间标签、毫秒精度、offset 和元数据"""
+
+    def test_lines_are_sorted_by_time(self):
+        lyrics = parse_lyrics("[00:05.00]第二句\n[00:01.00]第一句\n")
+        self.assertEqual(list(lyrics), [(1.0, "第一句"), (5.0, "第二句")])
+
+    def test_several_time_tags_on_one_line(self):
+        lyrics = parse_lyrics("[00:10.00][01:10.00]副歌\n[00:20.00]主歌\n")
+        self.assertEqual(list(lyrics.times), [10.0, 20.0, 70.0])
+        self.assertEqual(lyrics.texts, ["副歌", "主歌", "副歌"])
+
+    def test_fraction_precision(self):
+        lyrics = parse_lyrics("[00:01.5]a\n[00:02.25]b\n[00:03.125]c\n[00:04:50]d\n[00:05]e\n")
+        self.assertEqual(list(lyrics.times), [1.5, 2.25, 3.125, 4.5, 5.0])
+
+    def test_meta_tags_and_offset(self):
+        lyrics = parse_lyrics("[ti:标题]\n[ar:歌手]\n[offset:+500]\n[00:00.20]a\n[00:02.00]b\n")
+        self.assertEqual(lyrics.tags['ti'], "标题")
+        self.assertEqual(lyrics.tags['ar'], "歌手")
+        # offset 为正时歌词提前显示，时间不会小于0
+        self.assertEqual(list(lyrics.times), [0.0, 1.5])
+        self.assertEqual(len(lyrics), 2)
+
+    def test_invalid_offset_and_text_lines_are_ignored(self):
+        lyrics = parse_lyrics("歌词说明\n[offset:abc]\n[00:01.00]a\n\n[xx]\n")
+        self.assertEqual(list(lyrics), [(1.0, "a")])
+
+
+
+class DecodeLyricsTest(unittest.TestCase):
+    """歌词编码识别：BOM优先，UTF-8先于记住的编码"""
+
+    def test_bom_decides_the_encoding(self):
+        self.assertEqual(decode_lyrics(codecs.BOM_UTF8 + "歌词".encode('utf-8')),
+                         ("歌词", 'utf-8-sig'))
+        self.assertEqual(decode_lyrics(codecs.BOM_UTF16_LE + "歌词".encode('utf-16-le'))[0], "歌词")
+
+    def test_gbk_file_falls_back_to_gb18030(self):
+        self.assertEqual(decode_lyrics("歌词".encode('gbk')), ("歌词", 'gb18030'))
+
+    def test_utf8_is_tried_before_remembered_encoding(self):
+        # 歌词改存为UTF-8后，记住的旧编码不能把它解成乱码
+        self.assertEqual(decode_lyrics("歌词".encode('utf-8'), 'gb18030'), ("歌词", 'utf-8'))
+        self.assertEqual(decode_lyrics("歌詞".encode('big5'), 'big5'), ("歌詞", 'big5'))
+
+    def test_unknown_encoding_is_skipped(self):
+        self.assertEqual(decode_lyrics("歌词".encode('gbk'), 'no-such-codec')[1], 'gb18030')
+
+
+class LoadLyricsFileTest(unittest.TestCase):
+    """读取歌词文件：结果按修改时间缓存"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "song.lrc")
+        utils.lyrics_cache = utils.LyricsCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, text, encoding, mtime):
+        with open(self.path, 'w', encoding=encoding) as file:
+            file.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_cached_until_file_changes(self):
+        self.write("[00:01.00]第一版\n", 'gbk', 1000)
+        lyrics = load_lyrics_file(self.path)
+        self.assertEqual(lyrics.encoding, 'gb18030')
+        self.assertIs(load_lyrics_file(self.path), lyrics)
+        self.write("[00:01.00]第二版\n", 'utf-8', 2000)
+        lyrics = load_lyrics_file(self.path, lyrics.encoding)
+        self.assertEqual((lyrics.texts, lyrics.encoding), (["第二版"], 'utf-8'))
+
+    def test_missing_file_gives_empty_lyrics(self):
+        self.assertEqual(len(load_lyrics_file(os.path.join(self.folder, "none.lrc"))), 0)
+
+    def test_cache_is_bounded(self):
+        cache = utils.LyricsCache(maxsize=2)
+        for key in "abc":
+            cache.put(key, parse_lyrics(""))
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
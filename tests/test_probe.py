@@ -0,0 +1,103 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from src.benchmarks import write_test_vbr_mp3
+from src.probe import (SEEK_TABLE_STEP, SeekTable, build_seek_table, probe_duration,
+                       probe_mp3_duration)
+
+# MPEG1 第三层、44100Hz 每帧的时长（秒）
+FRAME_SECONDS = 1152 / 44100
+
+
+def cbr_frame(bitrate_index=9):
+    """一个 128kbps（索引9）、44100Hz、单声道的静音帧"""
+    return bytes([0xFF, 0xFB, bitrate_index << 4, 0xC0]) + bytes(144 * 128000 // 44100 - 4)
+
+
+class ProbeDurationTest(unittest.TestCase):
+    """只读取帧头得到的时长"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "test.mp3")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_vbr_without_xing_tag_counts_frames(self):
+        write_test_vbr_mp3(self.path, 2000)
+        self.assertAlmostEqual(probe_duration(self.path), 2000 * FRAME_SECONDS, places=6)
+
+    def test_cbr_is_estimated_from_file_size(self):
+        with open(self.path, 'wb') as file:
+            file.write(cbr_frame() * 500)
+        # 合成的帧没有填充字节，比按码率计算的帧长略短，估算结果偏短不到1%
+        self.assertAlmostEqual(probe_mp3_duration(self.path), 500 * FRAME_SECONDS,
+                               delta=500 * FRAME_SECONDS * 0.01)
+
+
+class SeekTableTest(unittest.TestCase):
+    """在合成的VBR文件上检查帧偏移表的跳转误差"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "vbr.mp3")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assertLocatesFrames(self, table, truth):
+        frame_times = dict(truth)
+        rng = random.Random(3)
+        for _ in range(500):
+            target = rng.uniform(0, table.duration)
+            offset, position = table.locate(target)
+            # 跳转到的位置是一个真实的帧，时钟从该帧的起始时间开始
+            self.assertIn(offset, frame_times)
+            self.assertAlmostEqual(position, frame_times[offset], places=6)
+            self.assertGreaterEqual(target, position - 1e-9)
+            self.assertLess(target - position, SEEK_TABLE_STEP * FRAME_SECONDS + 1e-9)
+
+    def test_locate_lands_on_frames(self):
+        truth = write_test_vbr_mp3(self.path, 3000)
+        table = build_seek_table(self.path)
+        self.assertAlmostEqual(table.duration, 3000 * FRAME_SECONDS, places=6)
+        self.assertLocatesFrames(table, truth)
+
+    def test_round_trip_through_bytes(self):
+        write_test_vbr_mp3(self.path, 500)
+        table = build_seek_table(self.path)
+        restored = SeekTable.from_bytes(table.to_bytes())
+        self.assertEqual(restored.duration, table.duration)
+        self.assertEqual(list(restored.offsets), list(table.offsets))
+        self.assertEqual(restored.locate(5.0), table.locate(5.0))
+
+    def test_trailing_tag_with_sync_bytes_is_not_counted(self):
+        truth = write_test_vbr_mp3(self.path, 1000)
+        with open(self.path, 'ab') as file:
+            # 结尾的 ID3v1 标签中出现像帧头的字节
+            file.write(b'TAG' + bytes([0xFF, 0xFB, 0x90, 0xC0]) + bytes(121))
+        table = build_seek_table(self.path)
+        self.assertAlmostEqual(table.duration, 1000 * FRAME_SECONDS, places=6)
+        self.assertLocatesFrames(table, truth)
+
+    def test_damaged_data_is_skipped(self):
+        truth = write_test_vbr_mp3(self.path, 1000)
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        cut = truth[500][0]
+        # 在两帧之间插入一段损坏的数据，其中有无效的同步字
+        garbage = bytes([0x12, 0xFF, 0xFF, 0x00, 0xFF, 0xE2, 0x00]) * 20
+        with open(self.path, 'wb') as file:
+            file.write(data[:cut] + garbage + data[cut:])
+        table = build_seek_table(self.path)
+        self.assertAlmostEqual(table.duration, 1000 * FRAME_SECONDS, places=6)
+        shifted = truth[:500] + [(offset + len(garbage), start) for offset, start in truth[500:]]
+        self.assertLocatesFrames(table, shifted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from src.search import SearchIndex, search_text
+
+
+class SearchIndexTest(unittest.TestCase):
+    """跨电台搜索：多个查询词为“与”，结果随歌曲增删即时变化"""
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add_tracks("电台A", ["/music/周杰伦/七里香/晴天.mp3",
+                                        "/music/周杰伦/七里香/七里香.mp3",
+                                        "/music/Queen/Opera/Bohemian Rhapsody.mp3"])
+        self.index.add_tracks("电台B", ["/music/周杰伦/七里香/晴天.mp3",
+                                        "/music/Beatles/Help/Yesterday.wav"])
+
+    def test_text_includes_folders_and_title(self):
+        self.assertEqual(search_text("/m/歌手/专辑/01.mp3", "标题"), "01 专辑 歌手 标题")
+
+    def test_query_is_case_insensitive(self):
+        self.assertEqual(self.index.search("bohemian"),
+                         [("电台A", "/music/Queen/Opera/Bohemian Rhapsody.mp3")])
+
+    def test_words_must_all_match(self):
+        self.assertEqual(self.index.search("queen rhapsody"),
+                         [("电台A", "/music/Queen/Opera/Bohemian Rhapsody.mp3")])
+        self.assertEqual(self.index.search("queen yesterday"), [])
+
+    def test_song_in_several_playlists(self):
+        self.assertEqual(self.index.search("晴天"),
+                         [("电台A", "/music/周杰伦/七里香/晴天.mp3"),
+                          ("电台B", "/music/周杰伦/七里香/晴天.mp3")])
+
+    def test_short_query_scans_all_texts(self):
+        # 不足三个字符的查询没有三元组，在拼接字符串中查找
+        self.assertEqual(len(self.index.search("七里")), 3)
+        self.assertEqual(self.index.search("ye"), [("电台B", "/music/Beatles/Help/Yesterday.wav")])
+        self.index.add_tracks("电台B", ["/music/其他/单曲/yes.mp3"])
+        self.assertEqual(len(self.index.search("ye")), 2)
+
+    def test_removed_tracks_disappear(self):
+        self.index.remove_tracks("电台A", ["/music/周杰伦/七里香/晴天.mp3"])
+        self.assertEqual(self.index.search("晴天"), [("电台B", "/music/周杰伦/七里香/晴天.mp3")])
+        self.index.remove_playlist("电台B", ["/music/周杰伦/七里香/晴天.mp3",
+                                             "/music/Beatles/Help/Yesterday.wav"])
+        self.assertEqual(self.index.search("晴天"), [])
+        self.assertEqual(self.index.search("ye"), [])
+
+    def test_build_and_limit(self):
+        index = SearchIndex()
+        index.build({"电台": [f"/music/歌手/专辑/{i}.mp3" for i in range(500)],
+                     "空电台": []})
+        self.assertEqual(len(index.search("专辑")), 200)
+        self.assertEqual(len(index.search("专辑", limit=10)), 10)
+        self.assertEqual(index.search("   "), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
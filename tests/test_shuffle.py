@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from src.shuffle import AliasTable, ShuffleEngine
+
+
+def play(engine, current=None):
+    """像播放器一样预选并开始播放下一首"""
+    index = engine.peek(current)
+    engine.started(index)
+    return index
+
+
+class ShuffleEngineTest(unittest.TestCase):
+    """随机播放：一轮内不重复，回退后按原来的顺序继续"""
+
+    def test_each_round_plays_every_track_once(self):
+        engine = ShuffleEngine(50, rng=random.Random(1))
+        current = None
+        for _ in range(4):
+            played = []
+            for _ in range(50):
+                current = play(engine, current)
+                played.append(current)
+            self.assertEqual(sorted(played), list(range(50)))
+
+    def test_no_immediate_repeat_across_rounds(self):
+        engine = ShuffleEngine(3, rng=random.Random(2))
+        current = None
+        for _ in range(300):
+            index = play(engine, current)
+            self.assertNotEqual(index, current)
+            current = index
+
+    def test_previous_then_forward_replays_history(self):
+        engine = ShuffleEngine(20, rng=random.Random(3))
+        current = None
+        played = []
+        for _ in range(5):
+            current = play(engine, current)
+            played.append(current)
+        self.assertEqual(engine.previous(), played[3])
+        self.assertEqual(engine.previous(), played[2])
+        self.assertEqual(play(engine, played[2]), played[3])
+        self.assertEqual(play(engine, played[3]), played[4])
+
+    def test_manually_started_track_is_not_drawn_again(self):
+        engine = ShuffleEngine(10, rng=random.Random(4))
+        engine.started(7)
+        played = [7] + [play(engine) for _ in range(9)]
+        self.assertEqual(sorted(played), list(range(10)))
+
+    def test_removed_tracks_shift_the_round(self):
+        engine = ShuffleEngine(10, rng=random.Random(5))
+        played = [play(engine) for _ in range(4)]
+        engine.tracks_removed([0, 1])
+        shifted = [index - 2 for index in played if index >= 2]
+        rest = [play(engine) for _ in range(8 - len(shifted))]
+        self.assertEqual(sorted(shifted + rest), list(range(8)))
+
+
+class WeightedShuffleTest(unittest.TestCase):
+    """偏好随机：按权重抽样，播放次数变化后使用新的权重"""
+
+    def test_alias_table_follows_weights(self):
+        rng = random.Random(6)
+        table = AliasTable([1, 0, 3])
+        counts = [0, 0, 0]
+        for _ in range(20000):
+            counts[table.sample(rng)] += 1
+        self.assertEqual(counts[1], 0)
+        self.assertAlmostEqual(counts[2] / counts[0], 3, delta=0.3)
+
+    def test_plays_refresh_weights(self):
+        weights = [1, 1, 1, 1]
+        engine = ShuffleEngine(4, rng=random.Random(7))
+        engine.weighted = True
+        engine.weight_func = lambda: list(weights)
+        play(engine)
+        # 只剩第3首有权重，下一次预选前别名表必须重建
+        weights[:] = [0, 0, 0, 1]
+        engine.played()
+        self.assertEqual(play(engine), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from src.tracks import Playlist, TrackTable, split_path
+
+
+class TrackTableTest(unittest.TestCase):
+    """所有电台共用的歌曲表：同一路径只保存一次，编号在导出后保持不变"""
+
+    def test_intern_returns_the_same_id(self):
+        table = TrackTable()
+        first = table.intern("/music/歌手/a.mp3")
+        self.assertEqual(table.intern("/music/歌手/a.mp3"), first)
+        self.assertNotEqual(table.intern("/music/歌手/b.mp3"), first)
+        self.assertEqual(len(table), 2)
+        # 同一目录下的歌曲共用一个目录字符串
+        self.assertEqual(len(table.dirs), 1)
+
+    def test_paths_round_trip(self):
+        table = TrackTable()
+        paths = ["/music/a.mp3", "C:\\音乐\\专辑\\b.wav", "c.mp3", "/music/sub/\udcff.mp3"]
+        ids = [table.intern(path) for path in paths]
+        self.assertEqual([table.path(track_id) for track_id in ids], paths)
+        self.assertEqual(split_path("C:\\音乐\\b.wav"), ("C:\\音乐\\", "b.wav"))
+
+    def test_lookup_does_not_add(self):
+        table = TrackTable()
+        table.intern("/music/a.mp3")
+        self.assertIsNone(table.lookup("/music/missing.mp3"))
+        self.assertIsNone(table.lookup("/other/a.mp3"))
+        self.assertEqual(len(table), 1)
+
+    def test_hash_table_grows(self):
+        table = TrackTable()
+        paths = [f"/music/{i // 100}/{i}.mp3" for i in range(5000)]
+        ids = [table.intern(path) for path in paths]
+        self.assertEqual(ids, list(range(5000)))
+        self.assertEqual([table.lookup(path) for path in paths], ids)
+
+    def test_ids_survive_export(self):
+        table = TrackTable()
+        paths = [f"/music/{i % 7}/{i}.mp3" for i in range(100)]
+        for path in paths:
+            table.intern(path)
+        restored = TrackTable.from_dict(table.to_dict())
+        self.assertEqual([restored.lookup(path) for path in paths], list(range(100)))
+        self.assertEqual(restored.intern("/music/new.mp3"), 100)
+
+
+class PlaylistTest(unittest.TestCase):
+    """以歌曲编号保存的电台，用法与路径列表相同"""
+
+    def setUp(self):
+        self.table = TrackTable()
+        self.paths = [f"/music/{i}.mp3" for i in range(10)]
+        self.playlist = Playlist(self.table, self.paths)
+
+    def test_behaves_like_a_list(self):
+        self.assertEqual(list(self.playlist), self.paths)
+        self.assertEqual(self.playlist[3], self.paths[3])
+        self.assertEqual(self.playlist[2:4], self.paths[2:4])
+        self.assertEqual(self.playlist, self.paths)
+        self.assertIn("/music/5.mp3", self.playlist)
+        self.assertNotIn("/music/none.mp3", self.playlist)
+        self.assertEqual(self.playlist.index("/music/5.mp3"), 5)
+        with self.assertRaises(ValueError):
+            self.playlist.index("/music/none.mp3")
+
+    def test_playlists_share_the_table(self):
+        other = Playlist(self.table, self.paths[:3])
+        self.assertEqual(len(self.table), 10)
+        self.assertEqual(other.ids.tolist(), self.playlist.ids[:3].tolist())
+        # 一个电台中没有的歌曲即使在歌曲表中也不算包含
+        self.assertNotIn("/music/9.mp3", other)
+
+    def test_remove_indices(self):
+        self.playlist.remove_indices([8, 0, 3, 3])
+        expected = [path for i, path in enumerate(self.paths) if i not in (0, 3, 8)]
+        self.assertEqual(list(self.playlist), expected)
+
+    def test_find_indices(self):
+        self.playlist.append("/music/0.mp3")
+        self.assertEqual(self.playlist.find_indices({"/music/0.mp3", "/music/4.mp3", "/x.mp3"}),
+                         [0, 4, 10])
+
+    def test_replace_and_extend(self):
+        self.playlist[:] = ["/music/9.mp3", "/music/new.mp3"]
+        self.playlist.extend(["/music/1.mp3"])
+        self.assertEqual(list(self.playlist), ["/music/9.mp3", "/music/new.mp3", "/music/1.mp3"])
+        with self.assertRaises(TypeError):
+            self.playlist[0] = "/music/2.mp3"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from src.benchmarks import _init_headless_mixer, write_test_wav, write_test_vbr_mp3
+from src.probe import mp3_tail_offset
+from src.transition import TransitionEngine, extract_tail, mixer_frame_bytes
+
+# 无缝衔接允许的切歌间隙（毫秒），虚拟音频驱动下按播放位置推算的时刻有几十毫秒误差
+MAX_GAP_MS = 150
+
+
+class ExtractTailTest(unittest.TestCase):
+    """淡入淡出使用的结尾片段只解码文件末尾，内容与整首解码的结尾相同"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pygame = _init_headless_mixer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pygame.mixer.quit()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assertTailMatches(self, path, seconds):
+        frame_bytes, freq = mixer_frame_bytes()
+        tail = extract_tail(path, seconds)
+        self.assertEqual(len(tail), int(seconds * freq) * frame_bytes)
+        full = self.pygame.mixer.Sound(path).get_raw()
+        self.assertEqual(tail, full[-len(tail):])
+
+    def test_wav_tail(self):
+        path = os.path.join(self.folder, "stereo.wav")
+        write_test_wav(path, 6, tone=330)
+        self.assertTailMatches(path, 2.0)
+
+    def test_wav_tail_converted_to_mixer_format(self):
+        path = os.path.join(self.folder, "mono.wav")
+        write_test_wav(path, 6, freq=22050, channels=1, tone=330)
+        self.assertTailMatches(path, 2.0)
+
+    def test_mp3_tail_starts_at_a_frame_near_the_end(self):
+        path = os.path.join(self.folder, "vbr.mp3")
+        truth = write_test_vbr_mp3(path, 2000)
+        offset = mp3_tail_offset(path, 3.0)
+        self.assertIn(offset, [frame_offset for frame_offset, _ in truth])
+        start_time = dict(truth)[offset]
+        self.assertGreater(start_time, 2000 * 1152 / 44100 - 30)
+        self.assertTailMatches(path, 2.0)
+
+
+class GaplessTransitionTest(unittest.TestCase):
+    """放入队列的下一首在上一首结束时立即开始，中间没有停顿"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pygame = _init_headless_mixer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pygame.mixer.quit()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(2):
+            path = os.path.join(self.folder, f"track{i}.wav")
+            write_test_wav(path, 1.0, tone=440 * (i + 1))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.pygame.mixer.music.stop()
+        self.pygame.mixer.music.unload()
+        shutil.rmtree(self.folder)
+
+    def test_queued_track_starts_without_gap(self):
+        music = self.pygame.mixer.music
+        engine = TransitionEngine(music=music)
+        try:
+            music.load(self.paths[0])
+            music.play()
+            time.sleep(0.2)
+            engine.track_started(music.get_pos() / 1000, 1.0)
+            engine.prepare(self.paths[0], self.paths[1])
+            self.assertEqual(engine.queued_path, self.paths[1])
+
+            last_pos = 0
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                # 切歌前后混音器一直在播放
+                self.assertTrue(music.get_busy())
+                position = music.get_pos() / 1000
+                if position < last_pos:
+                    break
+                last_pos = position
+                time.sleep(0.001)
+            else:
+                self.fail("队列中的下一首没有开始播放")
+            time.sleep(0.2)
+            self.assertEqual(engine.queued_track_started(music.get_pos() / 1000), self.paths[1])
+        finally:
+            engine.shutdown()
+        report = engine.gap_report()
+        self.assertEqual(report['count'], 1)
+        self.assertLess(abs(report['avg_ms']), MAX_GAP_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
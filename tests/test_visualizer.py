@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src import visualizer
+from src.benchmarks import _init_headless_mixer, write_test_wav, write_test_vbr_mp3
+from src.probe import build_seek_table
+
+
+class DecodeSpectrumTest(unittest.TestCase):
+    """分段解码得到的频谱帧与整首解码相同"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pygame = _init_headless_mixer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pygame.mixer.quit()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def whole_track_frames(self, path):
+        samples = self.pygame.sndarray.array(self.pygame.mixer.Sound(path))
+        return visualizer.compute_spectrum_frames(samples, self.pygame.mixer.get_init()[0])
+
+    def test_wav_segments_match_whole_decode(self):
+        path = os.path.join(self.folder, "tone.wav")
+        write_test_wav(path, 10.3, tone=330)
+        with mock.patch.object(visualizer, 'SEGMENT_SECONDS', 3):
+            frames = visualizer.decode_spectrum(path)
+        np.testing.assert_allclose(frames, self.whole_track_frames(path), atol=1e-6)
+
+    def test_mp3_segments_cover_the_track(self):
+        path = os.path.join(self.folder, "vbr.mp3")
+        write_test_vbr_mp3(path, 2000)
+        table = build_seek_table(path)
+        with mock.patch.object(visualizer, 'SEGMENT_SECONDS', 10):
+            frames = visualizer.decode_spectrum(path, table)
+        self.assertAlmostEqual(len(frames), table.duration * visualizer.SPECTRUM_FPS, delta=2)
+
+    def test_large_file_without_seek_table_is_skipped(self):
+        path = os.path.join(self.folder, "vbr.mp3")
+        write_test_vbr_mp3(path, 2000)
+        with mock.patch.object(visualizer, 'MAX_WHOLE_DECODE_BYTES', 1024):
+            frames = visualizer.decode_spectrum(path)
+        self.assertEqual(len(frames), 0)
+
+
+class ComputeSpectrumTest(unittest.TestCase):
+
+    def test_stereo_uses_integer_full_scale(self):
+        mono = (np.sin(np.arange(44100) * 0.1) * 8000).astype(np.int16)
+        stereo = np.stack([mono, mono], axis=1)
+        np.testing.assert_allclose(visualizer.compute_spectrum_frames(stereo, 44100),
+                                   visualizer.compute_spectrum_frames(mono, 44100), atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import threading
+from array import array
+
+
+def split_path(path):
+    """拆分为目录（保留末尾的分隔符）和文件名，拼接后与原路径完全相同"""
+    i = max(path.rfind('/'), path.rfind('\\'))
+    return path[:i + 1], path[i + 1:]
+
+
+# 开放寻址哈希表中的空位
+EMPTY_SLOT = 0xFFFFFFFF
+
+
+class TrackTable:
+    """所有电台共用的歌曲表：每首歌只保存一次，目录字符串由同一目录下的歌曲共享
+
+    文件名以 UTF-8 字节保存（中文文件名比 str 省一半空间）；按路径查找编号用的是
+    保存在整数数组中的开放寻址哈希表，每首歌只占几个字节，不为每首歌创建字典项。
+    哈希表在第一次按路径查找时才建立，只按编号读取路径时不需要它。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dir_ids = {}           # 目录 -> 目录编号
+        self.dirs = []              # 目录编号 -> 目录
+        self.track_dirs = array('I')  # 歌曲编号 -> 目录编号
+        self.track_names = []       # 歌曲编号 -> 文件名
+        self.slots = None
+
+    def __len__(self):
+        return len(self.track_names)
+
+    def _slot(self, dir_id, name):
+        """返回 (目录编号, 文件名) 所在或应插入的位置"""
+        slots = self.slots
+        mask = len(slots) - 1
+        i = hash((dir_id, name)) & mask
+        while True:
+            track_id = slots[i]
+            if track_id == EMPTY_SLOT or (self.track_dirs[track_id] == dir_id
+                                          and self.track_names[track_id] == name):
+                return i
+            i = (i + 1) & mask
+
+    def _build_slots(self, size=1024):
+        """建立容量为 size 的哈希表并放入所有歌曲，保持装载率低于一半"""
+        while size < len(self.track_names) * 2 + 2:
+            size *= 2
+        self.slots = array('I', [EMPTY_SLOT]) * size
+        for track_id, (dir_id, name) in enumerate(zip(self.track_dirs, self.track_names)):
+            self.slots[self._slot(dir_id, name)] = track_id
+
+    def intern(self, path):
+        """返回路径对应的歌曲编号，第一次出现时加入表中"""
+        folder, name = split_path(path)
+        name = name.encode('utf-8', 'surrogatepass')
+        with self.lock:
+            if self.slots is None:
+                self._build_slots()
+            dir_id = self.dir_ids.get(folder)
+            if dir_id is None:
+                dir_id = self.dir_ids[folder] = len(self.dirs)
+                self.dirs.append(folder)
+            i = self._slot(dir_id, name)
+            track_id = self.slots[i]
+            if track_id == EMPTY_SLOT:
+                track_id = self.slots[i] = len(self.track_names)
+                self.track_dirs.append(dir_id)
+                self.track_names.append(name)
+                if len(self.track_names) * 2 > len(self.slots):
+                    self._build_slots(len(self.slots) * 2)
+            return track_id
+
+    def lookup(self, path):
+        """查询已有的歌曲编号，不存在时返回None"""
+        folder, name = split_path(path)
+        dir_id = self.dir_ids.get(folder)
+        if dir_id is None:
+            return None
+        if self.slots is None:
+            with self.lock:
+                if self.slots is None:
+                    self._build_slots()
+        track_id = self.slots[self._slot(dir_id, name.encode('utf-8', 'surrogatepass'))]
+        return None if track_id == EMPTY_SLOT else track_id
+
+    def to_dict(self):
+        """导出为可以写入 JSON 的数据；编号就是列表中的位置"""
+        with self.lock:
+            return {
+                'dirs': list(self.dirs),
+                'track_dirs': self.track_dirs.tolist(),
+                'names': [name.decode('utf-8', 'surrogatepass') for name in self.track_names],
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict 导出的数据恢复，歌曲编号保持不变"""
+        table = cls()
+        table.dirs = data['dirs']
+        table.dir_ids = {folder: dir_id for dir_id, folder in enumerate(table.dirs)}
+        table.track_dirs = array('I', data['track_dirs'])
+        table.track_names = [name.encode('utf-8', 'surrogatepass') for name in data['names']]
+        return table
+
+    def path(self, track_id):
+        return (self.dirs[self.track_dirs[track_id]]
+                + self.track_names[track_id].decode('utf-8', 'surrogatepass'))
+
+
+class Playlist:
+    """以歌曲编号数组保存的电台，按下标访问、迭代时返回路径，用法与路径列表相同"""
+    __slots__ = ('table', 'ids')
+
+    def __init__(self, table, paths=()):
+        self.table = table
+        self.ids = array('I', map(table.intern, paths))
+
+    @classmethod
+    def from_ids(cls, table, ids):
+        """直接用歌曲编号数组创建"""
+        playlist = cls(table)
+        playlist.ids = ids
+        return playlist
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        path = self.table.path
+        if isinstance(index, slice):
+            return [path(track_id) for track_id in self.ids[index]]
+        return path(self.ids[index])
+
+    def __setitem__(self, index, paths):
+        if index != slice(None):
+            raise TypeError("Playlist 只支持整体替换 playlist[:] = paths")
+        self.ids = array('I', map(self.table.intern, paths))
+
+    def __delitem__(self, index):
+        del self.ids[index]
+
+    def __iter__(self):
+        return map(self.table.path, self.ids)
+
+    def __contains__(self, path):
+        track_id = self.table.lookup(path)
+        return track_id is not None and track_id in self.ids
+
+    def __eq__(self, other):
+        if isinstance(other, Playlist) and other.table is self.table:
+            return self.ids == other.ids
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"Playlist({list(self)!r})"
+
+    def index(self, path):
+        """返回路径第一次出现的位置，不存在时抛出 ValueError"""
+        track_id = self.table.lookup(path)
+        if track_id is None:
+            raise ValueError(f"{path!r} is not in playlist")
+        return self.ids.index(track_id)
+
+    def append(self, path):
+        self.ids.append(self.table.intern(path))
+
+    def extend(self, paths):
+        self.ids.extend(map(self.table.intern, paths))
+
+    def remove_indices(self, indices):
+        """一次删除多个位置（删除前的下标），按段复制，只遍历一遍"""
+        indices = sorted(set(indices))
+        if not indices:
+            return
+        kept = array('I')
+        start = 0
+        for index in indices:
+            kept.extend(self.ids[start:index])
+            start = index + 1
+        kept.extend(self.ids[start:])
+        self.ids = kept
+
+    def find_indices(self, paths):
+        """返回属于 paths 的歌曲所在的所有位置"""
+        lookup = self.table.lookup
+        wanted = {track_id for track_id in map(lookup, paths) if track_id is not None}
+        if not wanted:
+            return []
+        return [index for index, track_id in enumerate(self.ids) if track_id in wanted]
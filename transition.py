@@ -0,0 +1,161 @@
+import os
+import time
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from .probe import OffsetFile, mp3_tail_offset, read_wav_layout, wav_file
+
+# 最多保留的切歌间隙记录条数
+MAX_GAP_SAMPLES = 100
+# 截取结尾时多解码的时长（秒）
+TAIL_MARGIN = 1.0
+
+
+def mixer_frame_bytes():
+    """返回混音器每个采样帧的字节数及采样率"""
+    freq, size, channels = pygame.mixer.get_init()
+    return abs(size) // 8 * channels, freq
+
+
+def tail_file(path, seconds):
+    """返回只包含歌曲结尾至少 seconds 秒的文件对象，交给 pygame 解码，不读取整个文件"""
+    if os.path.splitext(path)[1].lower() == '.mp3':
+        offset = mp3_tail_offset(path, seconds)
+        return OffsetFile(path, offset) if offset is not None else None
+    with open(path, 'rb') as file:
+        layout = read_wav_layout(file)
+        if layout is None:
+            return None
+        fmt, data_offset, data_size = layout
+        byte_rate = struct.unpack('<I', fmt[8:12])[0]
+        block_align = struct.unpack('<H', fmt[12:14])[0] or 1
+        size = min(data_size, int(seconds * byte_rate) // block_align * block_align)
+        file.seek(data_offset + (data_size - size) // block_align * block_align)
+        return wav_file(fmt, file.read(size))
+
+
+def extract_tail(path, seconds):
+    """只解码歌曲结尾若干秒，用于淡入淡出时与下一首重叠播放"""
+    file = None
+    try:
+        # 多解码一段，MP3从中途的帧开始解码时前几帧可能不完整
+        file = tail_file(path, seconds + TAIL_MARGIN)
+    except (OSError, struct.error) as e:
+        print(f"读取歌曲结尾出错: {e}")
+    if file is None:
+        # 无法识别文件头时才解码整首歌曲
+        sound = pygame.mixer.Sound(path)
+    else:
+        try:
+            sound = pygame.mixer.Sound(file=file)
+        finally:
+            file.close()
+    raw = sound.get_raw()
+    frame_bytes, freq = mixer_frame_bytes()
+    tail_bytes = int(seconds * freq) * frame_bytes
+    return raw[-tail_bytes:]
+
+
+class TransitionEngine:
+    """切歌引擎：无缝模式用 music.queue 衔接，淡入淡出模式用独立声道重叠播放上一首的结尾"""
+
+    def __init__(self, crossfade_ms=0, music=None):
+        self.crossfade_ms = crossfade_ms
+        # 播放后端，默认为 pygame.mixer.music，也可以是用法相同的 StreamMusic
+        self.music = music or pygame.mixer.music
+        self.queued_path = None
+        self.tail_path = None
+        self.tail_future = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transition")
+        self.lock = threading.Lock()
+        self.track_started_at = None
+        self.track_length = 0
+        self.gaps = []
+
+    def set_crossfade(self, crossfade_ms):
+        """设置淡入淡出时长（毫秒），0 表示无缝衔接"""
+        self.crossfade_ms = max(0, int(crossfade_ms))
+
+    def track_started(self, position, length):
+        """记录当前歌曲开始播放的时刻，position 为开始时的播放位置（秒）"""
+        self.track_started_at = time.monotonic() - position
+        self.track_length = length
+
+    def prepare(self, current_path, next_path):
+        """当前歌曲开始后，为切换到下一首做准备"""
+        self.queued_path = None
+        if self.crossfade_ms > 0:
+            # 淡入淡出需要上一首结尾的PCM数据，在后台线程中解码
+            with self.lock:
+                if self.tail_path != current_path:
+                    self.tail_path = current_path
+                    self.tail_future = self.executor.submit(
+                        extract_tail, current_path, self.crossfade_ms / 1000)
+            return
+        try:
+            self.music.queue(next_path)
+            self.queued_path = next_path
+        except pygame.error as e:
+            print(f"无法将下一首加入播放队列: {e}")
+
+    def crossfade_point(self):
+        """返回开始淡入淡出的播放位置（秒），未启用时返回None"""
+        if self.crossfade_ms <= 0 or not self.track_length:
+            return None
+        return max(0, self.track_length - self.crossfade_ms / 1000)
+
+    def start_crossfade(self, position):
+        """在当前位置开始播放上一首的结尾，返回下一首应使用的淡入时长（毫秒）"""
+        with self.lock:
+            future = self.tail_future
+            self.tail_path = None
+            self.tail_future = None
+        if future is None or not future.done() or future.exception() is not None:
+            return 0
+
+        tail = future.result()
+        # 按实际播放位置对齐结尾片段，计时器的误差不会造成重复或跳过
+        frame_bytes, freq = mixer_frame_bytes()
+        skip = int(max(0, position - self.crossfade_point()) * freq) * frame_bytes
+        if skip >= len(tail):
+            return 0
+        sound = pygame.mixer.Sound(buffer=tail[skip:])
+        channel = sound.play()
+        if channel is None:
+            return 0
+        remaining_ms = int(sound.get_length() * 1000)
+        channel.fadeout(remaining_ms)
+        return remaining_ms
+
+    def queued_track_started(self, position):
+        """队列中的下一首已开始播放，记录实际的切歌间隙"""
+        path = self.queued_path
+        self.queued_path = None
+        if self.track_started_at is not None and self.track_length:
+            expected_end = self.track_started_at + self.track_length
+            actual_start = time.monotonic() - position
+            self.record_gap(actual_start - expected_end)
+        return path
+
+    def record_gap(self, gap):
+        """记录一次切歌间隙（秒）"""
+        self.gaps.append(gap)
+        if len(self.gaps) > MAX_GAP_SAMPLES:
+            del self.gaps[0]
+
+    def gap_report(self):
+        """返回切歌间隙统计（毫秒）"""
+        if not self.gaps:
+            return {'count': 0}
+        gaps_ms = [gap * 1000 for gap in self.gaps]
+        return {
+            'count': len(gaps_ms),
+            'min_ms': min(gaps_ms),
+            'max_ms': max(gaps_ms),
+            'avg_ms': sum(gaps_ms) / len(gaps_ms),
+        }
+
+    def shutdown(self):
+        """停止后台线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -3,7 +3,9 @@ from tkinter import ttk
 import tkinter.font as tkfont
 from tkinter import Canvas
 import math
+import time
 import ctypes
+from .playlist_view import VirtualListbox
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
 except:
@@ -106,18 +108,101 @@ def create_wave_effect(canvas, width, height):
                             smooth=True)              # 平滑曲线
     return wave
 
-def update_wave(canvas, wave, offset):
-    """更新波形动画"""
-    points = []
-    width = canvas.winfo_width()
-    height = canvas.winfo_height()
-    
-    for x in range(0, width, 2):
-        y = height/2 + math.sin((x+offset)/10) * (height/4)  # 调整波形幅度
-        points.extend([x, y])
-    
-    canvas.coords(wave, *points)
-    canvas.after(50, lambda: update_wave(canvas, wave, offset+1))
+class WaveAnimation:
+    """波形动画：坐标写入复用的NumPy缓冲区，按实测帧耗时降低帧率，窗口最小化或停止播放时暂停"""
+
+    def __init__(self, canvas, wave, app, interval=50, max_interval=200):
+        self.canvas = canvas
+        self.wave = wave
+        self.app = app
+        self.base_interval = interval
+        self.max_interval = max_interval
+        self.interval = interval
+        self.offset = 0
+        self.job = None
+        self.size = None
+        self.xs = None
+        self.points = None
+        self.spectrum_buffer = None
+        self.last_frame_index = None
+        # 界面构建时播放器模块和 pygame 已经导入了 NumPy；ui 本身在启动画面之前导入，
+        # 所以频谱模块在这里而不是模块顶部导入
+        from . import visualizer
+        self.spectrum = visualizer
+
+    def start(self):
+        """开始或恢复动画"""
+        if self.job is None:
+            self.job = self.canvas.after(0, self.tick)
+
+    def stop(self):
+        """暂停动画"""
+        if self.job is not None:
+            self.canvas.after_cancel(self.job)
+            self.job = None
+
+    def should_run(self):
+        if not self.app.is_playing or self.app.is_paused:
+            return False
+        return self.app.root.state() != 'iconic'
+
+    def tick(self):
+        self.job = None
+        if not self.should_run():
+            return  # 由 start() 重新唤醒
+
+        started = time.perf_counter()
+        self.draw()
+        cost_ms = (time.perf_counter() - started) * 1000
+
+        # 绘制耗时超过帧间隔的四分之一时降低帧率，耗时下降后逐步恢复
+        if cost_ms * 4 > self.interval:
+            self.interval = min(self.max_interval, self.interval * 2)
+        elif self.interval > self.base_interval and cost_ms * 8 < self.interval:
+            self.interval = max(self.base_interval, self.interval - 10)
+        self.offset += 1
+        self.job = self.canvas.after(self.interval, self.tick)
+
+    def draw(self):
+        np = self.spectrum.np
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+
+        position = self.app.get_position()
+        frame = self.app.visualizer.frame_at(position)
+        if frame is not None:
+            # 频谱帧没有变化时跳过重绘
+            frame_index = int(position * self.spectrum.SPECTRUM_FPS)
+            if frame_index == self.last_frame_index:
+                return
+            self.last_frame_index = frame_index
+            self.spectrum_buffer = self.spectrum.spectrum_points(frame, width, height,
+                                                                 self.spectrum_buffer)
+            self.canvas.coords(self.wave, self.spectrum_buffer.tolist())
+            return
+
+        self.last_frame_index = None
+        if np is None:
+            points = []
+            for x in range(0, width, 2):
+                y = height/2 + math.sin((x+self.offset)/10) * (height/4)  # 调整波形幅度
+                points.extend([x, y])
+            self.canvas.coords(self.wave, points)
+            return
+
+        if self.size != (width, height):
+            # 画布尺寸变化时才重新分配缓冲区
+            self.size = (width, height)
+            self.xs = np.arange(0, width, 2, dtype=np.float64)
+            self.points = np.empty(len(self.xs) * 2, dtype=np.float64)
+            self.points[0::2] = self.xs
+        ys = self.points[1::2]
+        np.add(self.xs, self.offset, out=ys)
+        ys /= 10
+        np.sin(ys, out=ys)
+        ys *= height / 4
+        ys += height / 2
+        self.canvas.coords(self.wave, self.points.tolist())
 
 def setup_ui(app):
     """设置主窗口UI组件"""
@@ -174,6 +259,8 @@ def setup_ui(app):
 
     # 最小化按钮 - 更新背景色
     def minimize_window():
+        if hasattr(app, 'wave_animation'):
+            app.wave_animation.stop()  # 最小化时暂停波形动画
         app.root.update_idletasks()
         app.root.overrideredirect(False)  # 临时恢复窗口边框
         app.root.iconify()  # 最小化窗口
@@ -181,6 +268,8 @@ def setup_ui(app):
         def check_state():
             if app.root.state() == 'normal':  # 当窗口恢复时
                 app.root.overrideredirect(True)  # 重新移除边框
+                if hasattr(app, 'wave_animation'):
+                    app.wave_animation.start()
             else:
                 app.root.after(100, check_state)
         
@@ -213,7 +302,7 @@ def setup_ui(app):
                             bd=0,
                             padx=10,
                             cursor='hand2',
-                            command=lambda: app.root.destroy())
+                            command=app.on_closing)
     close_button.pack(side=tk.LEFT, padx=2)
     
     # 更新关闭按钮悬停效果
@@ -293,6 +382,26 @@ def setup_ui(app):
     app.playlist_button = create_custom_button(top_frame, "播放列表", app.toggle_playlist)
     app.playlist_button.pack(side=tk.LEFT, padx=5)
 
+    # 搜索框 - 每次输入都在所有电台中即时搜索
+    search_label = tk.Label(top_frame, text="搜索:",
+                           bg=COLORS['bg_dark'],
+                           fg=COLORS['text'],
+                           font=('Helvetica', 10, 'bold'))
+    search_label.pack(side=tk.LEFT, padx=(15, 5))
+
+    app.search_var = tk.StringVar()
+    app.search_entry = tk.Entry(top_frame,
+                               textvariable=app.search_var,
+                               bg=COLORS['bg_light'],
+                               fg=COLORS['text'],
+                               insertbackground=COLORS['text'],  # 光标颜色
+                               relief=tk.FLAT,
+                               width=30,
+                               font=FONTS['normal'])
+    app.search_entry.pack(side=tk.LEFT, padx=5)
+    app.search_var.trace_add('write', lambda *args: app.search(app.search_var.get()))
+    app.search_entry.bind('<Escape>', lambda e: app.clear_search())
+
     # 播放列表框
     playlist_frame = tk.Frame(main_frame, bg=COLORS['bg_dark'])
     playlist_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -316,6 +425,11 @@ def setup_ui(app):
                                             command=lambda: app.set_play_mode("random"))
     random_play_button.pack(fill=tk.X, pady=2)
 
+    # 按播放次数加权的随机播放按钮
+    weighted_play_button = create_custom_button(play_mode_frame, "偏好随机",
+                                              command=lambda: app.set_play_mode("weighted_random"))
+    weighted_play_button.pack(fill=tk.X, pady=2)
+
     # 自定义滚动条样式
     style.configure("Custom.Vertical.TScrollbar",
                    background=COLORS['accent'],
@@ -327,18 +441,19 @@ def setup_ui(app):
     scrollbar = ttk.Scrollbar(playlist_frame, style="Custom.Vertical.TScrollbar")
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    app.listbox = tk.Listbox(playlist_frame,
-                            bg=COLORS['bg_light'],
-                            fg=COLORS['text'],
-                            selectbackground=COLORS['accent'],
-                            selectforeground=COLORS['text'],
-                            font=('Helvetica', 10),
-                            height=15,
-                            activestyle='none',
-                            bd=0,
-                            highlightthickness=0,
-                            yscrollcommand=scrollbar.set)
+    # 虚拟化列表：只绘制可见的行，大型电台也能即时切换
+    app.listbox = VirtualListbox(playlist_frame,
+                                 items=app.current_playlist,
+                                 formatter=app.format_rows,
+                                 bg=COLORS['bg_light'],
+                                 fg=COLORS['text'],
+                                 selectbackground=COLORS['accent'],
+                                 selectforeground=COLORS['text'],
+                                 font=('Helvetica', 10),
+                                 height=15,
+                                 yscrollcommand=scrollbar.set)
     app.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    app.listbox.bind('<<ListboxActivate>>', app.play_selected)
     scrollbar.config(command=app.listbox.yview)
     app.listbox.grid_remove()  # 初始隐藏
 
@@ -363,8 +478,10 @@ def setup_ui(app):
         wave = create_wave_effect(wave_canvas,
                                 wave_canvas.winfo_width(),
                                 wave_canvas.winfo_height())
-        # 启动动画
-        update_wave(wave_canvas, wave, 0)
+        # 启动动画，播放开始或窗口恢复时会再次唤醒
+        app.wave_animation = WaveAnimation(wave_canvas, wave, app)
+        app.wave_animation.start()
+        app.root.bind('<Map>', lambda e: app.wave_animation.start(), add='+')
 
     # 确保画布创建完成后再启动动画
     app.root.after(100, start_wave_animation)
@@ -395,6 +512,9 @@ def setup_ui(app):
     pause_button = create_custom_button(play_control_frame, "暂停", app.pause_music, width=button_width)
     pause_button.pack(side=tk.LEFT, padx=5)
 
+    previous_button = create_custom_button(play_control_frame, "上一首", app.previous_song, width=button_width)
+    previous_button.pack(side=tk.LEFT, padx=5)
+
     next_button = create_custom_button(play_control_frame, "下一首", app.next_song, width=button_width)
     next_button.pack(side=tk.LEFT, padx=5)
 
@@ -426,6 +546,31 @@ def setup_ui(app):
     app.volume_slider.set(50)
     app.volume_slider.pack(side=tk.LEFT)
 
+    # 淡入淡出时长（秒），0 表示无缝衔接
+    crossfade_frame = tk.Frame(control_frame, bg=COLORS['bg_dark'])
+    crossfade_frame.pack(side=tk.RIGHT, padx=10)
+
+    crossfade_label = tk.Label(crossfade_frame, text="淡入淡出:", bg=COLORS['bg_dark'], fg=COLORS['text'])
+    crossfade_label.pack(side=tk.LEFT, padx=(0, 5))
+
+    app.crossfade_slider = tk.Scale(crossfade_frame,
+                                  from_=0, to=10,
+                                  orient="horizontal",
+                                  length=80,
+                                  bg=COLORS['bg_dark'],
+                                  fg=COLORS['text'],
+                                  activebackground=COLORS['accent_hover'],
+                                  background=COLORS['accent'],
+                                  troughcolor=COLORS['bg_light'],
+                                  sliderrelief='flat',
+                                  sliderlength=15,
+                                  width=8,
+                                  showvalue=1,
+                                  highlightthickness=0)
+    app.crossfade_slider.set(app.transition.crossfade_ms // 1000)
+    app.crossfade_slider.config(command=lambda value: app.set_crossfade(int(value) * 1000))
+    app.crossfade_slider.pack(side=tk.LEFT)
+
     # 播放列表管理按钮 - 重新布局
     playlist_control_frame = tk.Frame(main_frame, bg=COLORS['bg_dark'])
     playlist_control_frame.pack(fill=tk.X, pady=15)
@@ -441,6 +586,9 @@ def setup_ui(app):
     add_button = create_custom_button(left_buttons, "添加音乐", app.add_music, width=10)
     add_button.pack(side=tk.LEFT, padx=5)
 
+    import_button = create_custom_button(left_buttons, "导入文件夹", app.import_folder, width=10)
+    import_button.pack(side=tk.LEFT, padx=5)
+
     remove_button = create_custom_button(left_buttons, "删除音乐", app.remove_music, width=10)
     remove_button.pack(side=tk.LEFT, padx=5)
 
@@ -1,21 +1,164 @@
+import os
 import re
+import codecs
+import threading
+from collections import OrderedDict
+from array import array
+from operator import itemgetter
+
+# 时间标签：[mm:ss]、[mm:ss.xx]、[mm:ss.xxx]，也兼容 [mm:ss:xx]
+TIME_TAG = re.compile(r'\[(\d+):(\d{1,2})(?:[.:](\d{1,3}))?\]')
+# 元数据标签：[ti:标题]、[ar:歌手]、[offset:+500] 等
+META_TAG = re.compile(r'\[([A-Za-z#]+):([^\]]*)\]\s*$')
+
+
+class Lyrics:
+    """按时间排序的歌词，时间和文本分别存放在两个并行数组中"""
+    __slots__ = ('times', 'texts', 'tags', 'encoding')
+
+    def __init__(self, times=None, texts=None, tags=None, encoding=None):
+        self.times = times if times is not None else array('d')
+        self.texts = texts if texts is not None else []
+        self.tags = tags if tags is not None else {}
+        self.encoding = encoding
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index):
+        return self.times[index], self.texts[index]
+
+    def __iter__(self):
+        return zip(self.times, self.texts)
+
 
 def parse_lyrics(lrc_content):
-    lyrics = []
-    lines = lrc_content.split('\n')
-    for line in lines:
-        match = re.match(r'\[(\d{2}:\d{2}\.\d{2})\](.*)', line)
-        if match:
-            time_str, text = match.groups()
-            try:
-                minutes, seconds = map(float, time_str.split(':'))
-                time_seconds = minutes * 60 + seconds
-                lyrics.append((time_seconds, text))
-            except ValueError:
-                continue
-    lyrics.sort(key=lambda x: x[0])
-    return lyrics
+    """单遍解析LRC歌词，支持一行多个时间标签、毫秒精度、offset 和元数据标签"""
+    entries = []
+    tags = {}
+    match_time = TIME_TAG.match
+    for line in lrc_content.splitlines():
+        line = line.strip()
+        if not line.startswith('['):
+            continue
+        pos = 0
+        line_times = []
+        match = match_time(line)
+        while match:
+            minutes, seconds, fraction = match.groups()
+            time_seconds = int(minutes) * 60 + int(seconds)
+            if fraction:
+                time_seconds += int(fraction) / (10 ** len(fraction))
+            line_times.append(time_seconds)
+            pos = match.end()
+            match = match_time(line, pos)
+        if line_times:
+            text = line[pos:].strip()
+            for time_seconds in line_times:
+                entries.append((time_seconds, text))
+        else:
+            meta = META_TAG.match(line)
+            if meta:
+                tags[meta.group(1).lower()] = meta.group(2).strip()
+
+    # offset 以毫秒为单位，正值表示歌词提前显示
+    offset = 0
+    if 'offset' in tags:
+        try:
+            offset = int(tags['offset']) / 1000
+        except ValueError:
+            pass
+
+    entries.sort(key=itemgetter(0))
+    times = array('d', (max(0, time_seconds - offset) for time_seconds, text in entries))
+    texts = [text for time_seconds, text in entries]
+    return Lyrics(times, texts, tags)
 
 def format_time(time_in_seconds):
     minutes, seconds = divmod(int(time_in_seconds), 60)
-    return f"{minutes:02}:{seconds:02}" 
\ No newline at end of file
+    return f"{minutes:02}:{seconds:02}" 
+
+# 带BOM的文件直接按BOM确定编码
+LYRICS_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+# 没有BOM时依次尝试的编码；gb18030 兼容 gbk 和 gb2312
+LYRICS_ENCODINGS = ['utf-8', 'gb18030']
+
+
+def decode_lyrics(data, encoding=None):
+    """解码歌词文件内容，返回 (文本, 编码)；encoding 为上次识别出的编码，在UTF-8之后优先尝试"""
+    for bom, bom_encoding in LYRICS_BOMS:
+        if data.startswith(bom):
+            return data.decode(bom_encoding), bom_encoding
+    # 记住的编码属于歌曲而不是歌词文件，歌词改存为UTF-8后仍会记着旧编码；
+    # GBK 等编码几乎总能“解码成功”，所以先严格按UTF-8解码，避免得到乱码
+    candidates = ['utf-8']
+    if encoding and encoding != 'utf-8':
+        candidates.append(encoding)
+    candidates += [name for name in LYRICS_ENCODINGS if name not in candidates]
+    for name in candidates:
+        try:
+            return data.decode(name), name
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return data.decode('gb18030', errors='replace'), 'gb18030'
+
+
+class LyricsCache:
+    """按 (路径, 修改时间) 缓存已解析歌词的LRU缓存"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            lyrics = self.entries.get(key)
+            if lyrics is not None:
+                self.entries.move_to_end(key)
+            return lyrics
+
+    def put(self, key, lyrics):
+        with self.lock:
+            self.entries[key] = lyrics
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+lyrics_cache = LyricsCache()
+
+
+def load_lyrics_file(lrc_path, encoding=None):
+    """读取并解析歌词文件：只读取一次字节内容，识别编码后解析，结果放入LRU缓存"""
+    try:
+        mtime = os.stat(lrc_path).st_mtime_ns
+    except OSError:
+        print(f"歌词文件不存在: {lrc_path}")
+        return Lyrics()
+
+    key = (lrc_path, mtime)
+    lyrics = lyrics_cache.get(key)
+    if lyrics is not None:
+        return lyrics
+
+    print(f"尝试加载歌词文件: {lrc_path}")
+    try:
+        with open(lrc_path, 'rb') as file:
+            data = file.read()
+    except OSError as e:
+        print(f"读取歌词文件出错: {e}")
+        return Lyrics()
+
+    text, detected = decode_lyrics(data, encoding)
+    print(f"使用 {detected} 编码成功读取歌词")
+    lyrics = parse_lyrics(text)
+    lyrics.encoding = detected
+    if not lyrics:
+        print("歌词文件中没有可用的时间标签")
+    lyrics_cache.put(key, lyrics)
+    return lyrics
@@ -0,0 +1,217 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from .probe import OffsetFile, read_wav_layout, wav_file
+
+# 频谱帧率、频带数量以及显示的最低分贝
+SPECTRUM_FPS = 20
+SPECTRUM_BANDS = 64
+SPECTRUM_FLOOR_DB = -60.0
+# 每次做FFT的帧数，限制计算过程中的临时内存
+FFT_BATCH_FRAMES = 256
+# 同时保留的曲目频谱数量（当前曲目和下一首）
+MAX_CACHED_TRACKS = 2
+# 流式播放时保留的最近频谱帧数
+MAX_LIVE_FRAMES = 200
+# 预先计算频谱时每段解码的时长（秒），解码出的PCM不会超过这一段的大小
+SEGMENT_SECONDS = 30
+# 无法分段解码时，只完整解码不超过该大小的文件（字节）
+MAX_WHOLE_DECODE_BYTES = 8 * 1024 * 1024
+
+
+def band_edges(block_size, freq, bands):
+    """计算按对数分布的频带在FFT结果中的边界索引"""
+    bins = block_size // 2 + 1
+    low = max(1, int(40 * block_size / freq))
+    edges = np.geomspace(low, bins - 1, bands + 1).astype(np.int64)
+    # 保证每个频带至少包含一个频点
+    edges = np.maximum(edges, np.arange(bands + 1) + low)
+    return np.minimum(edges, bins - 1)
+
+
+def compute_spectrum_frames(samples, freq, fps=SPECTRUM_FPS, bands=SPECTRUM_BANDS):
+    """对PCM数据分块做FFT，返回形状为 (帧数, 频带数) 的 0~1 频谱强度"""
+    # 按原始的整数类型确定满幅值，立体声取平均后已经变成浮点数
+    scale = float(np.iinfo(samples.dtype).max) if samples.dtype.kind == 'i' else 1.0
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1, dtype=np.float32)
+    block_size = max(64, freq // fps)
+    frame_count = len(samples) // block_size
+    frames = np.zeros((frame_count, bands), dtype=np.float32)
+    if frame_count == 0:
+        return frames
+
+    window = np.hanning(block_size).astype(np.float32)
+    edges = band_edges(block_size, freq, bands)
+    scale *= block_size / 2
+
+    for start in range(0, frame_count, FFT_BATCH_FRAMES):
+        stop = min(frame_count, start + FFT_BATCH_FRAMES)
+        blocks = samples[start * block_size:stop * block_size].astype(np.float32)
+        blocks = blocks.reshape(stop - start, block_size) * window
+        magnitude = np.abs(np.fft.rfft(blocks, axis=1)) / scale
+        # 每个频带取平均能量
+        sums = np.add.reduceat(magnitude, edges[:-1], axis=1)
+        counts = np.diff(edges).clip(min=1)
+        db = 20 * np.log10(np.maximum(sums / counts, 1e-9))
+        frames[start:stop] = np.clip(1 - db / SPECTRUM_FLOOR_DB, 0, 1)
+    return frames
+
+
+def wav_segments(path, seconds):
+    """把WAV按 seconds 秒切成若干段，逐段返回 (起始时间, 内存中的WAV文件)"""
+    with open(path, 'rb') as file:
+        layout = read_wav_layout(file)
+        if layout is None:
+            return
+        fmt, data_offset, data_size = layout
+        byte_rate = struct.unpack('<I', fmt[8:12])[0]
+        block_align = struct.unpack('<H', fmt[12:14])[0] or 1
+        if not byte_rate:
+            return
+        size = max(block_align, int(seconds * byte_rate) // block_align * block_align)
+        file.seek(data_offset)
+        for offset in range(0, data_size, size):
+            data = file.read(min(size, data_size - offset))
+            yield offset / byte_rate, wav_file(fmt, data)
+
+
+def mp3_segments(path, seconds, seek_table):
+    """按帧偏移表把MP3切成约 seconds 秒的若干段，逐段返回 (起始时间, 文件视图)"""
+    bounds = []
+    target = 0.0
+    while target < seek_table.duration:
+        offset, start = seek_table.locate(target)
+        if not bounds or offset > bounds[-1][0]:
+            bounds.append((offset, start))
+        target += seconds
+    bounds.append((os.path.getsize(path), seek_table.duration))
+    for (offset, start), (end, _) in zip(bounds, bounds[1:]):
+        yield start, OffsetFile(path, offset, end - offset)
+
+
+def decode_spectrum(path, seek_table=None):
+    """分段解码歌曲并计算频谱帧（在后台线程中执行），每次只解码 SEGMENT_SECONDS 秒
+
+    WAV 按采样数据切段，MP3 按帧偏移表切段；都无法切段时只完整解码较小的文件。
+    """
+    import pygame
+    freq = pygame.mixer.get_init()[0]
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.wav':
+        segments = wav_segments(path, SEGMENT_SECONDS)
+    elif seek_table is not None:
+        segments = mp3_segments(path, SEGMENT_SECONDS, seek_table)
+    elif os.path.getsize(path) <= MAX_WHOLE_DECODE_BYTES:
+        segments = [(0.0, None)]
+    else:
+        return np.zeros((0, SPECTRUM_BANDS), dtype=np.float32)
+    parts = []
+    for start, file in segments:
+        try:
+            sound = pygame.mixer.Sound(file=file) if file is not None else pygame.mixer.Sound(path)
+        finally:
+            if file is not None:
+                file.close()
+        samples = pygame.sndarray.array(sound)
+        del sound
+        parts.append((int(round(start * SPECTRUM_FPS)), compute_spectrum_frames(samples, freq)))
+        del samples
+    count = max((first + len(frames) for first, frames in parts), default=0)
+    result = np.zeros((count, SPECTRUM_BANDS), dtype=np.float32)
+    for first, frames in parts:
+        result[first:first + len(frames)] = frames
+    return result
+
+
+def spectrum_points(frame, width, height, out=None):
+    """把一帧频谱转换为画布折线坐标 [x0, y0, x1, y1, ...]"""
+    bands = len(frame)
+    if out is None or len(out) != bands * 2:
+        out = np.empty(bands * 2, dtype=np.float32)
+    out[0::2] = np.linspace(0, width, bands)
+    np.multiply(frame, -height * 0.9, out=out[1::2])
+    out[1::2] += height
+    return out
+
+
+class SpectrumVisualizer:
+    """在后台线程中为当前和下一首歌曲预先计算频谱帧"""
+
+    def __init__(self, library=None):
+        self.enabled = np is not None
+        # 用曲库索引中缓存的帧偏移表给MP3分段
+        self.library = library
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spectrum")
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.current_path = None
+        # 流式播放时由 feed 逐块计算频谱：(路径, 帧序号) -> 频谱帧
+        self.live = False
+        self.live_frames = OrderedDict()
+
+    def prefetch(self, path):
+        """提交频谱计算任务"""
+        if not self.enabled or self.live:
+            return
+        with self.lock:
+            if path in self.futures:
+                return
+            self.futures[path] = self.executor.submit(self._decode, path)
+            # 只保留当前曲目和最近提交的曲目
+            for old_path in list(self.futures):
+                if len(self.futures) <= MAX_CACHED_TRACKS:
+                    break
+                if old_path not in (path, self.current_path):
+                    self.futures.pop(old_path).cancel()
+
+    def _decode(self, path):
+        seek_table = None
+        if self.library is not None and os.path.splitext(path)[1].lower() == '.mp3':
+            seek_table = self.library.seek_table(path)
+        return decode_spectrum(path, seek_table)
+
+    def load(self, path):
+        """切换到新的当前曲目"""
+        self.current_path = path
+        self.prefetch(path)
+
+    def feed(self, path, position, pcm):
+        """流式播放的PCM分流：为即将播放的一块数据计算频谱帧"""
+        if not self.enabled:
+            return
+        import pygame
+        freq, _, channels = pygame.mixer.get_init()
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+        frames = compute_spectrum_frames(samples, freq)
+        first = int(round(position * SPECTRUM_FPS))
+        with self.lock:
+            for i, frame in enumerate(frames):
+                self.live_frames[(path, first + i)] = frame
+            while len(self.live_frames) > MAX_LIVE_FRAMES:
+                self.live_frames.popitem(last=False)
+
+    def frame_at(self, position):
+        """返回当前曲目在指定位置的频谱帧，尚未计算完成时返回None"""
+        if self.live:
+            with self.lock:
+                return self.live_frames.get((self.current_path, int(position * SPECTRUM_FPS)))
+        with self.lock:
+            future = self.futures.get(self.current_path)
+        if future is None or not future.done() or future.cancelled() or future.exception():
+            return None
+        frames = future.result()
+        if len(frames) == 0:
+            return None
+        index = min(len(frames) - 1, max(0, int(position * SPECTRUM_FPS)))
+        return frames[index]
+
+    def shutdown(self):
+        """停止后台线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)